@@ -1,75 +1,72 @@
 import os
-import google.generativeai as genai
 import time
 import random
+import json
+import hashlib
 import logging
+import threading
+from collections import OrderedDict
+from transcript_compactor import compact_videos
+from stub_model import StubGenerativeModel
+from instrumentation import metrics
+from resilience import CircuitOpenError, get_breaker
 
 # loggerの設定
 logger = logging.getLogger(__name__)
 
-def generate_script(transcripts, duration):
-    """Generate a new script using Gemini API with improved error handling"""
+MODEL_NAME = os.environ.get('GEMINI_MODEL', 'gemini-1.5-flash-002')
+
+GENERATION_CONFIG = {
+    'temperature': 0.7,
+    'top_p': 0.8,
+    'top_k': 40,
+}
+
+def split_transcripts(transcripts):
+    """結合された文字起こし（旧形式の文字列）を動画ごとの入力に変換"""
+    video_list = []
+    current_video = None
     
-    def optimize_transcript_length(text):
-        """文字起こしの長さを最適化"""
-        words = text.split()
-        return ' '.join(words[:2000]) if len(words) > 2000 else text
+    for line in transcripts.split('\n'):
+        if line.startswith("動画タイトル:"):
+            current_video = {'title': line.replace("動画タイトル:", "").strip(), 'transcript': ''}
+            video_list.append(current_video)
+        elif current_video is not None:
+            current_video['transcript'] += line + '\n'
+    return video_list
+
+def prompt_token_budget():
+    return int(os.environ.get('PROMPT_TOKEN_BUDGET', 6000))
+
+def analyze_video_content(video_list):
+    """複数の動画から共通要素を分析"""
+    analysis_text = ""
     
-    def analyze_video_content(video_list):
-        """複数の動画から共通要素を分析"""
-        analysis_text = ""
-        
-        for i, video in enumerate(video_list, 1):
-            try:
-                # タイトルと内容を分離
-                parts = video.split("\n", 2)
-                title = parts[0].replace("動画タイトル:", "").strip()
-                content = parts[2] if len(parts) > 2 else ""
-                
-                # 重要な部分を抽出（冒頭部分のみ）
-                content_words = content.split()
-                intro = ' '.join(content_words[:500]) if content_words else ""
-                
-                analysis_text += f"動画{i}: {title}\n導入部分: {intro}\n\n"
-                
-            except Exception as e:
-                logger.error(f"Error analyzing video {i}: {str(e)}")
-                continue
-                
-        return analysis_text
+    # 予算内に収まるよう重要な文を選び出す
+    for i, video in enumerate(compact_videos(video_list, prompt_token_budget()), 1):
+        analysis_text += f"動画{i}: {video['title']}\n内容の要点: {video['excerpt']}\n\n"
+            
+    return analysis_text
 
-    try:
-        api_key = os.environ.get('GEMINI_API_KEY')
-        if not api_key:
-            return "エラー: Gemini APIキーが見つかりません"
-        
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-1.5-flash-002')
-        
-        # 文字起こしを動画ごとに分割して処理
-        video_list = []
-        current_video = []
-        
-        for line in transcripts.split('\n'):
-            if line.startswith("動画タイトル:") and current_video:
-                video_list.append('\n'.join(current_video))
-                current_video = [line]
-            else:
-                current_video.append(line)
-        
-        if current_video:
-            video_list.append('\n'.join(current_video))
-        
-        # 動画の分析を実行
-        analysis = analyze_video_content(video_list)
-        
-        # プロンプトを短く効率的に設計
-        prompt = f"""
+def format_common_phrases(common_phrases):
+    """事前に集計した共通フレーズをプロンプト用の一節にする"""
+    if not common_phrases:
+        return ""
+    lines = '\n'.join(f"- 「{phrase}」" for phrase in common_phrases)
+    return f"複数の動画の冒頭に共通して現れるフレーズ（事前集計）：\n{lines}\n\n"
+
+def build_prompt(video_list, duration, common_phrases=None):
+    """Build the Gemini prompt from [{'title': ..., 'transcript': ...}] inputs"""
+    # 動画の分析を実行
+    analysis = analyze_video_content(video_list)
+    
+    # プロンプトを短く効率的に設計
+    return f"""
 以下の{len(video_list)}本の人気動画から、バズる要素を抽出して{duration}分の動画スクリプトを作成してください。
 
 {analysis}
 
-必要な要素：
+{format_common_phrases(common_phrases)}必要な要素：
 1. 共通する成功パターン
 2. 効果的な導入方法
 3. 視聴者の興味を引く要素
@@ -85,24 +82,201 @@ def generate_script(transcripts, duration):
 1. 分析した共通要素（箇条書き）
 2. 詳細なスクリプト（時間付き）
 """
+
+_model = None
+_model_key = None
+_model_lock = threading.Lock()
+
+def is_configured():
+    """Gemini（またはスタブ）が利用可能か"""
+    return bool(os.environ.get('GEMINI_API_KEY')) or os.environ.get('GEMINI_STUB') == '1'
+
+def _get_model():
+    """Return the process-wide model, rebuilt only when the API key changes"""
+    global _model, _model_key
+    if os.environ.get('GEMINI_STUB') == '1':
+        key = 'stub'
+    else:
+        key = os.environ.get('GEMINI_API_KEY')
+        if not key:
+            return None
+    
+    with _model_lock:
+        if _model is None or _model_key != key:
+            if key == 'stub':
+                _model = StubGenerativeModel(latency=float(os.environ.get('GEMINI_STUB_LATENCY', 0)))
+            else:
+                # google.generativeai は読み込みに時間がかかるため、実際に使う時だけimportする
+                import google.generativeai as genai
+                genai.configure(api_key=key)
+                _model = genai.GenerativeModel(MODEL_NAME)
+            _model_key = key
+        return _model
+
+class GenerationCache:
+    """Size-bounded LRU of generated scripts keyed by prompt content hash"""
+    
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def make_key(prompt, generation_config, model_name):
+        payload = json.dumps([model_name, generation_config, prompt], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def get(self, key):
+        with self._lock:
+            text = self._entries.get(key)
+            if text is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return text
+    
+    def set(self, key, text):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = text
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+generation_cache = GenerationCache(int(os.environ.get('GENERATION_CACHE_SIZE', 256)))
+
+def _cache_key(prompt):
+    model_name = 'stub' if os.environ.get('GEMINI_STUB') == '1' else MODEL_NAME
+    return GenerationCache.make_key(prompt, GENERATION_CONFIG, model_name)
+
+def _cache_enabled(use_cache):
+    return use_cache and generation_cache.max_entries > 0
+
+def _as_video_list(transcripts):
+    if isinstance(transcripts, str):
+        return split_transcripts(transcripts)
+    return list(transcripts)
+
+def _request_options():
+    """Gemini呼び出しのタイムアウト（秒）"""
+    return {'timeout': float(os.environ.get('GEMINI_TIMEOUT', 60))}
+
+def generate_script(transcripts, duration, use_cache=True, common_phrases=None):
+    """Generate a new script using Gemini API with improved error handling.
+
+    transcripts is a list of {'title': ..., 'transcript': ...}; the legacy
+    joined string format is still accepted. Pass use_cache=False to bypass
+    the generation cache. common_phrases are precomputed hook phrases shared
+    across the videos.
+    """
+    video_list = []
+    try:
+        model = _get_model()
+        if model is None:
+            return "エラー: Gemini APIキーが見つかりません"
         
-        # 一度に処理する量を制限
-        response = model.generate_content(
-            prompt,
-            generation_config={
-                'temperature': 0.7,
-                'top_p': 0.8,
-                'top_k': 40,
-            }
-        )
+        video_list = _as_video_list(transcripts)
+        with metrics.span('build_prompt'):
+            prompt = build_prompt(video_list, duration, common_phrases)
         
-        return response.text
+        # 同じ分析内容・条件の生成結果は再利用する
+        key = _cache_key(prompt)
+        if _cache_enabled(use_cache):
+            cached = generation_cache.get(key)
+            if cached is not None:
+                logger.info("Generation cache hit")
+                return cached
         
+        # 一度に処理する量を制限（障害中は待たずに代替テキストを返す）
+        with get_breaker('gemini').guard(), metrics.span('gemini_generate', mode='sync'):
+            response = model.generate_content(
+                prompt,
+                generation_config=GENERATION_CONFIG,
+                request_options=_request_options()
+            )
+            text = response.text
+        if _cache_enabled(use_cache):
+            generation_cache.set(key, text)
+        return text
+        
+    except CircuitOpenError as e:
+        metrics.inc('circuit_rejections_total', circuit='gemini')
+        logger.warning(f"スクリプト生成をスキップ: {str(e)}")
+        return fallback_script(len(video_list), duration)
     except Exception as e:
+        metrics.inc('generation_failures_total')
         logger.error(f"スクリプト生成エラー: {str(e)}")
-        # エラー時により詳細な情報を提供
-        return f"""
-{len(video_list)}本の動画から抽出した重要な要素：
+        # エラー時により詳細な情報を提供（代替テキストはキャッシュしない）
+        return fallback_script(len(video_list), duration)
+
+def generate_script_stream(transcripts, duration, use_cache=True, common_phrases=None):
+    """Yield the generated script incrementally as Gemini streams tokens"""
+    video_list = []
+    emitted = False
+    try:
+        model = _get_model()
+        if model is None:
+            yield "エラー: Gemini APIキーが見つかりません"
+            return
+        
+        video_list = _as_video_list(transcripts)
+        with metrics.span('build_prompt'):
+            prompt = build_prompt(video_list, duration, common_phrases)
+        
+        key = _cache_key(prompt)
+        if _cache_enabled(use_cache):
+            cached = generation_cache.get(key)
+            if cached is not None:
+                logger.info("Generation cache hit")
+                yield cached
+                return
+        
+        started = time.perf_counter()
+        chunks = []
+        with get_breaker('gemini').guard():
+            response = model.generate_content(
+                prompt,
+                generation_config=GENERATION_CONFIG,
+                stream=True,
+                request_options=_request_options()
+            )
+            for chunk in response:
+                text = chunk.text
+                if text:
+                    if not emitted:
+                        metrics.observe('gemini_first_token_seconds', time.perf_counter() - started)
+                    emitted = True
+                    chunks.append(text)
+                    yield text
+        # ストリーム全体の所要時間（クライアント側の消費待ちも含む）
+        metrics.observe('gemini_stream_seconds', time.perf_counter() - started)
+        
+        if _cache_enabled(use_cache):
+            generation_cache.set(key, ''.join(chunks))
+        
+    except CircuitOpenError as e:
+        metrics.inc('circuit_rejections_total', circuit='gemini')
+        logger.warning(f"スクリプト生成をスキップ: {str(e)}")
+        yield fallback_script(len(video_list), duration)
+    except Exception as e:
+        metrics.inc('generation_failures_total')
+        logger.error(f"スクリプト生成エラー: {str(e)}")
+        # 途中まで出力済みの場合は代替テキストを混ぜない
+        if not emitted:
+            yield fallback_script(len(video_list), duration)
+
+def fallback_script(video_count, duration):
+    """Return the generic framework shown when generation fails"""
+    return f"""
+{video_count}本の動画から抽出した重要な要素：
 
 1. 効果的なコンテンツの特徴：
    - 強力なフック（最初の10秒で視聴者を惹きつける）
@@ -1,8 +1,22 @@
 import os
+import json
 import logging
-from flask import Flask, render_template, request, jsonify
-from scraper import get_trending_videos, get_video_transcript, get_trending_videos_with_transcripts
-from ai_generator import generate_script
+import time
+from flask import Flask, render_template, request, jsonify, Response, stream_with_context, redirect, url_for, g
+from scraper import (
+    fetch_video_transcript, get_video_transcript_segments,
+    get_driver_pool, get_transcript_cache, get_search_cache, get_transcript_fetcher,
+    get_transcript_limiter, transcript_batch_deadline, transcript_label, transcript_excerpt, sort_videos, stream_trending_videos,
+    clamp_max_results, TRANSCRIPT_FAILED
+)
+from ai_generator import generate_script_stream, is_configured, generation_cache
+from pipeline import run_analysis, excerpt_videos, generation_inputs, get_similarity_index, enqueue_analysis, get_job_queue, AnalysisError
+from job_queue import QueueFullError, DONE, FAILED
+from instrumentation import metrics, summarize, server_timing
+from resilience import breaker_stats
+from video_metadata import parse_view_count
+from http_cache import cached_json
+from captions import segments_text
 
 # Configure logging
 logging.basicConfig(
@@ -16,24 +30,68 @@ app.secret_key = os.environ.get("FLASK_SECRET_KEY", "youtube_trends_secret")
 
 def convert_views_to_number(views_str):
     """視聴回数を数値に変換する関数"""
-    if views_str == 'N/A':
-        return 0
-    # '回視聴'や'万回視聴'、'億回視聴'などの文字列を処理
-    views_str = views_str.replace('回視聴', '').replace(' ', '')
-    try:
-        if '億' in views_str:
-            return float(views_str.replace('億', '')) * 100000000
-        elif '万' in views_str:
-            return float(views_str.replace('万', '')) * 10000
-        else:
-            return float(views_str)
-    except ValueError:
-        return 0
+    return parse_view_count(views_str)
+
+def analyze_mode():
+    """サーバーレス環境ではバックグラウンドのワーカーを持てないので同期モードを既定にする"""
+    return os.environ.get('ANALYZE_MODE', 'sync' if os.environ.get('SERVERLESS') == '1' else 'queue')
+
+def stream_enabled():
+    """ストリーミングは分析が終わるまでWebワーカーを占有するため、キューを使うモードでは既定で無効"""
+    return os.environ.get('ANALYZE_STREAM', '1' if analyze_mode() == 'sync' else '0') == '1'
+
+def wants_json():
+    """APIクライアントからのリクエストか判定"""
+    return request.is_json or request.accept_mimetypes.best == 'application/json'
+
+def wants_timings():
+    """デバッグ用の処理時間の内訳を要求されているか判定"""
+    return request.args.get('timings') == '1' or request.headers.get('X-Debug-Timings') == '1'
+
+def sse_event(event, data):
+    """Server-Sent Events形式の1イベントを組み立てる"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_time(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        metrics.observe(
+            'http_request_seconds',
+            time.perf_counter() - started,
+            endpoint=request.endpoint or 'unknown',
+            status=response.status_code
+        )
+    spans = g.pop('timing_spans', None)
+    if spans:
+        response.headers['Server-Timing'] = server_timing(spans)
+    return response
+
+@app.context_processor
+def inject_stream_url():
+    """フォームはストリーミングが有効なときだけ /analyze/stream を使う"""
+    return {'stream_url': url_for('analyze_stream') if stream_enabled() else None}
+
+# 既存のプール・キャッシュ・キューの統計も /metrics に含める
+metrics.register_collector('driver_pool', lambda: get_driver_pool().metrics())
+metrics.register_collector('transcript_cache', lambda: (get_transcript_cache() and get_transcript_cache().stats()) or {})
+metrics.register_collector('search_cache', lambda: get_search_cache().stats())
+metrics.register_collector('generation_cache', lambda: generation_cache.stats())
+metrics.register_collector('jobs', lambda: get_job_queue().stats())
+metrics.register_collector('circuit', breaker_stats)
+metrics.register_collector('transcript_concurrency', lambda: get_transcript_limiter().stats())
+metrics.register_collector(
+    'similarity_index', lambda: {'documents': get_similarity_index().document_count()} if get_similarity_index() else {}
+)
 
 @app.route('/')
 def index():
     try:
-        if not os.environ.get('GEMINI_API_KEY'):
+        if not is_configured():
             return render_template('index.html', error="Gemini APIキーが設定されていません。管理者に連絡してください。")
         return render_template('index.html')
     except Exception as e:
@@ -43,58 +101,290 @@ def index():
 @app.route('/analyze', methods=['POST'])
 def analyze():
     try:
-        if not os.environ.get('GEMINI_API_KEY'):
+        if not is_configured():
             return render_template('index.html', error="Gemini APIキーが設定されていません。")
-            
-        keyword = request.form.get('keyword')
+        
+        form = request.get_json(silent=True) or request.form
+        keyword = form.get('keyword')
         if not keyword:
             return render_template('index.html', error="キーワードを入力してください")
             
-        duration = int(request.form.get('duration', 5))
-        upload_date = request.form.get('upload_date', 'any')
-        video_duration = request.form.get('video_duration', 'any')
-        sort_by = request.form.get('sort_by', 'relevance')
-        
-        logger.info(f"Analyzing trends for keyword: {keyword}")
-        
-        # 動画と文字起こしを取得
-        videos = get_trending_videos_with_transcripts(
-            keyword,
-            upload_date=upload_date,
-            video_duration=video_duration,
-            sort_by=sort_by
-        )
+        params = {
+            'keyword': keyword,
+            'duration': int(form.get('duration', 5)),
+            'upload_date': form.get('upload_date', 'any'),
+            'video_duration': form.get('video_duration', 'any'),
+            'sort_by': form.get('sort_by', 'relevance'),
+            'max_results': clamp_max_results(form.get('max_results', 10)),
+        }
         
-        if not videos:
-            return render_template('index.html', error="条件に一致する動画が見つかりませんでした")
+        # 同期モードではこのリクエスト内で分析を完了させる
+        if analyze_mode() == 'sync':
+            if not wants_timings():
+                result = run_analysis(**params)
+                result['videos'] = excerpt_videos(result['videos'])
+                return render_template('results.html', **result)
+            with metrics.trace() as spans:
+                result = run_analysis(**params)
+            g.timing_spans = spans
+            result['videos'] = excerpt_videos(result['videos'])
+            return render_template('results.html', timings=summarize(spans), **result)
         
-        # すべての文字起こしを結合
-        all_transcripts = "\n\n".join([
-            f"動画タイトル: {v['title']}\n{v['transcript']}" 
-            for v in videos if v.get('transcript')
-        ])
+        try:
+            job_id = enqueue_analysis(**params)
+        except QueueFullError as e:
+            logger.error(f"Analysis queue full: {str(e)}")
+            error = "現在混み合っています。しばらくしてから再度お試しください"
+            if wants_json():
+                return jsonify({'error': error}), 503
+            return render_template('index.html', error=error), 503
         
-        # Geminiで分析
-        new_script = generate_script(all_transcripts, duration)
-        
-        return render_template('results.html', 
-                             videos=videos, 
-                             generated_script=new_script,
-                             keyword=keyword)
+        if wants_json():
+            return jsonify({
+                'job_id': job_id,
+                'status_url': url_for('job_status', job_id=job_id),
+                'result_url': url_for('job_result', job_id=job_id),
+            }), 202
+        return redirect(url_for('job_result', job_id=job_id))
     
+    except AnalysisError as e:
+        return render_template('index.html', error=str(e))
     except Exception as e:
         logger.error(f"Analysis error: {str(e)}")
         return render_template('index.html', error=f"エラーが発生しました: {str(e)}")
 
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    job = get_job_queue().get(job_id)
+    if job is None:
+        return jsonify({'error': "ジョブが見つかりません"}), 404
+    return jsonify({
+        'job_id': job['id'],
+        'status': job['status'],
+        'error': job['error'],
+        'created_at': job['created_at'],
+        'started_at': job['started_at'],
+        'finished_at': job['finished_at'],
+        'result_url': url_for('job_result', job_id=job_id),
+    })
+
+@app.route('/jobs/<job_id>/result')
+def job_result(job_id):
+    job = get_job_queue().get(job_id)
+    if job is None:
+        if wants_json():
+            return jsonify({'error': "ジョブが見つかりません"}), 404
+        return render_template('index.html', error="ジョブが見つかりません"), 404
+    
+    if job['status'] == DONE:
+        result = dict(job['result'])
+        if not wants_timings():
+            result.pop('timings', None)
+        if wants_json():
+            return jsonify(result)
+        return render_template('results.html', **result)
+    if job['status'] == FAILED:
+        error = f"エラーが発生しました: {job['error']}"
+        if wants_json():
+            return jsonify({'error': error}), 500
+        return render_template('index.html', error=error)
+    
+    # 処理中はステータスをポーリングする待機ページを返す
+    if wants_json():
+        return jsonify({'status': job['status']}), 202
+    return render_template('job.html', job=job, status_url=url_for('job_status', job_id=job_id))
+
+@app.route('/jobs/metrics')
+def job_metrics():
+    return jsonify(get_job_queue().stats())
+
+@app.route('/analyze/stream')
+def analyze_stream():
+    """Stream video cards, transcript progress and script tokens as they are ready"""
+    if not stream_enabled():
+        return jsonify({'error': "ストリーミングは無効です。/analyze を使用してください"}), 404
+    keyword = request.args.get('keyword')
+    if not keyword:
+        return jsonify({'error': "キーワードを入力してください"}), 400
+    if not is_configured():
+        return jsonify({'error': "Gemini APIキーが設定されていません。"}), 400
+    
+    duration = int(request.args.get('duration', 5))
+    filters = {
+        'upload_date': request.args.get('upload_date', 'any'),
+        'video_duration': request.args.get('video_duration', 'any'),
+        'sort_by': request.args.get('sort_by', 'relevance'),
+    }
+    max_results = clamp_max_results(request.args.get('max_results', 10))
+    
+    def generate():
+        fetcher = get_transcript_fetcher()
+        futures = {}
+        try:
+            logger.info(f"Streaming analysis for keyword: {keyword}")
+            # 検索結果はキャッシュから、なければページが届くたびに送り、文字起こしの取得もすぐに始める
+            videos = []
+            page = []
+            for video in stream_trending_videos(keyword, max_results=max_results, **filters):
+                video['transcript'] = TRANSCRIPT_FAILED
+                if video['video_id'] not in futures:
+                    futures[video['video_id']] = fetcher.submit(video['video_id'])
+                videos.append(video)
+                page.append(video)
+                if len(page) >= 10:
+                    yield sse_event('videos', {'keyword': keyword, 'videos': page})
+                    page = []
+            if page:
+                yield sse_event('videos', {'keyword': keyword, 'videos': page})
+            if not videos:
+                yield sse_event('analysis_error', {'error': "条件に一致する動画が見つかりませんでした"})
+                return
+            
+            # 文字起こしは完了した順に通知する
+            by_id = {v['video_id']: v for v in videos}
+            for video_id, transcript, error in fetcher.collect(futures, deadline=transcript_batch_deadline()):
+                if error is None:
+                    by_id[video_id]['transcript'] = transcript_label(transcript)
+                yield sse_event('transcript', {
+                    'video_id': video_id,
+                    'available': bool(transcript),
+                    'excerpt': transcript_excerpt(transcript),
+                })
+            
+            inputs, common_phrases = generation_inputs(sort_videos(videos))
+            for chunk in generate_script_stream(inputs, duration, common_phrases=common_phrases):
+                yield sse_event('script', {'text': chunk})
+            yield sse_event('done', {})
+        except Exception as e:
+            logger.error(f"Streaming analysis error: {str(e)}")
+            yield sse_event('analysis_error', {'error': f"エラーが発生しました: {str(e)}"})
+        finally:
+            # 検索中に切断された場合も未開始の取得を残さない
+            for future in futures.values():
+                future.cancel()
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/batch', methods=['POST'])
+def batch_analyze():
+    """Analyze a list of keywords, streaming one JSON Lines record per keyword"""
+    from batch import run_batch, to_jsonl
+    
+    if not is_configured():
+        return jsonify({'error': "Gemini APIキーが設定されていません。"}), 400
+    data = request.get_json(silent=True) or {}
+    keywords = data.get('keywords') or []
+    if not isinstance(keywords, list) or not keywords:
+        return jsonify({'error': "keywordsにキーワードの配列を指定してください"}), 400
+    # 応答を返し始めた後では400にできないため、ストリーム開始前にすべて検証する
+    if not all(isinstance(keyword, str) for keyword in keywords):
+        return jsonify({'error': "keywordsには文字列だけを指定してください"}), 400
+    max_keywords = int(os.environ.get('BATCH_MAX_KEYWORDS', 50))
+    if len(keywords) > max_keywords:
+        return jsonify({'error': f"キーワードは{max_keywords}件までです"}), 400
+    try:
+        duration = int(data.get('duration', 5))
+    except (TypeError, ValueError):
+        return jsonify({'error': "durationには数値（分）を指定してください"}), 400
+    filters = {
+        'upload_date': data.get('upload_date', 'any'),
+        'video_duration': data.get('video_duration', 'any'),
+        'sort_by': data.get('sort_by', 'relevance'),
+    }
+    if not all(value is None or isinstance(value, str) for value in filters.values()):
+        return jsonify({'error': "upload_date・video_duration・sort_byには文字列を指定してください"}), 400
+    
+    results = run_batch(
+        keywords,
+        duration=duration,
+        max_results=clamp_max_results(data.get('max_results', 10)),
+        **filters,
+    )
+    return Response(
+        stream_with_context(to_jsonl(result) for result in results),
+        mimetype='application/x-ndjson'
+    )
+
+def transcript_max_age(transcript):
+    """字幕なし・取得失敗は後から取れる可能性があるので毎回再検証させる"""
+    return int(os.environ.get('TRANSCRIPT_HTTP_MAX_AGE', 86400)) if transcript else 0
+
 @app.route('/get_transcript/<video_id>')
 def get_transcript_route(video_id):
     try:
-        transcript = get_video_transcript(video_id)
-        return jsonify({'transcript': transcript})
+        if request.args.get('timestamps') == '1':
+            # フック分析用に時刻付きセグメントも返す
+            segments = get_video_transcript_segments(video_id)
+            transcript = segments_text(segments) if segments else None
+            return cached_json({'transcript': transcript, 'segments': segments}, transcript_max_age(transcript))
+        transcript = fetch_video_transcript(video_id)
+        return cached_json({'transcript': transcript}, transcript_max_age(transcript))
     except Exception as e:
         logger.error(f"Error getting transcript for video {video_id}: {str(e)}")
         return jsonify({'error': f"文字起こしの取得に失敗しました: {str(e)}"}), 400
 
+@app.route('/get_transcripts', methods=['GET', 'POST'])
+def get_transcripts_route():
+    """Return several transcripts in one response: ?ids=a,b,c or JSON {"video_ids": [...]}"""
+    if request.method == 'POST':
+        video_ids = (request.get_json(silent=True) or {}).get('video_ids') or []
+    else:
+        video_ids = [v for v in request.args.get('ids', '').split(',') if v]
+    video_ids = list(dict.fromkeys(str(v) for v in video_ids))
+    if not video_ids:
+        return jsonify({'error': "video_ids を指定してください"}), 400
+    limit = int(os.environ.get('TRANSCRIPT_BATCH_MAX_IDS', 50))
+    if len(video_ids) > limit:
+        return jsonify({'error': f"一度に取得できる文字起こしは{limit}件までです"}), 400
+    
+    try:
+        fetched = get_transcript_fetcher().fetch_many(video_ids, deadline=transcript_batch_deadline())
+    except Exception as e:
+        logger.error(f"Error getting transcripts for {video_ids}: {str(e)}")
+        return jsonify({'error': f"文字起こしの取得に失敗しました: {str(e)}"}), 400
+    transcripts = {video_id: fetched.get(video_id) for video_id in video_ids}
+    # 締め切りまでに取れなかった動画がある場合はキャッシュさせない
+    complete = len(fetched) == len(video_ids) and all(transcripts.values())
+    return cached_json(
+        {'transcripts': transcripts, 'missing': [v for v in video_ids if v not in fetched]},
+        transcript_max_age(complete)
+    )
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Prometheus text format: span histograms, counters and pool/cache gauges"""
+    return Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/circuits/metrics')
+def circuit_metrics():
+    return jsonify({
+        'circuits': breaker_stats(),
+        'transcript_concurrency': get_transcript_limiter().stats(),
+    })
+
+@app.route('/driver_pool/metrics')
+def driver_pool_metrics():
+    return jsonify(get_driver_pool().metrics())
+
+@app.route('/transcript_cache/metrics')
+def transcript_cache_metrics():
+    cache = get_transcript_cache()
+    if not cache:
+        return jsonify({'enabled': False})
+    return jsonify(dict(cache.stats(), enabled=True))
+
+@app.route('/search_cache/metrics')
+def search_cache_metrics():
+    return jsonify(get_search_cache().stats())
+
+@app.route('/generation_cache/metrics')
+def generation_cache_metrics():
+    return jsonify(generation_cache.stats())
+
 if __name__ == '__main__':
     try:
         logger.info("Starting Flask application...")
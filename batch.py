@@ -0,0 +1,114 @@
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+from scraper import (
+    get_trending_videos, get_transcript_fetcher, transcript_batch_deadline,
+    transcript_label, sort_videos, TRANSCRIPT_FAILED
+)
+from search_cache import make_search_key
+from ai_generator import generate_script
+from pipeline import generation_inputs
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """Token bucket limiting upstream requests per second across threads"""
+
+    def __init__(self, rate=None, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate or 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.rate:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+
+
+def run_batch(keywords, duration=5, upload_date='any', video_duration='any', sort_by='relevance',
+              concurrency=None, rate=None, max_results=10):
+    """Analyze several keywords, yielding one result dict per keyword as it completes.
+
+    キーワード間で重複する動画の文字起こしは一度だけ取得し、ブラウザプール・
+    HTTPセッション・文字起こし取得器はバッチ全体で共有する。
+    """
+    concurrency = concurrency or int(os.environ.get('BATCH_CONCURRENCY', 4))
+    rate = rate if rate is not None else float(os.environ.get('BATCH_RATE_LIMIT', 2))
+    limiter = RateLimiter(rate)
+    fetcher = get_transcript_fetcher()
+    filters = {'upload_date': upload_date, 'video_duration': video_duration, 'sort_by': sort_by}
+
+    transcript_futures = {}
+    futures_lock = threading.Lock()
+
+    def transcript_future(video_id):
+        with futures_lock:
+            future = transcript_futures.get(video_id)
+        if future is not None:
+            return future
+        limiter.acquire()
+        with futures_lock:
+            if video_id not in transcript_futures:
+                transcript_futures[video_id] = fetcher.submit(video_id)
+            return transcript_futures[video_id]
+
+    def process(keyword):
+        try:
+            limiter.acquire()
+            videos = get_trending_videos(keyword, max_results=max_results, **filters)
+            if not videos:
+                return {'keyword': keyword, 'status': 'error', 'error': "条件に一致する動画が見つかりませんでした"}
+
+            futures = {v['video_id']: transcript_future(v['video_id']) for v in videos}
+            wait(list(futures.values()), timeout=transcript_batch_deadline())
+            for video in videos:
+                future = futures[video['video_id']]
+                if future.done() and not future.cancelled() and future.exception() is None:
+                    video['transcript'] = transcript_label(future.result())
+                else:
+                    video['transcript'] = TRANSCRIPT_FAILED
+
+            sort_videos(videos)
+            inputs, common_phrases = generation_inputs(videos)
+            return {
+                'keyword': keyword,
+                'status': 'ok',
+                'videos': videos,
+                'generated_script': generate_script(inputs, duration, common_phrases=common_phrases),
+            }
+        except Exception as e:
+            logger.error(f"Batch analysis error for {keyword}: {str(e)}")
+            return {'keyword': keyword, 'status': 'error', 'error': str(e)}
+
+    # 表記ゆれだけのキーワードは1回にまとめる
+    unique = {}
+    for keyword in keywords:
+        if keyword and keyword.strip():
+            unique.setdefault(make_search_key(keyword, **filters), keyword.strip())
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='batch') as executor:
+        futures = [executor.submit(process, keyword) for keyword in unique.values()]
+        for future in as_completed(futures):
+            yield future.result()
+
+    logger.info(f"Batch finished: {len(unique)} keywords, {len(transcript_futures)} unique transcripts")
+
+
+def to_jsonl(result):
+    """Serialize one batch result as a JSON Lines record"""
+    return json.dumps(result, ensure_ascii=False) + '\n'
@@ -0,0 +1,121 @@
+"""Benchmark caption parsing: streaming parsers versus whole-document parsing.
+
+The recorded watch page and caption fixtures are scaled up (long videos,
+multi-megabyte watch pages) and both parsed from in-memory chunks, so the
+numbers reflect CPU and peak Python memory per transcript without network.
+
+    python benchmarks/bench_captions.py
+    python benchmarks/bench_captions.py --segments 500,5000,20000 --page-mb 2
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from captions import CHUNK_SIZE, iter_caption_segments, read_player_response, segments_text  # noqa: E402
+
+FIXTURES = os.path.join(ROOT, 'benchmarks', 'fixtures')
+_TEXT = re.compile(r'<text start="[^"]*" dur="([^"]*)">(.*?)</text>')
+
+
+class ChunkedResponse:
+    """Minimal stand-in for a streamed requests.Response"""
+
+    def __init__(self, body):
+        self.body = body
+        self.encoding = 'utf-8'
+
+    def iter_content(self, chunk_size=1, decode_unicode=False):
+        for start in range(0, len(self.body), chunk_size):
+            chunk = self.body[start:start + chunk_size]
+            yield chunk.decode(self.encoding, errors='ignore') if decode_unicode else chunk
+
+    def close(self):
+        pass
+
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding='utf-8') as f:
+        return f.read()
+
+
+def large_captions(segments):
+    """Repeat the fixture's caption lines until there are `segments` of them"""
+    lines = _TEXT.findall(read_fixture('captions.xml'))
+    body = []
+    start = 0.0
+    for i in range(segments):
+        duration, text = lines[i % len(lines)]
+        body.append(f'<text start="{start:.2f}" dur="{duration}">{text}</text>')
+        start += float(duration)
+    return ('<?xml version="1.0" encoding="utf-8" ?><transcript>\n'
+            + '\n'.join(body) + '\n</transcript>').encode('utf-8')
+
+
+def large_watch_page(page_mb):
+    """The fixture watch page padded with script after the player response, as real pages are"""
+    page = read_fixture('watch_page.html')
+    filler = '<script>var ytInitialData = ' + json.dumps({'x': 'a' * (page_mb * 1024 * 1024)}) + ';</script>'
+    return page.replace('</body>', filler + '</body>').encode('utf-8')
+
+
+def whole_document(page, captions):
+    """The previous implementation: full page text, lazy regex, json.loads, BeautifulSoup XML tree"""
+    from bs4 import BeautifulSoup
+    html = page.decode('utf-8')
+    match = re.search(r'ytInitialPlayerResponse\s*=\s*({.+?});', html)
+    json.loads(match.group(1))
+    soup = BeautifulSoup(captions.decode('utf-8'), 'xml')
+    return ' '.join(text.text for text in soup.find_all('text'))
+
+
+def streaming(page, captions):
+    read_player_response(ChunkedResponse(page))
+    return segments_text(iter_caption_segments(ChunkedResponse(captions).iter_content(CHUNK_SIZE)))
+
+
+def measure(func, page, captions, iterations):
+    func(page, captions)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func(page, captions)
+    elapsed = (time.perf_counter() - start) / iterations
+    tracemalloc.start()
+    func(page, captions)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed * 1000, peak / (1024 * 1024)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--segments', default='500,5000,20000', help='字幕セグメント数（カンマ区切り）')
+    parser.add_argument('--page-mb', type=int, default=1, help='プレイヤー情報の後ろに足す script のサイズ（MB）')
+    parser.add_argument('-n', '--iterations', type=int, default=5)
+    args = parser.parse_args()
+
+    try:
+        import bs4  # noqa: F401
+        parsers = {'whole': whole_document, 'stream': streaming}
+    except ImportError:
+        print("beautifulsoup4 が未インストールのため streaming のみ計測します")
+        parsers = {'stream': streaming}
+
+    page = large_watch_page(args.page_mb)
+    for count in (int(s) for s in args.segments.split(',')):
+        captions = large_captions(count)
+        results = {name: measure(func, page, captions, args.iterations) for name, func in parsers.items()}
+        if len(parsers) > 1:
+            assert whole_document(page, captions) == streaming(page, captions)
+        line = ' '.join(f"{name}={ms:8.2f}ms peak={mb:6.2f}MB" for name, (ms, mb) in results.items())
+        print(f"segments={count:6d} xml={len(captions) / 1024:8.1f}KB page={len(page) / 1024:8.1f}KB {line}")
+
+
+if __name__ == '__main__':
+    main()
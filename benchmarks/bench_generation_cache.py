@@ -0,0 +1,60 @@
+"""Benchmark generate_script with and without the generation cache.
+
+Runs offline against StubGenerativeModel with a simulated API latency.
+
+    python benchmarks/bench_generation_cache.py --latency 0.5 -n 20
+"""
+import argparse
+import logging
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ['GEMINI_STUB'] = '1'
+
+import ai_generator  # noqa: E402
+
+logging.getLogger('ai_generator').setLevel(logging.WARNING)
+
+VIDEOS = [
+    {
+        'title': f"投資の始め方 {i}",
+        'transcript': "こんにちは 今日は 新NISAの 始め方を 解説します。 " * 200,
+    }
+    for i in range(10)
+]
+
+
+def _run(iterations, use_cache):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        ai_generator.generate_script(VIDEOS, 5, use_cache=use_cache)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def _report(name, samples):
+    print(f"{name:<10} mean={statistics.mean(samples) * 1000:9.2f}ms "
+          f"p50={statistics.median(samples) * 1000:9.2f}ms "
+          f"max={max(samples) * 1000:9.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--latency', type=float, default=0.2, help='simulated Gemini latency in seconds')
+    parser.add_argument('-n', '--iterations', type=int, default=10)
+    args = parser.parse_args()
+
+    os.environ['GEMINI_STUB_LATENCY'] = str(args.latency)
+    _report('uncached', _run(args.iterations, use_cache=False))
+    _report('cached', _run(args.iterations, use_cache=True))
+    model = ai_generator._get_model()
+    print(f"model calls={model.calls} cache={ai_generator.generation_cache.stats()}")
+
+
+if __name__ == '__main__':
+    main()
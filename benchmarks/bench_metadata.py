@@ -0,0 +1,47 @@
+"""Micro-benchmark the view count / publish date / likes parser.
+
+    python benchmarks/bench_metadata.py -n 200000
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from video_metadata import parse_metadata, parse_view_count, parse_publish_date, is_publish_date  # noqa: E402
+
+VIEWS = [
+    "1.2万 回視聴", "3456 回視聴", "1,234,567 回視聴", "3.4億 回視聴", "12万 人が視聴中",
+    "1.2K views", "3M views", "1 view", "No views", "",
+]
+DATES = [
+    "3 日前", "2 週間前", "1 か月前", "ストリーミング開始: 5 時間前", "1 年前",
+    "3 days ago", "Streamed 1 year ago", "2024/01/15", "", "1.2万 回視聴",
+]
+
+
+def _bench(name, func, corpus, iterations):
+    now = time.time()
+    start = time.perf_counter()
+    for i in range(iterations):
+        func(corpus[i % len(corpus)], now)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<20} {elapsed / iterations * 1e9:8.0f} ns/op {iterations / elapsed:12,.0f} ops/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-n', '--iterations', type=int, default=100000)
+    args = parser.parse_args()
+
+    _bench('parse_view_count', lambda text, now: parse_view_count(text), VIEWS, args.iterations)
+    _bench('parse_publish_date', parse_publish_date, DATES, args.iterations)
+    _bench('is_publish_date', lambda text, now: is_publish_date(text), DATES, args.iterations)
+    pairs = list(zip(VIEWS, DATES))
+    _bench('parse_metadata', lambda pair, now: parse_metadata(pair[0], pair[1], now), pairs, args.iterations)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,195 @@
+"""Benchmark the analyze pipeline offline against recorded fixtures.
+
+A local fake YouTube server replays the search page, continuation, watch
+page and caption XML; the Selenium backend gets a fake WebDriver and
+Gemini is replaced by StubGenerativeModel. Caches are disabled unless
+--warm is given, so every iteration exercises the full code path.
+
+    python benchmarks/bench_pipeline.py
+    python benchmarks/bench_pipeline.py -c 8 -n 200 --latency 0.02
+    python benchmarks/bench_pipeline.py --save-baseline benchmarks/baseline.json
+    python benchmarks/bench_pipeline.py --baseline benchmarks/baseline.json
+"""
+import argparse
+import json
+import logging
+import os
+import resource
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SCENARIOS = ('search', 'transcript', 'pipeline', 'generate', 'analyze')
+
+
+def configure_environment(args):
+    """Set env before the app modules are imported (they read it at import time)"""
+    os.environ['GEMINI_STUB'] = '1'
+    os.environ['GEMINI_STUB_LATENCY'] = str(args.gemini_latency)
+    os.environ['ANALYZE_MODE'] = 'sync'
+    os.environ['JOB_WORKERS_INPROCESS'] = '0'
+    os.environ['SCRAPER_BACKEND'] = args.backend
+    os.environ.setdefault('JOB_QUEUE_PATH', os.path.join(ROOT, 'cache', 'bench_jobs.sqlite3'))
+    os.environ.setdefault('SIMILARITY_INDEX_PATH', os.path.join(ROOT, 'cache', 'bench_similarity.sqlite3'))
+    if not args.warm:
+        os.environ['TRANSCRIPT_CACHE_PATH'] = ''
+        os.environ['GENERATION_CACHE_SIZE'] = '0'
+        os.environ['SEARCH_CACHE_TTL'] = '0'
+        os.environ['SEARCH_CACHE_STALE_TTL'] = '0'
+
+
+def peak_rss_mb():
+    # Linuxでは KiB、macOSでは bytes で返る
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def run_scenario(func, iterations, concurrency):
+    """Call func(i) iterations times on concurrency threads and summarize latency"""
+    def timed(i):
+        start = time.perf_counter()
+        func(i)
+        return time.perf_counter() - start
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        samples = list(executor.map(timed, range(iterations)))
+    wall = time.perf_counter() - started
+    return {
+        'iterations': iterations,
+        'concurrency': concurrency,
+        'p50_ms': round(statistics.median(samples) * 1000, 2),
+        'p95_ms': round(percentile(samples, 95) * 1000, 2),
+        'max_ms': round(max(samples) * 1000, 2),
+        'throughput_per_s': round(iterations / wall, 2),
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def build_scenarios(args):
+    import scraper
+    import ai_generator
+    import app as web_app
+    from driver_pool import DriverPool
+    from fakes import FakeYouTubeServer, FakeWebDriver, install
+
+    server = FakeYouTubeServer(latency=args.latency).start()
+    install(server, scraper, failure_every=args.api_failure_every)
+    if args.backend == 'selenium':
+        scraper._driver_pool = DriverPool(
+            lambda: FakeWebDriver(latency=args.latency), max_size=args.concurrency
+        )
+
+    video_ids = [f"vid{i:08d}" for i in range(args.iterations)]
+    transcripts = [
+        {'title': f"動画{i}", 'transcript': scraper._fetch_video_transcript('vid00000001')}
+        for i in range(args.max_results)
+    ]
+    client = web_app.app.test_client()
+
+    def analyze(i):
+        response = client.post('/analyze', data={
+            'keyword': f"投資 {i}", 'max_results': str(args.max_results)
+        })
+        if response.status_code != 200:
+            raise RuntimeError(f"/analyze returned {response.status_code}")
+
+    scenarios = {
+        # キーワードを変えて単一フライトでの集約を避ける
+        'search': lambda i: scraper.get_trending_videos(f"投資 {i}", max_results=args.max_results),
+        'transcript': lambda i: scraper.get_video_transcript(video_ids[i]),
+        'pipeline': lambda i: scraper.get_trending_videos_with_transcripts(
+            f"投資 {i}", max_results=args.max_results
+        ),
+        'generate': lambda i: ai_generator.generate_script(transcripts, 5),
+        'analyze': analyze,
+    }
+    return server, scenarios
+
+
+def compare(results, baseline, tolerance):
+    """Print deltas against baseline; return the names of regressed scenarios"""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        checks = [
+            ('p50_ms', result['p50_ms'], base['p50_ms'], True),
+            ('p95_ms', result['p95_ms'], base['p95_ms'], True),
+            ('throughput_per_s', result['throughput_per_s'], base['throughput_per_s'], False),
+        ]
+        for metric, value, reference, lower_is_better in checks:
+            if not reference:
+                continue
+            change = (value - reference) / reference
+            worse = change > tolerance if lower_is_better else change < -tolerance
+            flag = 'REGRESSION' if worse else ''
+            print(f"  {name:<10} {metric:<17} {reference:>10} -> {value:>10} ({change:+.1%}) {flag}")
+            if worse:
+                regressions.append(name)
+    return sorted(set(regressions))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('scenarios', nargs='*', metavar='SCENARIO', help=f"subset of {', '.join(SCENARIOS)}")
+    parser.add_argument('-n', '--iterations', type=int, default=50)
+    parser.add_argument('-c', '--concurrency', type=int, default=4)
+    parser.add_argument('--max-results', type=int, default=10)
+    parser.add_argument('--backend', choices=['http', 'selenium'], default='http')
+    parser.add_argument('--latency', type=float, default=0.0, help='simulated YouTube latency per request (s)')
+    parser.add_argument('--gemini-latency', type=float, default=0.05, help='simulated Gemini latency (s)')
+    parser.add_argument('--api-failure-every', type=int, default=4,
+                        help='make every Nth transcript API call fail to exercise the HTML fallback (0: never)')
+    parser.add_argument('--warm', action='store_true', help='keep search/transcript/generation caches enabled')
+    parser.add_argument('--baseline', help='compare against this baseline JSON; exit 1 on regression')
+    parser.add_argument('--save-baseline', help='write the results to this baseline JSON')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed relative slowdown before flagging')
+    args = parser.parse_args()
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenario: {', '.join(sorted(unknown))}")
+
+    configure_environment(args)
+    logging.disable(logging.WARNING)
+    server, scenarios = build_scenarios(args)
+
+    results = {}
+    try:
+        for name in args.scenarios or SCENARIOS:
+            results[name] = run_scenario(scenarios[name], args.iterations, args.concurrency)
+            r = results[name]
+            print(f"{name:<10} p50={r['p50_ms']:9.2f}ms p95={r['p95_ms']:9.2f}ms "
+                  f"max={r['max_ms']:9.2f}ms {r['throughput_per_s']:8.2f}/s rss={r['peak_rss_mb']}MB")
+    finally:
+        server.stop()
+    print(f"fake server requests={server.requests}")
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write('\n')
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        print(f"compared with {args.baseline} (tolerance {args.tolerance:.0%}):")
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"regressed: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,75 @@
+"""Benchmark scoring and ranking a large synthetic snapshot history.
+
+    python benchmarks/bench_ranking.py -n 50000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from array import array
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from ranking import DEFAULT_WEIGHTS, SCORERS, rank  # noqa: E402
+from video_models import ResultSet  # noqa: E402
+
+
+def synthetic_results(size, channels, now, seed=0):
+    """ResultSet with log-normal views spread over the last 90 days"""
+    rng = random.Random(seed)
+    results = ResultSet()
+    columns = results._columns
+    columns['video_id'] = [f"v{i:011d}" for i in range(size)]
+    columns['title'] = [f"video {i}" for i in range(size)]
+    columns['channel'] = [f"channel {rng.randrange(channels)}" for _ in range(size)]
+    for name in ('thumbnail', 'views', 'publish_date'):
+        columns[name] = [''] * size
+    views = [int(rng.lognormvariate(9, 2)) for _ in range(size)]
+    columns['view_count'] = array('q', views)
+    columns['like_count'] = array('q', (int(v * 0.045) for v in views))
+    # 1割は公開日不明
+    columns['published_at'] = array('d', (
+        float('nan') if rng.random() < 0.1 else now - rng.uniform(0, 90 * 86400) for _ in range(size)
+    ))
+    columns['has_transcript'] = array('b', (rng.random() < 0.7 for _ in range(size)))
+    return results
+
+
+def _bench(name, func, repeat):
+    func()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    elapsed = (time.perf_counter() - start) / repeat
+    print(f"{name:<24} {elapsed * 1000:8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-n', '--size', type=int, default=50000, help='動画数')
+    parser.add_argument('--channels', type=int, default=2000, help='チャンネル数')
+    parser.add_argument('-r', '--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    now = time.time()
+    results = synthetic_results(args.size, args.channels, now)
+    columns = results.to_numpy()
+    print(f"{args.size:,} videos / {args.channels:,} channels")
+    for name, scorer in SCORERS.items():
+        _bench(name, lambda: scorer(columns, now), args.repeat)
+    _bench('rank (default weights)', lambda: rank(results, DEFAULT_WEIGHTS, now), args.repeat)
+
+    # 比較用: これまでの Python の sort（文字起こし優先、次に視聴回数）
+    rows = [
+        {'has_transcript': t, 'view_count': v}
+        for t, v in zip(results.column('has_transcript'), results.column('view_count'))
+    ]
+    _bench('python sort (legacy)', lambda: sorted(
+        rows, key=lambda x: (x['has_transcript'], x['view_count']), reverse=True
+    ), args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""Compare the HTTP (ytInitialData) and Selenium search backends.
+
+Offline (default): both backends read the same recorded fixtures, the HTTP
+backend through the fake YouTube server and the Selenium backend through
+FakeWebDriver, with the same simulated network latency.
+Live (--live KEYWORD): runs both backends against youtube.com.
+
+    python benchmarks/bench_search_backends.py
+    python benchmarks/bench_search_backends.py --latency 0.05 --max-results 20
+    python benchmarks/bench_search_backends.py --live "投資"
+"""
+import argparse
+import logging
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import scraper  # noqa: E402
+
+logging.getLogger('scraper').setLevel(logging.WARNING)
+
+
+def _time(func, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        result = func()
+        samples.append(time.perf_counter() - start)
+    return samples, result
+
+
+def _report(name, samples, result):
+    print(f"{name:<10} videos={len(result):<3} "
+          f"mean={statistics.mean(samples) * 1000:8.2f}ms "
+          f"min={min(samples) * 1000:8.2f}ms "
+          f"max={max(samples) * 1000:8.2f}ms")
+
+
+def bench_offline(iterations, latency, max_results):
+    from driver_pool import DriverPool
+    from fakes import FakeYouTubeServer, FakeWebDriver, install
+
+    server = FakeYouTubeServer(latency=latency).start()
+    install(server, scraper)
+    scraper._driver_pool = DriverPool(lambda: FakeWebDriver(latency=latency), max_size=1)
+    url = scraper.build_search_url('投資')
+    samples, result = _time(lambda: scraper._get_trending_videos_http(url, max_results), iterations)
+    _report('http', samples, result)
+    samples, result = _time(lambda: scraper._get_trending_videos_selenium(url, max_results), iterations)
+    _report('selenium', samples, result)
+
+
+def bench_live(keyword, iterations):
+    url = scraper.build_search_url(keyword)
+    samples, result = _time(lambda: scraper._get_trending_videos_http(url), iterations)
+    _report('http', samples, result)
+    samples, result = _time(lambda: scraper._get_trending_videos_selenium(url), iterations)
+    _report('selenium', samples, result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--live', metavar='KEYWORD', help='benchmark both backends against YouTube')
+    parser.add_argument('-n', '--iterations', type=int, default=None)
+    parser.add_argument('--latency', type=float, default=0.0, help='オフライン計測で1リクエストごとに加える遅延（秒）')
+    parser.add_argument('--max-results', type=int, default=10)
+    args = parser.parse_args()
+
+    if args.live:
+        bench_live(args.live, args.iterations or 3)
+    else:
+        bench_offline(args.iterations or 50, args.latency, args.max_results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""Benchmark the transcript similarity index as the corpus grows.
+
+    python benchmarks/bench_similarity.py --sizes 1000,5000,20000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from similarity_index import SimilarityIndex  # noqa: E402
+
+CHARS = 'あいうえおかきくけこさしすせそたちつてとなにぬねのはひふへほまみむめもやゆよらりるれろわをん今日動画投資株式円万'
+HOOKS = [
+    'みなさんこんにちは今日は絶対に知っておくべき話です',
+    'この動画を最後まで見ると人生が変わります',
+    'チャンネル登録と高評価よろしくお願いします',
+]
+
+
+def synthetic_transcript(rng, sentences=80):
+    body = '。'.join(''.join(rng.choice(CHARS) for _ in range(rng.randint(15, 40))) for _ in range(sentences))
+    return rng.choice(HOOKS) + '。' + body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='1000,5000,20000', help='計測するコーパスの件数（カンマ区切り）')
+    parser.add_argument('-q', '--queries', type=int, default=50)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as directory:
+        index = SimilarityIndex(os.path.join(directory, 'similarity.sqlite3'))
+        corpus = []
+        for size in sorted(int(s) for s in args.sizes.split(',')):
+            start = time.perf_counter()
+            added = 0
+            while len(corpus) < size:
+                transcript = synthetic_transcript(rng)
+                corpus.append(transcript)
+                index.add(f"v{len(corpus)}", transcript)
+                added += 1
+            add_ms = (time.perf_counter() - start) / max(added, 1) * 1000
+
+            # 半分は既存の文字起こしを少し変えた再アップロード
+            queries = [
+                rng.choice(corpus)[:-20] + 'おまけ' if i % 2 else synthetic_transcript(rng)
+                for i in range(args.queries)
+            ]
+            start = time.perf_counter()
+            found = sum(bool(index.query(q)) for q in queries)
+            query_ms = (time.perf_counter() - start) / len(queries) * 1000
+
+            sample = [synthetic_transcript(rng) for _ in range(20)]
+            start = time.perf_counter()
+            index.common_phrases(sample)
+            phrases_ms = (time.perf_counter() - start) * 1000
+            print(
+                f"corpus={size:>7,}  add={add_ms:6.2f} ms/doc  query={query_ms:6.2f} ms "
+                f"(matched {found}/{len(queries)})  common_phrases(20)={phrases_ms:7.2f} ms"
+            )
+
+
+if __name__ == '__main__':
+    main()
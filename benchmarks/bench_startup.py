@@ -0,0 +1,103 @@
+"""Benchmark cold start: importing the app and serving the first request.
+
+Each run is a fresh interpreter, like a new worker fork or a serverless
+cold start. Heavy optional modules that got imported along the way are
+listed, and --serverless fails if Selenium was loaded at all.
+
+    python benchmarks/bench_startup.py -n 10
+    python benchmarks/bench_startup.py --serverless
+    python benchmarks/bench_startup.py --save-baseline benchmarks/startup_baseline.json
+    python benchmarks/bench_startup.py --baseline benchmarks/startup_baseline.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ('selenium', 'webdriver_manager', 'google.generativeai', 'bs4', 'numpy')
+
+PROBE = f"""
+import json, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+response = app.app.test_client().get('/')
+served = time.perf_counter()
+print(json.dumps({{
+    'import_ms': (imported - start) * 1000,
+    'first_request_ms': (served - imported) * 1000,
+    'status': response.status_code,
+    'heavy_modules': [m for m in {HEAVY_MODULES!r} if m in sys.modules],
+}}))
+"""
+
+
+def run_probe(serverless):
+    env = dict(os.environ, GEMINI_STUB='1', JOB_WORKERS_INPROCESS='0')
+    if serverless:
+        env['SERVERLESS'] = '1'
+    output = subprocess.run(
+        [sys.executable, '-c', PROBE], cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-n', '--iterations', type=int, default=5)
+    parser.add_argument('--serverless', action='store_true', help='run with SERVERLESS=1')
+    parser.add_argument('--baseline', help='compare against this baseline JSON; exit 1 on regression')
+    parser.add_argument('--save-baseline', help='write the results to this baseline JSON')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed relative slowdown before flagging')
+    args = parser.parse_args()
+
+    # 1回目はバイトコードのキャッシュ作成を含むので捨てる
+    run_probe(args.serverless)
+    runs = [run_probe(args.serverless) for _ in range(args.iterations)]
+    mode = 'serverless' if args.serverless else 'default'
+    result = {
+        'import_ms': round(statistics.median(r['import_ms'] for r in runs), 2),
+        'first_request_ms': round(statistics.median(r['first_request_ms'] for r in runs), 2),
+        'heavy_modules': runs[-1]['heavy_modules'],
+    }
+    print(f"{mode}: import={result['import_ms']:.1f}ms first_request={result['first_request_ms']:.1f}ms "
+          f"status={runs[-1]['status']} heavy_modules={', '.join(result['heavy_modules']) or '-'}")
+
+    failed = False
+    if args.serverless and 'selenium' in result['heavy_modules']:
+        print("selenium was imported in serverless mode")
+        failed = True
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.save_baseline):
+            with open(args.save_baseline, encoding='utf-8') as f:
+                baseline = json.load(f)
+        baseline[mode] = result
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write('\n')
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            reference = json.load(f).get(mode)
+        if reference:
+            print(f"compared with {args.baseline} (tolerance {args.tolerance:.0%}):")
+            for metric in ('import_ms', 'first_request_ms'):
+                change = (result[metric] - reference[metric]) / reference[metric]
+                worse = change > args.tolerance
+                print(f"  {metric:<17} {reference[metric]:>8} -> {result[metric]:>8} ({change:+.1%})"
+                      f"{' REGRESSION' if worse else ''}")
+                failed = failed or worse
+            added = sorted(set(result['heavy_modules']) - set(reference['heavy_modules']))
+            if added:
+                print(f"  newly imported at startup: {', '.join(added)} REGRESSION")
+                failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,238 @@
+"""Local stand-ins for YouTube used by the offline benchmarks.
+
+FakeYouTubeServer replays the recorded fixtures over loopback HTTP and
+install() routes the shared session's youtube.com / i.ytimg.com traffic
+to it, so the real request, parsing and pooling code paths are exercised.
+FakeWebDriver serves the same search fixture to the Selenium backend.
+"""
+import json
+import os
+import threading
+import time
+import urllib.parse
+import xml.etree.ElementTree as ET
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from requests.adapters import HTTPAdapter
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding='utf-8') as f:
+        return f.read()
+
+
+class FakeYouTubeServer:
+    """Threaded HTTP server answering search, continuation, watch, caption and thumbnail requests"""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.requests = 0
+        self._lock = threading.Lock()
+        self.search_page = read_fixture('search_results.html').encode('utf-8')
+        self.continuation = read_fixture('continuation.json').encode('utf-8')
+        self.watch_page = read_fixture('watch_page.html')
+        self.captions = read_fixture('captions.xml').encode('utf-8')
+        self._httpd = ThreadingHTTPServer(('127.0.0.1', 0), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name='fake-youtube', daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def route(self, method, path, query, body):
+        """Return (status, content_type, payload) for a request"""
+        if path == '/results':
+            return 200, 'text/html; charset=utf-8', self.search_page
+        if path == '/youtubei/v1/search' and method == 'POST':
+            token = json.loads(body or b'{}').get('continuation')
+            if token == 'CONT_TOKEN_PAGE_2':
+                return 200, 'application/json', self.continuation
+            return 200, 'application/json', b'{"onResponseReceivedCommands": []}'
+        if path == '/watch':
+            video_id = query.get('v', [''])[0]
+            return 200, 'text/html; charset=utf-8', self.watch_page.replace('__VIDEO_ID__', video_id).encode('utf-8')
+        if path == '/api/timedtext':
+            return 200, 'text/xml; charset=utf-8', self.captions
+        if path.startswith('/vi/'):
+            # 高画質サムネイルは存在する扱いにする
+            return 200, 'image/jpeg', b''
+        return 404, 'text/plain', b'not found'
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # ヘッダーと本文を別々に書くため、Nagleと遅延ACKで応答ごとに約40ms待たされるのを防ぐ
+            disable_nagle_algorithm = True
+
+            def _respond(self, method):
+                parsed = urllib.parse.urlsplit(self.path)
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else b''
+                with server._lock:
+                    server.requests += 1
+                if server.latency:
+                    time.sleep(server.latency)
+                status, content_type, payload = server.route(
+                    method, parsed.path, urllib.parse.parse_qs(parsed.query), body
+                )
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                if method != 'HEAD':
+                    self.wfile.write(payload)
+
+            def do_GET(self):
+                self._respond('GET')
+
+            def do_POST(self):
+                self._respond('POST')
+
+            def do_HEAD(self):
+                self._respond('HEAD')
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+class RedirectAdapter(HTTPAdapter):
+    """Transport adapter that sends every request to base_url, keeping path and query"""
+
+    def __init__(self, base_url, **kwargs):
+        self.base_url = base_url
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        parts = urllib.parse.urlsplit(request.url)
+        base = urllib.parse.urlsplit(self.base_url)
+        request.url = urllib.parse.urlunsplit((base.scheme, base.netloc, parts.path, parts.query, ''))
+        return super().send(request, **kwargs)
+
+
+class FakeTranscriptApi:
+    """Stand-in for YouTubeTranscriptApi that reads captions from the fake server.
+
+    Every failure_every-th video raises NoTranscriptFound, so the HTML fallback
+    path is measured too.
+    """
+
+    session_factory = None
+    failure_every = 4
+
+    @classmethod
+    def get_transcript(cls, video_id, languages=None):
+        if cls.failure_every and sum(map(ord, video_id)) % cls.failure_every == 0:
+            from youtube_transcript_api import NoTranscriptFound
+
+            raise NoTranscriptFound(video_id, languages or [], None)
+        response = cls.session_factory().get(
+            f"https://www.youtube.com/api/timedtext?v={video_id}&lang=ja", timeout=5
+        )
+        root = ET.fromstring(response.content)
+        return [
+            {'text': node.text or '', 'start': float(node.get('start')), 'duration': float(node.get('dur'))}
+            for node in root.iter('text')
+        ]
+
+
+def install(server, scraper_module, failure_every=4):
+    """Route the scraper's HTTP session and transcript API to the fake server"""
+    from http_client import get_session
+
+    session = get_session()
+    adapter = RedirectAdapter(server.base_url, pool_connections=16, pool_maxsize=64)
+    session.mount('https://www.youtube.com/', adapter)
+    session.mount('https://i.ytimg.com/', adapter)
+    FakeTranscriptApi.session_factory = get_session
+    FakeTranscriptApi.failure_every = failure_every
+    scraper_module.YouTubeTranscriptApi = FakeTranscriptApi
+
+
+class _FakeNode:
+    def __init__(self, text='', attributes=None):
+        self.text = text
+        self._attributes = attributes or {}
+
+    def get_attribute(self, name):
+        return self._attributes.get(name)
+
+
+class FakeVideoElement:
+    """ytd-video-renderer element built from a recorded videoRenderer"""
+
+    def __init__(self, renderer, text_of):
+        video_id = renderer['videoId']
+        self._nodes = {
+            '#video-title': _FakeNode(
+                text_of(renderer.get('title')),
+                {'href': f"https://www.youtube.com/watch?v={video_id}"}
+            ),
+            '#channel-name': _FakeNode(text_of(renderer.get('ownerText'))),
+        }
+        self._metadata = [
+            _FakeNode(text_of(renderer.get('shortViewCountText'))),
+            _FakeNode(text_of(renderer.get('publishedTimeText'))),
+        ]
+
+    def find_element(self, by, selector):
+        from selenium.common.exceptions import NoSuchElementException
+
+        node = self._nodes.get(selector)
+        if node is None:
+            raise NoSuchElementException(selector)
+        return node
+
+    def find_elements(self, by, selector):
+        return self._metadata if selector == '#metadata-line span' else []
+
+
+class FakeWebDriver:
+    """WebDriver stand-in that reveals page_size more results per scroll"""
+
+    def __init__(self, page_size=10, latency=0.0):
+        import scraper
+
+        initial = scraper._extract_json_object(read_fixture('search_results.html'), scraper._INITIAL_DATA)
+        renderers, _ = scraper._parse_section_contents(scraper._initial_section_contents(initial))
+        more, _ = scraper._parse_section_contents(
+            scraper._continuation_section_contents(json.loads(read_fixture('continuation.json')))
+        )
+        self._elements = [FakeVideoElement(r, scraper._text_of) for r in renderers + more]
+        self.page_size = page_size
+        self.latency = latency
+        self._visible = 0
+
+    def get(self, url):
+        time.sleep(self.latency)
+        self._visible = self.page_size
+
+    def find_elements(self, by, selector):
+        if selector == 'ytd-video-renderer':
+            return self._elements[:self._visible]
+        return []
+
+    def execute_script(self, script, *args):
+        if 'scrollTo' in script:
+            time.sleep(self.latency / 2)
+            self._visible += self.page_size
+            return None
+        return 1
+
+    def quit(self):
+        pass
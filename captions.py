@@ -0,0 +1,157 @@
+import codecs
+import html
+import json
+import re
+import xml.etree.ElementTree as ET
+
+# プレイヤー情報を探すのはページ先頭からこのバイト数まで（それ以上は読まない）
+PLAYER_RESPONSE_MAX_BYTES = 4 * 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+
+_PLAYER_RESPONSE_START = re.compile(r'ytInitialPlayerResponse\s*=\s*\{')
+_MARKER_TAIL = 64
+# 文字列の外では括弧と引用符、文字列の中では引用符とエスケープだけを見ればよい
+_STRUCTURE = re.compile(r'[{}"]')
+_IN_STRING = re.compile(r'["\\]')
+
+
+class JsonObjectScanner:
+    """Find where a JSON object ends while its text arrives in pieces.
+
+    Only braces and string delimiters are inspected, so the cost is one
+    regex pass over the object instead of re-decoding a growing buffer.
+    """
+
+    def __init__(self):
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.end = None
+
+    def feed(self, text, offset=0):
+        """Scan text from offset; return the index just past the object once it is complete"""
+        position = offset
+        while self.end is None:
+            if self.escaped:
+                # 前のチャンクの末尾が \ だった場合は次の1文字を飛ばす
+                if position >= len(text):
+                    return None
+                position += 1
+                self.escaped = False
+            pattern = _IN_STRING if self.in_string else _STRUCTURE
+            match = pattern.search(text, position)
+            if match is None:
+                return None
+            char = match.group()
+            position = match.end()
+            if self.in_string:
+                if char == '\\':
+                    self.escaped = True
+                else:
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char == '{':
+                self.depth += 1
+            else:
+                self.depth -= 1
+                if self.depth == 0:
+                    self.end = position
+        return self.end
+
+
+def read_player_response(response, max_bytes=PLAYER_RESPONSE_MAX_BYTES):
+    """Decode ytInitialPlayerResponse from a streamed watch page response.
+
+    Reading stops as soon as the object is complete (the rest of the page is
+    never downloaded) or once max_bytes of the page have been read, whether
+    or not the assignment was found. Returns None if it is not found.
+    """
+    # 上限はデコード前のバイト数で数え、マルチバイト文字がチャンクをまたいでも壊さないように逐次デコードする
+    decoder = codecs.getincrementaldecoder(response.encoding or 'utf-8')(errors='replace')
+    buffer = ''
+    scanner = None
+    scanned = 0
+    received = 0
+    try:
+        for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+            received += len(chunk)
+            buffer += decoder.decode(chunk)
+            if scanner is None:
+                match = _PLAYER_RESPONSE_START.search(buffer)
+                if match is None:
+                    # 代入文がチャンクの境界をまたいでも見つかるように末尾だけ残す
+                    buffer = buffer[-_MARKER_TAIL:]
+                else:
+                    buffer = buffer[match.end() - 1:]
+                    scanner = JsonObjectScanner()
+                    scanned = 0
+            if scanner is not None:
+                end = scanner.feed(buffer, scanned)
+                if end is not None:
+                    return json.loads(buffer[:end])
+                scanned = len(buffer)
+            # 目印が見つかったかどうかに関係なく、読み込んだ量が上限を超えたら打ち切る
+            if received > max_bytes:
+                return None
+        return None
+    finally:
+        response.close()
+
+
+def select_caption_track(player_response, languages):
+    """Return the first caption track in preferred language order (or the first track)"""
+    tracks = (
+        (player_response or {}).get('captions', {})
+        .get('playerCaptionsTracklistRenderer', {})
+        .get('captionTracks', [])
+    )
+    for language in languages:
+        track = next((t for t in tracks if t.get('languageCode') == language), None)
+        if track:
+            return track
+    return tracks[0] if tracks else None
+
+
+def _segment(element):
+    if element.tag == 'text':
+        # 既定の timedtext 形式: <text start="秒" dur="秒">
+        start = float(element.get('start') or 0)
+        duration = float(element.get('dur') or 0)
+    else:
+        # srv3 形式: <p t="ミリ秒" d="ミリ秒"><s>...</s></p>
+        start = float(element.get('t') or 0) / 1000
+        duration = float(element.get('d') or 0) / 1000
+    # 字幕本文は実体参照が二重にエスケープされていることがある
+    text = html.unescape(''.join(element.itertext())).strip()
+    return {'text': text, 'start': start, 'duration': duration}
+
+
+def iter_caption_segments(chunks):
+    """Yield {'text', 'start', 'duration'} segments from caption XML byte chunks.
+
+    XMLPullParser consumes the response as it streams in and each segment is
+    detached from the tree once yielded, so memory stays flat regardless of
+    caption length.
+    """
+    parser = ET.XMLPullParser(events=('start', 'end'))
+    open_elements = []
+    for chunk in chunks:
+        parser.feed(chunk)
+        for event, element in parser.read_events():
+            if event == 'start':
+                open_elements.append(element)
+                continue
+            open_elements.pop()
+            if element.tag in ('text', 'p'):
+                segment = _segment(element)
+                if segment['text']:
+                    yield segment
+                if open_elements:
+                    open_elements[-1].remove(element)
+    parser.close()
+
+
+def segments_text(segments):
+    """Join segment texts into the plain transcript string"""
+    return ' '.join(segment['text'] for segment in segments)
@@ -0,0 +1,179 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class DriverPoolExhausted(Exception):
+    """Raised when no WebDriver session becomes available in time"""
+
+
+class _PooledDriver:
+    """WebDriverと使用回数をまとめて管理するラッパー"""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.uses = 0
+        self.created_at = time.monotonic()
+
+
+class DriverPool:
+    """Bounded pool of reusable headless Chrome sessions"""
+
+    def __init__(self, factory, max_size=2, max_uses=20, acquire_timeout=30.0):
+        self._factory = factory
+        self.max_size = max(1, int(max_size))
+        self.max_uses = max(1, int(max_uses))
+        self.acquire_timeout = acquire_timeout
+
+        self._idle = []
+        self._live = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+        # メトリクス
+        self._acquisitions = 0
+        self._created = 0
+        self._recycled = 0
+        self._crashed = 0
+        self._timeouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def _is_healthy(self, pooled):
+        """セッションが応答するか確認"""
+        try:
+            pooled.driver.execute_script("return 1")
+            return True
+        except Exception as e:
+            logger.warning(f"WebDriver session failed health check: {str(e)}")
+            return False
+
+    def _quit(self, pooled):
+        try:
+            pooled.driver.quit()
+        except Exception as e:
+            logger.error(f"Error quitting WebDriver: {str(e)}")
+
+    def _discard(self, pooled, crashed=False):
+        """セッションを破棄して空き枠を通知"""
+        self._quit(pooled)
+        with self._cond:
+            self._live -= 1
+            if crashed:
+                self._crashed += 1
+            else:
+                self._recycled += 1
+            self._cond.notify()
+
+    def acquire(self, timeout=None):
+        """Check out a session, blocking up to timeout (0 fails fast)"""
+        if timeout is None:
+            timeout = self.acquire_timeout
+        start = time.monotonic()
+        deadline = start + timeout
+
+        while True:
+            pooled = None
+            create = False
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise DriverPoolExhausted("WebDriver pool is closed")
+                    if self._idle:
+                        pooled = self._idle.pop()
+                        break
+                    if self._live < self.max_size:
+                        # 枠を先に確保してからロック外で起動する
+                        self._live += 1
+                        create = True
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise DriverPoolExhausted(
+                            f"No WebDriver session available within {timeout}s"
+                        )
+                    self._cond.wait(remaining)
+
+            if create:
+                try:
+                    pooled = _PooledDriver(self._factory())
+                except Exception:
+                    with self._cond:
+                        self._live -= 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self._created += 1
+            elif not self._is_healthy(pooled):
+                self._discard(pooled, crashed=True)
+                continue
+
+            waited = time.monotonic() - start
+            with self._cond:
+                self._acquisitions += 1
+                self._wait_total += waited
+                self._wait_max = max(self._wait_max, waited)
+            pooled.uses += 1
+            return pooled
+
+    def release(self, pooled, discard=False):
+        """Return a session to the pool, recycling it when worn out or broken"""
+        if discard:
+            self._discard(pooled, crashed=True)
+            return
+        if pooled.uses >= self.max_uses:
+            logger.info(f"Recycling WebDriver session after {pooled.uses} uses")
+            self._discard(pooled)
+            return
+
+        with self._cond:
+            if not self._closed:
+                self._idle.append(pooled)
+                self._cond.notify()
+                return
+        self._discard(pooled)
+
+    @contextmanager
+    def session(self, timeout=None):
+        """Context manager yielding a pooled WebDriver"""
+        pooled = self.acquire(timeout)
+        failed = False
+        try:
+            yield pooled.driver
+        except BaseException:
+            # GeneratorExit（ストリームの途中切断）でも必ず返却する
+            failed = True
+            raise
+        finally:
+            # 例外後にセッションが生きていなければ破棄する
+            self.release(pooled, discard=failed and not self._is_healthy(pooled))
+
+    def metrics(self):
+        """Return a snapshot of pool counters"""
+        with self._cond:
+            return {
+                'max_size': self.max_size,
+                'size': self._live,
+                'idle': len(self._idle),
+                'in_use': self._live - len(self._idle),
+                'acquisitions': self._acquisitions,
+                'created': self._created,
+                'recycled': self._recycled,
+                'crashed': self._crashed,
+                'timeouts': self._timeouts,
+                'wait_seconds_total': round(self._wait_total, 3),
+                'wait_seconds_max': round(self._wait_max, 3),
+            }
+
+    def close(self):
+        """Quit all idle sessions and refuse new checkouts"""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        for pooled in idle:
+            self._discard(pooled)
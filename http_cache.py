@@ -0,0 +1,54 @@
+import gzip
+import hashlib
+import json
+
+from flask import Response, request
+
+try:
+    import brotli
+except ImportError:  # brotli は任意。なければ gzip のみ
+    brotli = None
+
+# これより小さい本文は圧縮しても得がない
+MIN_COMPRESS_BYTES = 512
+
+
+def _choose_encoding():
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+
+def _compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6)
+
+
+def cached_json(payload, max_age=0):
+    """JSON response with an ETag, conditional 304s, Cache-Control and gzip/brotli.
+
+    max_age=0 means "cache but revalidate every time" (no-cache), which still
+    avoids re-sending the body when the ETag matches.
+    """
+    body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    response = Response(body, mimetype='application/json')
+    # 圧縮形式が違っても内容は同じなので弱いETagにする
+    response.set_etag(hashlib.sha1(body).hexdigest(), weak=True)
+    response.cache_control.public = True
+    if max_age:
+        response.cache_control.max_age = max_age
+    else:
+        response.cache_control.no_cache = True
+    response.vary.add('Accept-Encoding')
+
+    response.make_conditional(request)
+    if response.status_code == 200 and len(body) >= MIN_COMPRESS_BYTES:
+        encoding = _choose_encoding()
+        if encoding:
+            response.set_data(_compress(body, encoding))
+            response.headers['Content-Encoding'] = encoding
+    return response
@@ -0,0 +1,62 @@
+import logging
+import os
+import threading
+import urllib.parse
+from contextlib import contextmanager
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+
+class HostLimitedSession(requests.Session):
+    """requests.Session with keep-alive pooling and a per-host concurrency cap"""
+
+    def __init__(self, per_host_limit=8, pool_maxsize=32):
+        super().__init__()
+        self.per_host_limit = per_host_limit
+        self._host_semaphores = {}
+        self._lock = threading.Lock()
+
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=pool_maxsize)
+        self.mount('https://', adapter)
+        self.mount('http://', adapter)
+
+    def _semaphore_for(self, url):
+        host = urllib.parse.urlsplit(url).hostname or ''
+        with self._lock:
+            semaphore = self._host_semaphores.get(host)
+            if semaphore is None:
+                semaphore = self._host_semaphores[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return semaphore
+
+    @contextmanager
+    def host_slot(self, url):
+        """同一ホストへの同時接続数を制限する"""
+        semaphore = self._semaphore_for(url)
+        semaphore.acquire()
+        try:
+            yield
+        finally:
+            semaphore.release()
+
+    def request(self, method, url, *args, **kwargs):
+        with self.host_slot(url):
+            return super().request(method, url, *args, **kwargs)
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Return the process-wide keep-alive HTTP session"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = HostLimitedSession(
+                per_host_limit=int(os.environ.get('HTTP_PER_HOST_LIMIT', 8)),
+                pool_maxsize=int(os.environ.get('HTTP_POOL_SIZE', 32)),
+            )
+        return _session
@@ -0,0 +1,169 @@
+import threading
+import time
+from contextlib import contextmanager
+
+PREFIX = 'yt_trend_'
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(pairs):
+    if not pairs:
+        return ''
+    body = ','.join(
+        f'{k}="' + v.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+        for k, v in pairs
+    )
+    return '{' + body + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus layout"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+
+class MetricsRegistry:
+    """Process-wide counters, span histograms and gauge collectors.
+
+    各処理の所要時間は span() でヒストグラムに記録し、フォールバックや失敗は
+    inc() で数える。既存のプール・キャッシュの統計は collector として登録し、
+    /metrics の出力時にゲージとして読み出す。
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._counters = {}
+        self._histograms = {}
+        self._collectors = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, seconds, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.buckets)
+            histogram.observe(seconds)
+        spans = getattr(self._local, 'spans', None)
+        if spans is not None:
+            spans.append((labels.get('span', name), seconds))
+
+    @contextmanager
+    def span(self, name, **labels):
+        """Time the block into the span_seconds histogram (and the active trace)"""
+        start = time.perf_counter()
+        status = 'ok'
+        try:
+            yield
+        except BaseException:
+            status = 'error'
+            raise
+        finally:
+            self.observe('span_seconds', time.perf_counter() - start, span=name, status=status, **labels)
+
+    @contextmanager
+    def trace(self):
+        """Collect this thread's spans into a list for a per-request breakdown"""
+        previous = getattr(self._local, 'spans', None)
+        spans = []
+        self._local.spans = spans
+        try:
+            yield spans
+        finally:
+            self._local.spans = previous
+
+    def register_collector(self, name, collect):
+        """Register collect() -> dict of numeric stats exported as name_<key> gauges"""
+        with self._lock:
+            self._collectors[name] = collect
+
+    def snapshot(self):
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {
+                key: (h.buckets, list(h.counts), h.count, h.sum) for key, h in self._histograms.items()
+            }
+            collectors = dict(self._collectors)
+        return counters, histograms, collectors
+
+    def render_prometheus(self):
+        """Return all metrics in the Prometheus text exposition format"""
+        counters, histograms, collectors = self.snapshot()
+        lines = []
+
+        for name in sorted({name for name, _ in counters}):
+            metric = PREFIX + name
+            lines.append(f"# TYPE {metric} counter")
+            for (counter_name, labels), value in sorted(counters.items()):
+                if counter_name == name:
+                    lines.append(f"{metric}{_format_labels(labels)} {_format_value(value)}")
+
+        for name in sorted({name for name, _ in histograms}):
+            metric = PREFIX + name
+            lines.append(f"# TYPE {metric} histogram")
+            for (histogram_name, labels), (buckets, counts, count, total) in sorted(histograms.items()):
+                if histogram_name != name:
+                    continue
+                for bound, bucket_count in zip(buckets, counts):
+                    pairs = labels + (('le', _format_value(float(bound))),)
+                    lines.append(f"{metric}_bucket{_format_labels(pairs)} {bucket_count}")
+                lines.append(f"{metric}_bucket{_format_labels(labels + (('le', '+Inf'),))} {count}")
+                lines.append(f"{metric}_sum{_format_labels(labels)} {_format_value(total)}")
+                lines.append(f"{metric}_count{_format_labels(labels)} {count}")
+
+        for name, collect in sorted(collectors.items()):
+            try:
+                stats = collect() or {}
+            except Exception:
+                stats = {}
+            for key, value in sorted(stats.items()):
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                metric = f"{PREFIX}{name}_{key}"
+                lines.append(f"# TYPE {metric} gauge")
+                lines.append(f"{metric} {_format_value(value)}")
+
+        return '\n'.join(lines) + '\n'
+
+
+def summarize(spans):
+    """Aggregate [(name, seconds)] into {name: milliseconds} in first-seen order"""
+    totals = {}
+    for name, seconds in spans:
+        totals[name] = totals.get(name, 0.0) + seconds
+    return {name: round(seconds * 1000, 2) for name, seconds in totals.items()}
+
+
+def server_timing(spans):
+    """Format spans as a Server-Timing header value"""
+    return ', '.join(f"{name};dur={ms}" for name, ms in summarize(spans).items())
+
+
+metrics = MetricsRegistry()
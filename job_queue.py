@@ -0,0 +1,254 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+
+from sqlite_util import connect_local, ensure_directory
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    dedup_key TEXT NOT NULL,
+    params TEXT NOT NULL,
+    status TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at);
+CREATE INDEX IF NOT EXISTS jobs_dedup_key ON jobs (dedup_key, status);
+"""
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class QueueFullError(Exception):
+    """Raised when the number of pending jobs reaches the configured bound"""
+
+
+class JobQueue:
+    """SQLite-backed job broker shared by the web tier and worker processes"""
+
+    def __init__(self, path, max_pending=100, retention=86400):
+        self.path = path
+        self.max_pending = max_pending
+        self.retention = retention
+        self._local = threading.local()
+
+        ensure_directory(path)
+        self._connect().executescript(_SCHEMA)
+
+    def _connect(self):
+        # トランザクションは BEGIN IMMEDIATE で明示的に開始する
+        return connect_local(self._local, self.path, isolation_level=None, row_factory=sqlite3.Row)
+
+    def _transaction(self, conn):
+        # 取り出し処理の競合を避けるため書き込みロックを先に取得する
+        conn.execute("BEGIN IMMEDIATE")
+
+    @staticmethod
+    def dedup_key(kind, params):
+        payload = json.dumps([kind, params], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def enqueue(self, kind, params):
+        """Queue a job and return (job_id, created); identical pending jobs are reused"""
+        key = self.dedup_key(kind, params)
+        conn = self._connect()
+        self._transaction(conn)
+        try:
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE dedup_key = ? AND status IN (?, ?) ORDER BY created_at LIMIT 1",
+                (key, QUEUED, RUNNING)
+            ).fetchone()
+            if row:
+                conn.execute("COMMIT")
+                return row['id'], False
+
+            pending = conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = ?", (QUEUED,)
+            ).fetchone()[0]
+            if pending >= self.max_pending:
+                raise QueueFullError(f"Job queue is full ({pending} pending)")
+
+            job_id = uuid.uuid4().hex
+            conn.execute(
+                "INSERT INTO jobs (id, kind, dedup_key, params, status, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, kind, key, json.dumps(params, ensure_ascii=False), QUEUED, time.time())
+            )
+            conn.execute("COMMIT")
+            return job_id, True
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def claim(self):
+        """Atomically take the oldest queued job, or return None"""
+        conn = self._connect()
+        self._transaction(conn)
+        try:
+            row = conn.execute(
+                "SELECT id, kind, params FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1",
+                (QUEUED,)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = ?, started_at = ? WHERE id = ?",
+                (RUNNING, time.time(), row['id'])
+            )
+            conn.execute("COMMIT")
+            return {'id': row['id'], 'kind': row['kind'], 'params': json.loads(row['params'])}
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def complete(self, job_id, result):
+        self._finish(job_id, DONE, result=json.dumps(result, ensure_ascii=False))
+
+    def fail(self, job_id, error):
+        self._finish(job_id, FAILED, error=error)
+
+    def _finish(self, job_id, status, result=None, error=None):
+        conn = self._connect()
+        conn.execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ? AND status = ?",
+            (status, result, error, time.time(), job_id, RUNNING)
+        )
+
+    def fail_expired(self, timeout):
+        """Fail running jobs older than timeout (e.g. their worker died)"""
+        conn = self._connect()
+        cursor = conn.execute(
+            "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE status = ? AND started_at < ?",
+            (FAILED, "タイムアウトしました", time.time(), RUNNING, time.time() - timeout)
+        )
+        return cursor.rowcount
+
+    def purge(self):
+        """Delete finished jobs older than the retention period"""
+        conn = self._connect()
+        conn.execute(
+            "DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?",
+            (DONE, FAILED, time.time() - self.retention)
+        )
+
+    def get(self, job_id):
+        """Return the job as a dict (result decoded), or None"""
+        row = self._connect().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job['params'] = json.loads(job['params'])
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        del job['dedup_key']
+        return job
+
+    def stats(self):
+        rows = self._connect().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        counts = {QUEUED: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+        counts.update({status: count for status, count in rows})
+        return counts
+
+
+class JobWorkerPool:
+    """Threads that claim jobs from a JobQueue and run the matching handler"""
+
+    def __init__(self, queue, handlers, concurrency=2, job_timeout=300, poll_interval=0.5):
+        self.queue = queue
+        self.handlers = handlers
+        self.concurrency = max(1, int(concurrency))
+        self.job_timeout = job_timeout
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._threads = []
+        # タイムアウト後も処理スレッドが終わるまで枠を使い続ける（実際の同時実行数を上限内に保つ）
+        self._slots = threading.BoundedSemaphore(self.concurrency)
+
+    def start(self):
+        for i in range(self.concurrency):
+            thread = threading.Thread(target=self._work, name=f'job-worker-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"Started {self.concurrency} job workers")
+
+    def stop(self):
+        self._stop.set()
+
+    def join(self):
+        for thread in self._threads:
+            thread.join()
+
+    def _work(self):
+        last_maintenance = 0
+        while not self._stop.is_set():
+            try:
+                now = time.monotonic()
+                if now - last_maintenance > 30:
+                    last_maintenance = now
+                    self.queue.fail_expired(self.job_timeout * 2)
+                    self.queue.purge()
+
+                if not self._slots.acquire(timeout=self.poll_interval):
+                    continue
+                try:
+                    job = self.queue.claim()
+                except Exception:
+                    self._slots.release()
+                    raise
+                if job is None:
+                    self._slots.release()
+                    self._stop.wait(self.poll_interval)
+                    continue
+                self._run(job)
+            except Exception as e:
+                logger.error(f"Job worker error: {str(e)}")
+                self._stop.wait(self.poll_interval)
+
+    def _run(self, job):
+        """Run a claimed job; its slot is released when the handler thread exits"""
+        handler = self.handlers.get(job['kind'])
+        if handler is None:
+            self._slots.release()
+            self.queue.fail(job['id'], f"Unknown job kind: {job['kind']}")
+            return
+
+        outcome = {}
+
+        def target():
+            try:
+                outcome['result'] = handler(**job['params'])
+            except Exception as e:
+                outcome['error'] = str(e)
+            finally:
+                self._slots.release()
+
+        # スレッドは強制終了できないため、タイムアウト時は結果を破棄して失敗扱いにする
+        runner = threading.Thread(target=target, name=f"job-{job['id']}", daemon=True)
+        try:
+            runner.start()
+        except Exception:
+            self._slots.release()
+            raise
+        runner.join(self.job_timeout)
+
+        if runner.is_alive():
+            logger.error(f"Job {job['id']} timed out after {self.job_timeout}s")
+            self.queue.fail(job['id'], "タイムアウトしました")
+        elif 'error' in outcome:
+            logger.error(f"Job {job['id']} failed: {outcome['error']}")
+            self.queue.fail(job['id'], outcome['error'])
+        else:
+            self.queue.complete(job['id'], outcome['result'])
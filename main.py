@@ -0,0 +1,195 @@
+import argparse
+import logging
+import sys
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def _add_filter_arguments(parser):
+    parser.add_argument('--duration', type=int, default=5, help='目標動画時間（分）')
+    parser.add_argument('--upload-date', default='any', choices=['any', 'hour', 'today', 'week', 'month'])
+    parser.add_argument('--video-duration', default='any', choices=['any', 'short', 'medium', 'long'])
+    parser.add_argument('--sort-by', default='relevance', choices=['relevance', 'date', 'view_count', 'rating'])
+    parser.add_argument('--max-results', type=int, default=10, help='分析する上位動画の件数')
+
+
+def _read_keywords(args):
+    keywords = list(args.keywords or [])
+    if args.keywords_file:
+        with open(args.keywords_file, encoding='utf-8') as f:
+            keywords.extend(line.strip() for line in f if line.strip())
+    return keywords
+
+
+def cmd_batch(args):
+    from batch import run_batch, to_jsonl
+
+    keywords = _read_keywords(args)
+    if not keywords:
+        logger.error("キーワードを指定してください")
+        return 1
+
+    out = open(args.output, 'w', encoding='utf-8') if args.output != '-' else sys.stdout
+    failed = 0
+    try:
+        for result in run_batch(
+            keywords,
+            duration=args.duration,
+            upload_date=args.upload_date,
+            video_duration=args.video_duration,
+            sort_by=args.sort_by,
+            max_results=args.max_results,
+            concurrency=args.concurrency,
+            rate=args.rate,
+        ):
+            out.write(to_jsonl(result))
+            out.flush()
+            if result['status'] != 'ok':
+                failed += 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 1 if failed else 0
+
+
+def cmd_monitor(args):
+    import json
+    import time
+    from pipeline import run_incremental, AnalysisError
+
+    while True:
+        try:
+            result = run_incremental(
+                args.keyword,
+                duration=args.duration,
+                upload_date=args.upload_date,
+                video_duration=args.video_duration,
+                sort_by=args.sort_by,
+                max_results=args.max_results,
+            )
+            summary = {k: v for k, v in result.items() if k != 'videos'}
+            print(json.dumps(summary, ensure_ascii=False), flush=True)
+        except AnalysisError as e:
+            logger.error(str(e))
+        if args.interval <= 0:
+            return 0
+        time.sleep(args.interval)
+
+
+def cmd_export(args):
+    from pipeline import load_snapshot_results
+
+    results = load_snapshot_results(
+        args.keyword,
+        upload_date=args.upload_date,
+        video_duration=args.video_duration,
+        sort_by=args.sort_by,
+        max_results=args.max_results,
+    )
+    if args.output.endswith('.parquet'):
+        results.to_parquet(args.output)
+    elif args.output.endswith('.npz'):
+        import numpy as np
+        np.savez(args.output, **{k: v for k, v in results.to_numpy().items() if v.dtype != object})
+    else:
+        import json
+        with open(args.output, 'w', encoding='utf-8') as f:
+            for video in results.to_dicts(include_transcripts=args.transcripts):
+                f.write(json.dumps(video, ensure_ascii=False) + '\n')
+    logger.info(f"{len(results)}件の動画を {args.output} に書き出しました")
+    return 0
+
+
+def cmd_rank(args):
+    import json
+    from pipeline import load_snapshot_results
+    from ranking import default_weights, parse_weights, rank
+
+    results = load_snapshot_results(
+        args.keyword,
+        upload_date=args.upload_date,
+        video_duration=args.video_duration,
+        sort_by=args.sort_by,
+        max_results=args.max_results,
+    )
+    try:
+        weights = parse_weights(args.weights) if args.weights else default_weights()
+    except ValueError as e:
+        logger.error(str(e))
+        return 2
+    order, scores = rank(results, weights)
+    out = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+    try:
+        for i in order[:args.top]:
+            video = results[int(i)].to_dict()
+            video['score'] = round(float(scores[i]), 4)
+            out.write(json.dumps(video, ensure_ascii=False) + '\n')
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    logger.info(f"{len(results)}件の動画をスコア順に並べました（重み: {weights}）")
+    return 0
+
+
+def cmd_index(args):
+    from pipeline import get_similarity_index
+    from scraper import get_transcript_cache
+
+    index = get_similarity_index()
+    cache = get_transcript_cache()
+    if index is None or cache is None:
+        logger.error("類似度インデックスまたは文字起こしキャッシュが無効になっています")
+        return 1
+    added = sum(index.add(video_id, transcript) for video_id, transcript in cache.iter_transcripts())
+    logger.info(f"{added}件の文字起こしを追加しました（合計 {index.document_count()}件）")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="YouTube トレンド分析 CLI")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    batch = subparsers.add_parser('batch', help='複数キーワードをまとめて分析しJSON Linesで出力')
+    batch.add_argument('keywords', nargs='*', help='分析するキーワード')
+    batch.add_argument('-f', '--keywords-file', help='1行1キーワードのファイル')
+    batch.add_argument('-o', '--output', default='-', help='出力先のJSON Linesファイル（既定: 標準出力）')
+    batch.add_argument('--concurrency', type=int, default=None, help='同時に分析するキーワード数')
+    batch.add_argument('--rate', type=float, default=None, help='YouTubeへの1秒あたりのリクエスト上限')
+    _add_filter_arguments(batch)
+    batch.set_defaults(func=cmd_batch)
+
+    monitor = subparsers.add_parser('monitor', help='前回のスナップショットとの差分だけを取得して分析')
+    monitor.add_argument('keyword', help='監視するキーワード')
+    monitor.add_argument('--interval', type=float, default=0, help='繰り返し実行する間隔（秒）。0で1回のみ')
+    _add_filter_arguments(monitor)
+    monitor.set_defaults(func=cmd_monitor)
+
+    export = subparsers.add_parser('export', help='保存済みスナップショットの動画を Parquet / NumPy(.npz) / JSON Lines で書き出し')
+    export.add_argument('keyword', nargs='?', help='対象キーワード（省略時はすべて）')
+    export.add_argument('-o', '--output', required=True, help='出力先（拡張子 .parquet / .npz / .jsonl で形式を選択）')
+    export.add_argument('--transcripts', action='store_true', help='JSON Linesに文字起こしも含める')
+    _add_filter_arguments(export)
+    export.set_defaults(func=cmd_export)
+
+    rank = subparsers.add_parser('rank', help='保存済みスナップショットの動画をスコア順に並べて出力')
+    rank.add_argument('keyword', nargs='?', help='対象キーワード（省略時はすべて）')
+    rank.add_argument('-w', '--weights', help='スコア関数と重み（例: velocity=0.5,transcript=0.3,recency=0.2）')
+    rank.add_argument('--top', type=int, default=20, help='出力する件数')
+    rank.add_argument('-o', '--output', default='-', help='出力先のJSON Linesファイル（既定: 標準出力）')
+    _add_filter_arguments(rank)
+    rank.set_defaults(func=cmd_rank)
+
+    index = subparsers.add_parser('index', help='キャッシュ済みの文字起こしを類似度インデックスに登録')
+    index.set_defaults(func=cmd_index)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
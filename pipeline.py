@@ -0,0 +1,295 @@
+import os
+import logging
+import threading
+from scraper import (
+    get_trending_videos, get_trending_videos_with_transcripts, get_transcript_fetcher,
+    transcript_batch_deadline, transcript_label, transcript_excerpt, has_transcript, sort_videos,
+    CACHE_DIR, TRANSCRIPT_UNAVAILABLE, TRANSCRIPT_FAILED
+)
+from search_cache import make_search_key
+from ai_generator import generate_script
+from job_queue import JobQueue, JobWorkerPool
+from snapshot_store import SnapshotStore, snapshot_key
+from instrumentation import metrics, summarize
+
+logger = logging.getLogger(__name__)
+
+ANALYZE_JOB = 'analyze'
+
+
+class AnalysisError(Exception):
+    """User-facing error raised by the analysis pipeline"""
+
+
+def prompt_inputs(videos):
+    """Build the structured per-video input expected by generate_script"""
+    return [
+        {
+            'title': v['title'],
+            # 「取得できません」などの表示用テキストはプロンプトに含めない
+            'transcript': '' if v.get('transcript') in (TRANSCRIPT_UNAVAILABLE, TRANSCRIPT_FAILED) else v.get('transcript', ''),
+        }
+        for v in videos
+    ]
+
+
+_similarity_index = None
+_similarity_index_failed = False
+_similarity_index_lock = threading.Lock()
+
+
+def get_similarity_index():
+    """Return the process-wide transcript similarity index, or None when disabled"""
+    global _similarity_index, _similarity_index_failed
+    path = os.environ.get('SIMILARITY_INDEX_PATH', os.path.join(CACHE_DIR, 'similarity.sqlite3'))
+    if not path:
+        return None
+    with _similarity_index_lock:
+        # 開けなかった場合は呼び出しのたびに再試行しない
+        if _similarity_index is None and not _similarity_index_failed:
+            try:
+                from similarity_index import SimilarityIndex
+                _similarity_index = SimilarityIndex(
+                    path,
+                    threshold=float(os.environ.get('SIMILARITY_THRESHOLD', 0.8)),
+                )
+            except Exception as e:
+                logger.error(f"Error opening similarity index at {path}, continuing without it: {str(e)}")
+                _similarity_index_failed = True
+        return _similarity_index
+
+
+def generation_inputs(videos):
+    """Return (prompt inputs, common phrases) with near-duplicate videos left out.
+
+    再アップロードや切り抜きなど、上位の動画とほぼ同じ文字起こしの動画は
+    duplicate_of を付けて生成の入力から外す。今回の結果にない過去の動画と
+    ほぼ同じものは、元の動画が入力に含まれないため外さずに reupload_of を付ける。
+    """
+    inputs = prompt_inputs(videos)
+    index = get_similarity_index()
+    if index is None:
+        return inputs, []
+    items = [(v['video_id'], i['transcript']) for v, i in zip(videos, inputs) if i['transcript']]
+    try:
+        with metrics.span('similarity'):
+            duplicates = index.near_duplicates(items)
+            batch_ids = {video_id for video_id, _ in items}
+            reuploads = {}
+            for video_id, transcript in items:
+                if video_id in duplicates:
+                    continue
+                matches = index.query(transcript, exclude=batch_ids)
+                if matches:
+                    reuploads[video_id] = matches[0][0]
+            for video_id, transcript in items:
+                index.add(video_id, transcript)
+            common_phrases = index.common_phrases(
+                [t for video_id, t in items if video_id not in duplicates],
+                limit=int(os.environ.get('COMMON_PHRASES', 8)),
+            )
+    except Exception as e:
+        logger.error(f"Error querying similarity index: {str(e)}")
+        return inputs, []
+
+    if duplicates:
+        metrics.inc('near_duplicates_dropped_total', len(duplicates))
+        logger.info(f"Dropping near-duplicate videos before generation: {duplicates}")
+    if reuploads:
+        metrics.inc('reuploads_detected_total', len(reuploads))
+        logger.info(f"Videos matching previously indexed transcripts: {reuploads}")
+    for video in videos:
+        if video['video_id'] in duplicates:
+            video['duplicate_of'] = duplicates[video['video_id']]
+        elif video['video_id'] in reuploads:
+            video['reupload_of'] = reuploads[video['video_id']]
+    kept = [i for v, i in zip(videos, inputs) if v['video_id'] not in duplicates]
+    return kept, common_phrases
+
+
+def excerpt_videos(videos):
+    """Replace full transcripts with short excerpts for result pages and stored job results"""
+    return [
+        {
+            **{k: v for k, v in video.items() if k != 'transcript'},
+            'has_transcript': has_transcript(video),
+            'transcript_excerpt': transcript_excerpt(video.get('transcript')),
+        }
+        for video in videos
+    ]
+
+
+def run_analysis(keyword, duration=5, upload_date='any', video_duration='any', sort_by='relevance',
+                 max_results=10):
+    """Scrape, fetch transcripts and generate a script for one keyword"""
+    logger.info(f"Analyzing trends for keyword: {keyword}")
+
+    # 動画と文字起こしを取得
+    videos = get_trending_videos_with_transcripts(
+        keyword,
+        upload_date=upload_date,
+        video_duration=video_duration,
+        sort_by=sort_by,
+        max_results=max_results
+    )
+
+    if not videos:
+        raise AnalysisError("条件に一致する動画が見つかりませんでした")
+
+    # Geminiで分析
+    inputs, common_phrases = generation_inputs(videos)
+    with metrics.span('generate'):
+        new_script = generate_script(inputs, duration, common_phrases=common_phrases)
+
+    return {
+        'keyword': keyword,
+        'videos': videos,
+        'generated_script': new_script,
+    }
+
+
+_snapshot_store = None
+_snapshot_store_lock = threading.Lock()
+
+
+def get_snapshot_store():
+    """Return the process-wide snapshot store"""
+    global _snapshot_store
+    with _snapshot_store_lock:
+        if _snapshot_store is None:
+            _snapshot_store = SnapshotStore(
+                os.environ.get('SNAPSHOT_STORE_PATH', os.path.join(CACHE_DIR, 'snapshots.sqlite3'))
+            )
+        return _snapshot_store
+
+
+def run_incremental(keyword, duration=5, upload_date='any', video_duration='any', sort_by='relevance',
+                    max_results=10):
+    """Analyze a keyword, fetching only what changed since its previous snapshot"""
+    store = get_snapshot_store()
+    key = snapshot_key(make_search_key(keyword, upload_date, video_duration, sort_by) + (max_results,))
+
+    videos = get_trending_videos(
+        keyword,
+        upload_date=upload_date,
+        video_duration=video_duration,
+        sort_by=sort_by,
+        max_results=max_results,
+        # 検索キャッシュの視聴回数では前回との差分が出ないため毎回取り直す
+        fresh=True
+    )
+    if not videos:
+        raise AnalysisError("条件に一致する動画が見つかりませんでした")
+
+    previous = store.latest(key)
+    video_ids = [v['video_id'] for v in videos]
+    previous_ids = previous['video_ids'] if previous else []
+    new_ids = [vid for vid in video_ids if vid not in previous_ids]
+    dropped_ids = [vid for vid in previous_ids if vid not in video_ids]
+
+    # 前回から残っている動画は保存済みの文字起こしを再利用する
+    transcripts = store.known_transcripts(key, [vid for vid in video_ids if vid in previous_ids])
+    missing = [vid for vid in video_ids if vid not in transcripts]
+    if missing:
+        fetched = get_transcript_fetcher().fetch_many(missing, deadline=transcript_batch_deadline())
+        transcripts.update({vid: transcript_label(t) for vid, t in fetched.items()})
+    for video in videos:
+        video['transcript'] = transcripts.get(video['video_id'], TRANSCRIPT_FAILED)
+    sort_videos(videos)
+
+    # 動画の顔ぶれが前回と同じなら生成を省略する
+    unchanged = previous is not None and set(previous_ids) == set(video_ids) and previous['generated_script']
+    if unchanged:
+        logger.info(f"No change for {keyword} since last snapshot, reusing generated script")
+        new_script = previous['generated_script']
+    else:
+        inputs, common_phrases = generation_inputs(videos)
+        new_script = generate_script(inputs, duration, common_phrases=common_phrases)
+
+    taken_at = store.record(
+        key,
+        videos,
+        new_script,
+        views_of=lambda v: v['view_count'],
+        # 取得失敗は次回再取得するため保存しない
+        transcript_of=lambda v: None if v['transcript'] == TRANSCRIPT_FAILED else v['transcript'],
+    )
+
+    return {
+        'keyword': keyword,
+        'videos': videos,
+        'generated_script': new_script,
+        'taken_at': taken_at,
+        'new_video_ids': new_ids,
+        'dropped_video_ids': dropped_ids,
+        'transcripts_fetched': len(missing),
+        'generation_skipped': bool(unchanged),
+        'view_deltas': store.view_deltas(key, video_ids),
+    }
+
+
+def load_snapshot_results(keyword=None, upload_date='any', video_duration='any', sort_by='relevance',
+                          max_results=10):
+    """Load a keyword's snapshot videos (or every keyword's when None) as a ResultSet"""
+    key = None
+    if keyword is not None:
+        key = snapshot_key(make_search_key(keyword, upload_date, video_duration, sort_by) + (max_results,))
+    return get_snapshot_store().load_results(key, missing_labels=(TRANSCRIPT_UNAVAILABLE, TRANSCRIPT_FAILED))
+
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+_workers = None
+_workers_lock = threading.Lock()
+
+
+def get_job_queue():
+    """Return the process-wide job queue"""
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            _job_queue = JobQueue(
+                os.environ.get('JOB_QUEUE_PATH', os.path.join(CACHE_DIR, 'jobs.sqlite3')),
+                max_pending=int(os.environ.get('JOB_QUEUE_MAX_PENDING', 100)),
+            )
+        return _job_queue
+
+
+def run_analysis_job(**params):
+    """Job handler: run_analysis plus the per-stage timing breakdown"""
+    with metrics.trace() as spans:
+        result = run_analysis(**params)
+    result['timings'] = summarize(spans)
+    # 全文はキャッシュ済みなので、ジョブ結果には抜粋だけを保存する
+    result['videos'] = excerpt_videos(result['videos'])
+    return result
+
+
+def create_worker_pool():
+    """Build a worker pool for the analysis job handlers"""
+    return JobWorkerPool(
+        get_job_queue(),
+        {ANALYZE_JOB: run_analysis_job},
+        concurrency=int(os.environ.get('JOB_WORKER_CONCURRENCY', 2)),
+        job_timeout=float(os.environ.get('JOB_TIMEOUT', 300)),
+    )
+
+
+def ensure_inprocess_workers():
+    """Start worker threads in the web process unless a separate worker runs them"""
+    global _workers
+    if os.environ.get('JOB_WORKERS_INPROCESS', '1') == '0':
+        return
+    with _workers_lock:
+        if _workers is None:
+            _workers = create_worker_pool()
+            _workers.start()
+
+
+def enqueue_analysis(**params):
+    """Queue an analysis job and return its id"""
+    ensure_inprocess_workers()
+    job_id, created = get_job_queue().enqueue(ANALYZE_JOB, params)
+    if not created:
+        logger.info(f"Reusing pending analysis job {job_id}")
+    return job_id
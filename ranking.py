@@ -0,0 +1,130 @@
+import os
+import time
+
+import numpy as np
+
+from video_models import ResultSet
+
+_HOUR = 3600.0
+
+# スコア計算に使う列（表示用の文字列列は NumPy 配列にしない）
+RANKING_COLUMNS = ('channel', 'view_count', 'published_at', 'has_transcript')
+
+DEFAULT_WEIGHTS = {
+    'velocity': 0.4,
+    'channel': 0.2,
+    'transcript': 0.3,
+    'recency': 0.1,
+}
+
+
+def _minmax(values):
+    low = values.min()
+    span = values.max() - low
+    if span <= 0:
+        return np.zeros_like(values)
+    return (values - low) / span
+
+
+def _age_hours(columns, now):
+    """Hours since publish; unknown dates take the median known age (or 30 days)"""
+    age = (now - columns['published_at']) / _HOUR
+    known = ~np.isnan(age)
+    fill = np.median(age[known]) if known.any() else 30 * 24.0
+    return np.maximum(np.where(known, age, fill), 1.0)
+
+
+def _channel_codes(channels):
+    """Integer code per channel name (dict lookup is far cheaper than sorting object arrays)"""
+    codes = {}
+    return np.fromiter((codes.setdefault(c, len(codes)) for c in channels), dtype=np.intp, count=len(channels))
+
+
+def velocity(columns, now):
+    """Views per hour since publish, log-scaled"""
+    return _minmax(np.log1p(columns['view_count'] / _age_hours(columns, now)))
+
+
+def channel_relative(columns, now):
+    """How far a video's views exceed its channel's mean (in log space)"""
+    log_views = np.log1p(columns['view_count'].astype(np.float64))
+    channel_index = _channel_codes(columns['channel'])
+    totals = np.bincount(channel_index, weights=log_views)
+    counts = np.bincount(channel_index)
+    return _minmax(log_views - (totals / counts)[channel_index])
+
+
+def transcript(columns, now):
+    """1 when a transcript is available (it can feed the prompt)"""
+    return columns['has_transcript'].astype(np.float64)
+
+
+def recency(columns, now, half_life_hours=None):
+    """Exponential decay by age with a configurable half-life"""
+    half_life = half_life_hours or float(os.environ.get('RANKING_HALF_LIFE_HOURS', 72))
+    return np.exp2(-_age_hours(columns, now) / half_life)
+
+
+def views(columns, now):
+    """Raw popularity, log-scaled"""
+    return _minmax(np.log1p(columns['view_count'].astype(np.float64)))
+
+
+SCORERS = {
+    'velocity': velocity,
+    'channel': channel_relative,
+    'transcript': transcript,
+    'recency': recency,
+    'views': views,
+}
+
+
+def parse_weights(text):
+    """Parse "velocity=0.5,transcript=0.3" into a weights dict"""
+    weights = {}
+    for part in (text or '').split(','):
+        if not part.strip():
+            continue
+        name, _, value = part.partition('=')
+        name = name.strip()
+        if name not in SCORERS:
+            raise ValueError(f"Unknown scoring function: {name}")
+        weights[name] = float(value) if value.strip() else 1.0
+    return weights
+
+
+def default_weights():
+    return parse_weights(os.environ.get('RANKING_WEIGHTS')) or dict(DEFAULT_WEIGHTS)
+
+
+def score(columns, weights=None, now=None):
+    """Weighted sum of the selected scoring functions over column arrays"""
+    weights = default_weights() if weights is None else weights
+    now = time.time() if now is None else now
+    total = np.zeros(len(columns['view_count']), dtype=np.float64)
+    for name, weight in weights.items():
+        if weight:
+            total += weight * SCORERS[name](columns, now)
+    return total
+
+
+def rank(results, weights=None, now=None):
+    """Return (order, scores) for a ResultSet, best first"""
+    if not len(results):
+        return np.array([], dtype=np.intp), np.array([], dtype=np.float64)
+    scores = score(results.to_numpy(RANKING_COLUMNS), weights, now)
+    # 同点は元の並び（検索結果の順位）を保つ
+    order = np.argsort(-scores, kind='stable')
+    return order, scores
+
+
+def rank_videos(videos, weights=None, now=None, has_transcript=None):
+    """Sort a list of video dicts in place by score, adding a 'score' field"""
+    if not videos:
+        return videos
+    order, scores = rank(ResultSet.from_dicts(videos, has_transcript=has_transcript), weights, now)
+    ranked = [videos[i] for i in order]
+    for i, video in zip(order, ranked):
+        video['score'] = round(float(scores[i]), 4)
+    videos[:] = ranked
+    return videos
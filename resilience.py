@@ -0,0 +1,237 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit is open"""
+
+
+class CircuitBreaker:
+    """Failure-rate circuit breaker over a sliding time window.
+
+    直近 window 秒の失敗率が failure_rate 以上（最低 min_calls 件）になると
+    open になり、open_for 秒の間は呼び出しを即座に拒否する。その後は
+    half-open として probes 件だけ試行を通し、成功すれば閉じ、失敗すれば再び開く。
+    """
+
+    def __init__(self, name, failure_rate=0.5, window=30.0, min_calls=10, open_for=30.0, probes=1):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.window = window
+        self.min_calls = min_calls
+        self.open_for = open_for
+        self.probes = max(1, probes)
+        self._outcomes = deque()
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._opens = 0
+        self._rejected = 0
+        self._lock = threading.Lock()
+
+    def _trim(self, now):
+        while self._outcomes and now - self._outcomes[0][0] > self.window:
+            self._outcomes.popleft()
+
+    def _open(self, now):
+        self._state = OPEN
+        self._opened_at = now
+        self._probes_in_flight = 0
+        self._opens += 1
+        logger.warning(f"Circuit {self.name} opened for {self.open_for}s")
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.open_for:
+                return HALF_OPEN
+            return self._state
+
+    def allow(self):
+        """Return True if a call may proceed; open circuits reject immediately"""
+        now = time.monotonic()
+        with self._lock:
+            if self._state == OPEN:
+                if now - self._opened_at < self.open_for:
+                    self._rejected += 1
+                    return False
+                self._state = HALF_OPEN
+                self._probes_in_flight = 0
+            if self._state == HALF_OPEN:
+                if self._probes_in_flight >= self.probes:
+                    self._rejected += 1
+                    return False
+                self._probes_in_flight += 1
+            return True
+
+    def record_success(self):
+        now = time.monotonic()
+        with self._lock:
+            if self._state == HALF_OPEN:
+                # 試行が成功したら閉じ、過去の失敗は忘れる
+                self._state = CLOSED
+                self._outcomes.clear()
+                logger.info(f"Circuit {self.name} closed")
+            self._outcomes.append((now, True))
+            self._trim(now)
+
+    def record_failure(self):
+        now = time.monotonic()
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._open(now)
+                return
+            if self._state == OPEN:
+                return
+            self._outcomes.append((now, False))
+            self._trim(now)
+            failures = sum(1 for _, ok in self._outcomes if not ok)
+            if len(self._outcomes) >= self.min_calls and failures / len(self._outcomes) >= self.failure_rate:
+                self._open(now)
+
+    def release(self):
+        """Return a half-open probe slot without recording an outcome"""
+        with self._lock:
+            if self._state == HALF_OPEN and self._probes_in_flight:
+                self._probes_in_flight -= 1
+
+    @contextmanager
+    def guard(self, is_failure=lambda e: True):
+        """Run the block if allowed, recording the outcome; raise CircuitOpenError otherwise.
+
+        is_failure(e) decides whether an exception counts against the upstream
+        (e.g. "this video has no captions" is not an upstream failure).
+        """
+        if not self.allow():
+            raise CircuitOpenError(f"Circuit {self.name} is open")
+        try:
+            yield
+        except Exception as e:
+            if is_failure(e):
+                self.record_failure()
+            else:
+                self.record_success()
+            raise
+        except BaseException:
+            self.release()
+            raise
+        else:
+            self.record_success()
+
+    def stats(self):
+        state = self.state
+        with self._lock:
+            total = len(self._outcomes)
+            failures = sum(1 for _, ok in self._outcomes if not ok)
+            return {
+                'open': int(state == OPEN),
+                'half_open': int(state == HALF_OPEN),
+                'window_calls': total,
+                'window_failures': failures,
+                'opens': self._opens,
+                'rejected': self._rejected,
+            }
+
+
+class AdaptiveLimiter:
+    """AIMD concurrency limit: grow by one per window of successes, halve on failure"""
+
+    def __init__(self, initial=8, min_limit=1, max_limit=32, decrease=0.5, cooldown=1.0):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self._limit = float(min(self.max_limit, max(self.min_limit, initial)))
+        self._in_flight = 0
+        self._last_decrease = 0.0
+        self._decreases = 0
+        self._cond = threading.Condition()
+
+    @property
+    def limit(self):
+        return int(self._limit)
+
+    def acquire(self, timeout=None):
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._in_flight < int(self._limit), timeout):
+                return False
+            self._in_flight += 1
+            return True
+
+    def release(self, ok=None):
+        """Free a slot; ok=True grows the limit additively, ok=False shrinks it multiplicatively"""
+        with self._cond:
+            self._in_flight -= 1
+            if ok is True:
+                self._limit = min(self.max_limit, self._limit + 1 / self._limit)
+            elif ok is False:
+                now = time.monotonic()
+                # 同時に失敗した呼び出しでまとめて何度も縮めない
+                if now - self._last_decrease >= self.cooldown:
+                    self._limit = max(self.min_limit, self._limit * self.decrease)
+                    self._last_decrease = now
+                    self._decreases += 1
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, is_failure=lambda e: True):
+        self.acquire()
+        try:
+            yield
+        except Exception as e:
+            self.release(False if is_failure(e) else None)
+            raise
+        except BaseException:
+            self.release()
+            raise
+        else:
+            self.release(True)
+
+    def stats(self):
+        with self._cond:
+            return {
+                'limit': int(self._limit),
+                'in_flight': self._in_flight,
+                'max_limit': self.max_limit,
+                'decreases': self._decreases,
+            }
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name):
+    """Return the process-wide circuit breaker for an upstream"""
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = _breakers[name] = CircuitBreaker(
+                name,
+                failure_rate=float(os.environ.get('CIRCUIT_FAILURE_RATE', 0.5)),
+                window=float(os.environ.get('CIRCUIT_WINDOW', 30)),
+                min_calls=int(os.environ.get('CIRCUIT_MIN_CALLS', 10)),
+                open_for=float(os.environ.get('CIRCUIT_OPEN_SECONDS', 30)),
+            )
+        return breaker
+
+
+def breaker_stats():
+    """Return {name_key: value} for every breaker, flattened for the metrics registry"""
+    with _breakers_lock:
+        breakers = dict(_breakers)
+    return {
+        f"{name}_{key}": value
+        for name, breaker in sorted(breakers.items())
+        for key, value in breaker.stats().items()
+    }
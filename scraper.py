@@ -1,28 +1,39 @@
+import os
+import atexit
 import logging
-from bs4 import BeautifulSoup
-import requests
-from youtube_transcript_api import YouTubeTranscriptApi
+import tempfile
+import threading
+from concurrent.futures import wait
+from youtube_transcript_api import YouTubeTranscriptApi, TranscriptsDisabled, NoTranscriptFound, VideoUnavailable
 import urllib.parse
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException, ElementClickInterceptedException
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.action_chains import ActionChains
-import time
 import json
 import re
-from concurrent.futures import ThreadPoolExecutor
+from driver_pool import DriverPool
+from transcript_cache import TranscriptCache
+from search_cache import SearchCache, make_search_key
+from transcript_fetcher import TranscriptFetcher
+from http_client import get_session
+from captions import CHUNK_SIZE, iter_caption_segments, read_player_response, segments_text, select_caption_track
+from thumbnails import ThumbnailResolver, best_from_thumbnail_list, thumbnail_url
+from instrumentation import metrics
+from resilience import AdaptiveLimiter, CircuitOpenError, get_breaker
+from video_metadata import parse_metadata, parse_view_count, has_view_count, is_publish_date
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def selenium_enabled():
+    """サーバーレス環境（SERVERLESS=1）ではブラウザを起動できないのでSeleniumを使わない"""
+    return os.environ.get('SERVERLESS') != '1'
+
 def setup_driver():
     """Set up Chrome WebDriver with appropriate options"""
+    # Seleniumは読み込みが重いので、ブラウザが必要になった時に初めてimportする
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+    from selenium.webdriver.chrome.options import Options
+    
     try:
         chrome_options = Options()
         chrome_options.add_argument('--no-sandbox')
@@ -30,325 +41,730 @@ def setup_driver():
         chrome_options.add_argument('--disable-dev-shm-usage')
         
         service = Service()
-        driver = webdriver.Chrome(service=service, options=chrome_options)
+        with metrics.span('setup_driver'):
+            driver = webdriver.Chrome(service=service, options=chrome_options)
         return driver
     except Exception as e:
         logger.error(f"Error setting up WebDriver: {str(e)}")
         raise
 
+_driver_pool = None
+_driver_pool_lock = threading.Lock()
+
+def get_driver_pool():
+    """Return the process-wide WebDriver pool, creating it on first use"""
+    global _driver_pool
+    with _driver_pool_lock:
+        if _driver_pool is None:
+            _driver_pool = DriverPool(
+                setup_driver,
+                max_size=int(os.environ.get('DRIVER_POOL_SIZE', 2)),
+                max_uses=int(os.environ.get('DRIVER_POOL_MAX_USES', 20)),
+                acquire_timeout=float(os.environ.get('DRIVER_POOL_TIMEOUT', 30)),
+            )
+            atexit.register(_driver_pool.close)
+        return _driver_pool
+
+_thumbnail_resolver = None
+_thumbnail_resolver_lock = threading.Lock()
+
+def get_thumbnail_resolver():
+    """Return the process-wide thumbnail resolver"""
+    global _thumbnail_resolver
+    with _thumbnail_resolver_lock:
+        if _thumbnail_resolver is None:
+            _thumbnail_resolver = ThumbnailResolver(get_session)
+        return _thumbnail_resolver
+
 def get_video_thumbnail(video_id):
     """Get best available thumbnail for a video"""
-    try:
-        # Try highest quality first, fall back to lower qualities
-        qualities = ['maxresdefault', 'sddefault', 'hqdefault', 'mqdefault', 'default']
-        
-        for quality in qualities:
-            url = f"https://i.ytimg.com/vi/{video_id}/{quality}.jpg"
-            response = requests.head(url)
-            if response.status_code == 200:
-                return url
-                
-        # If no thumbnail found, return default YouTube thumbnail
-        return f"https://i.ytimg.com/vi/{video_id}/default.jpg"
-    except Exception as e:
-        logger.error(f"Error getting thumbnail for video {video_id}: {str(e)}")
-        return f"https://i.ytimg.com/vi/{video_id}/default.jpg"
+    return get_thumbnail_resolver().resolve(video_id)
 
-def get_trending_videos(keyword, upload_date='any', video_duration='any', sort_by='relevance'):
-    """Scrape trending videos from YouTube based on keyword and filters using Selenium"""
-    logger.info(f"Searching for videos with keyword: {keyword}")
-    
-    # Build search URL with filters
-    search_query = urllib.parse.quote(keyword)
-    filter_params = {
-        'upload_date': {
-            'hour': 'EgQIARAB',
-            'today': 'EgQIAhAB',
-            'week': 'EgQIAxAB',
-            'month': 'EgQIBBAB'
-        },
-        'duration': {
-            'short': 'EgQQARgB',
-            'medium': 'EgQQARgC',
-            'long': 'EgQQARgD'
-        },
-        'sort': {
-            'date': 'CAI',
-            'view_count': 'CAM',
-            'rating': 'CAE'
-        }
+def _resolve_thumbnails(videos):
+    """スクレイピング後にサムネイルをまとめて解決する"""
+    resolver = get_thumbnail_resolver()
+    mode = os.environ.get('THUMBNAIL_MODE', 'lazy')
+    with metrics.span('thumbnails', mode=mode):
+        if mode == 'probe':
+            best = resolver.resolve_many([v['video_id'] for v in videos])
+            for video in videos:
+                video['thumbnail'] = best[video['video_id']]
+        else:
+            # 代替URLで即座に返し、高画質URLは裏で解決して次回以降に反映する
+            resolver.upgrade_async([v['video_id'] for v in videos])
+    return videos
+
+SEARCH_FILTER_PARAMS = {
+    'upload_date': {
+        'hour': 'EgQIARAB',
+        'today': 'EgQIAhAB',
+        'week': 'EgQIAxAB',
+        'month': 'EgQIBBAB'
+    },
+    'duration': {
+        'short': 'EgQQARgB',
+        'medium': 'EgQQARgC',
+        'long': 'EgQQARgD'
+    },
+    'sort': {
+        'date': 'CAI',
+        'view_count': 'CAM',
+        'rating': 'CAE'
     }
-    
+}
+
+SEARCH_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+                  '(KHTML, like Gecko) Chrome/120.0 Safari/537.36',
+    'Accept-Language': 'ja-JP,ja;q=0.9,en;q=0.8',
+}
+
+def build_search_url(keyword, upload_date='any', video_duration='any', sort_by='relevance'):
+    """Build the YouTube results URL for a keyword and filters"""
+    search_query = urllib.parse.quote(keyword)
     url = f"https://www.youtube.com/results?search_query={search_query}"
     
     # Add filters to URL if specified
-    if upload_date != 'any' and upload_date in filter_params['upload_date']:
-        url += f"&sp={filter_params['upload_date'][upload_date]}"
-    if video_duration != 'any' and video_duration in filter_params['duration']:
-        url += f"&sp={filter_params['duration'][video_duration]}"
-    if sort_by != 'relevance' and sort_by in filter_params['sort']:
-        url += f"&sp={filter_params['sort'][sort_by]}"
+    if upload_date != 'any' and upload_date in SEARCH_FILTER_PARAMS['upload_date']:
+        url += f"&sp={SEARCH_FILTER_PARAMS['upload_date'][upload_date]}"
+    if video_duration != 'any' and video_duration in SEARCH_FILTER_PARAMS['duration']:
+        url += f"&sp={SEARCH_FILTER_PARAMS['duration'][video_duration]}"
+    if sort_by != 'relevance' and sort_by in SEARCH_FILTER_PARAMS['sort']:
+        url += f"&sp={SEARCH_FILTER_PARAMS['sort'][sort_by]}"
+    return url
+
+def _build_video(title, video_id, thumbnail, channel, views, publish_date):
+    """Build the video dict shared by all search backends"""
+    video = {
+        'title': title,
+        'video_id': video_id,
+        'thumbnail': thumbnail,
+        'channel': channel,
+        'views': views,
+        'publish_date': publish_date
+    }
+    # 表示用の文字列とは別に、並び替え・順位付け用の数値を持たせる
+    video.update(parse_metadata(views, publish_date))
+    return video
+
+# 代入先の名前と直後の { を合わせて探す（文字列中や別の呼び出しに誤って一致しないように）
+_INITIAL_DATA = re.compile(r'ytInitialData\s*=\s*\{')
+_YTCFG_SET = re.compile(r'ytcfg\.set\(\s*\{')
+
+def _extract_json_object(html, pattern, required_key=None):
+    """Decode the first JSON object whose opening brace ends a match of pattern.
+
+    With required_key, matches whose object lacks that key are skipped
+    (ytcfg.set is called several times per page).
+    """
+    decoder = json.JSONDecoder()
+    for match in pattern.finditer(html):
+        try:
+            obj, _ = decoder.raw_decode(html, match.end() - 1)
+        except ValueError as e:
+            logger.error(f"Error decoding {pattern.pattern}: {str(e)}")
+            continue
+        if required_key is None or (isinstance(obj, dict) and required_key in obj):
+            return obj
+    return None
+
+def _text_of(node):
+    """simpleText/runs形式のテキストを取り出す"""
+    if not node:
+        return ""
+    if 'simpleText' in node:
+        return node['simpleText'].strip()
+    return ''.join(run.get('text', '') for run in node.get('runs', [])).strip()
+
+def _parse_section_contents(contents):
+    """検索結果のセクション一覧からvideoRendererと次ページのトークンを取り出す"""
+    renderers = []
+    token = None
+    for section in contents:
+        for item in section.get('itemSectionRenderer', {}).get('contents', []):
+            renderer = item.get('videoRenderer')
+            if renderer:
+                renderers.append(renderer)
+        continuation = section.get('continuationItemRenderer')
+        if continuation:
+            token = (continuation.get('continuationEndpoint', {})
+                                 .get('continuationCommand', {})
+                                 .get('token'))
+    return renderers, token
+
+def _initial_section_contents(data):
+    return (data.get('contents', {})
+                .get('twoColumnSearchResultsRenderer', {})
+                .get('primaryContents', {})
+                .get('sectionListRenderer', {})
+                .get('contents', []))
+
+def _continuation_section_contents(data):
+    contents = []
+    for command in data.get('onResponseReceivedCommands', []):
+        contents.extend(command.get('appendContinuationItemsAction', {}).get('continuationItems', []))
+    return contents
+
+def _video_from_renderer(renderer):
+    """videoRendererを動画情報のdictに変換"""
+    video_id = renderer.get('videoId')
+    title = _text_of(renderer.get('title'))
+    channel = _text_of(renderer.get('ownerText')) or "チャンネル名不明"
+    # 画面表示と同じ短縮形式（例: 12万 回視聴）を優先
+    views = _text_of(renderer.get('shortViewCountText')) or _text_of(renderer.get('viewCountText'))
+    if not has_view_count(views):
+        views = ""
+    publish_date = _text_of(renderer.get('publishedTimeText'))
+    
+    # ページデータに含まれる最大サイズのサムネイルを使う
+    thumbnail = best_from_thumbnail_list(renderer.get('thumbnail', {}).get('thumbnails'))
+    if thumbnail:
+        get_thumbnail_resolver().remember(video_id, thumbnail)
+    else:
+        thumbnail = get_thumbnail_resolver().cached(video_id) or thumbnail_url(video_id)
+    
+    return _build_video(title, video_id, thumbnail, channel, views, publish_date)
+
+def _videos_from_renderers(renderers, processed_ids, limit):
+    videos = []
+    for renderer in renderers:
+        if len(processed_ids) >= limit:
+            break
+        video_id = renderer.get('videoId')
+        if not video_id or video_id in processed_ids:
+            continue
+        processed_ids.add(video_id)
+        video = _video_from_renderer(renderer)
+        videos.append(video)
+        logger.info(f"Successfully parsed video: {video['title']}")
+    return videos
+
+def parse_search_results(html, limit=10):
+    """Parse video dicts from the ytInitialData embedded in a results page"""
+    data = _extract_json_object(html, _INITIAL_DATA)
+    if not data:
+        return []
+    renderers, _ = _parse_section_contents(_initial_section_contents(data))
+    return _videos_from_renderers(renderers, set(), limit)
+
+def _iter_videos_http(url, limit):
+    """Yield pages of videos, following continuation tokens until limit is reached"""
+    session = get_session()
+    with metrics.span('page_load', backend='http'):
+        response = session.get(url, headers=SEARCH_HEADERS, timeout=10)
+        response.raise_for_status()
+        html = response.text
+    
+    with metrics.span('extract', backend='http'):
+        data = _extract_json_object(html, _INITIAL_DATA)
+        if not data:
+            return
+        renderers, token = _parse_section_contents(_initial_section_contents(data))
+        processed_ids = set()
+        page = _videos_from_renderers(renderers, processed_ids, limit)
+    if page:
+        yield page
+    
+    if len(processed_ids) >= limit or not token:
+        return
+    
+    # 2ページ目以降は検索ページと同じInnerTube APIで取得する
+    config = _extract_json_object(html, _YTCFG_SET, 'INNERTUBE_API_KEY') or {}
+    api_key = config.get('INNERTUBE_API_KEY')
+    context = config.get('INNERTUBE_CONTEXT')
+    if not api_key or not context:
+        logger.warning("InnerTube config not found, cannot load more search results")
+        return
     
+    while token and len(processed_ids) < limit:
+        with metrics.span('page_load', backend='http_continuation'):
+            response = session.post(
+                f"https://www.youtube.com/youtubei/v1/search?key={api_key}",
+                json={'context': context, 'continuation': token},
+                headers=SEARCH_HEADERS,
+                timeout=10
+            )
+            response.raise_for_status()
+            data = response.json()
+        with metrics.span('extract', backend='http_continuation'):
+            renderers, token = _parse_section_contents(_continuation_section_contents(data))
+            page = _videos_from_renderers(renderers, processed_ids, limit)
+        if not page and not renderers:
+            break
+        if page:
+            yield page
+
+def _get_trending_videos_http(url, limit=10):
+    """Fetch results without a browser and return up to limit videos"""
+    return [video for page in _iter_videos_http(url, limit) for video in page]
+
+def _video_from_element(video):
+    """ytd-video-renderer要素から動画情報を取り出す（不正な要素はNone）"""
+    from selenium.webdriver.common.by import By
+    from selenium.common.exceptions import NoSuchElementException
+    
+    # Extract video information
+    title_element = video.find_element(By.CSS_SELECTOR, "#video-title")
+    title = title_element.text.strip()
+    video_url = title_element.get_attribute("href")
+    
+    if not video_url:
+        return None
+    
+    parsed_url = urllib.parse.urlparse(video_url)
+    video_id_params = urllib.parse.parse_qs(parsed_url.query).get('v')
+    
+    if video_id_params:
+        video_id = video_id_params[0]
+    else:
+        # '/shorts/' パスからvideo_idを抽出
+        path_segments = parsed_url.path.split('/')
+        if 'shorts' in path_segments:
+            shorts_index = path_segments.index('shorts')
+            if len(path_segments) > shorts_index + 1:
+                video_id = path_segments[shorts_index + 1]
+            else:
+                logger.error(f"無効なショート動画URL: {video_url}")
+                return None
+        else:
+            logger.error(f"無効な動画URL: {video_url}")
+            return None
+    
+    # 高画質サムネイルは後でまとめて解決する
+    thumbnail = get_thumbnail_resolver().cached(video_id) or thumbnail_url(video_id)
+    
+    # Get channel name
     try:
-        driver = setup_driver()
-        driver.get(url)
-        
-        # Wait for video elements to load with retry mechanism
-        wait = WebDriverWait(driver, 15)
-        max_retries = 3
-        retries = 0
-        
-        while retries < max_retries:
-            try:
-                video_elements = wait.until(
-                    EC.presence_of_all_elements_located((By.CSS_SELECTOR, "ytd-video-renderer"))
-                )
-                if len(video_elements) >= 10:
-                    break
-                driver.execute_script("window.scrollBy(0, 500)")
-                time.sleep(1)
-                retries += 1
-            except TimeoutException:
-                if retries == max_retries - 1:
-                    raise
-                retries += 1
-                continue
+        channel = video.find_element(By.CSS_SELECTOR, "#channel-name").text.strip()
+    except NoSuchElementException:
+        channel = "チャンネル名不明"
+    
+    # Get metadata (views, publish date)
+    views = ""
+    publish_date = ""
+    try:
+        metadata_elements = video.find_elements(By.CSS_SELECTOR, "#metadata-line span")
+        for element in metadata_elements:
+            text = element.text.strip()
+            if not views and has_view_count(text):
+                views = text
+            elif not publish_date and is_publish_date(text):
+                publish_date = text
+    except NoSuchElementException:
+        pass
+    except Exception as e:
+        logger.error(f"Error extracting metadata: {str(e)}")
+    
+    return _build_video(title, video_id, thumbnail, channel, views, publish_date)
+
+def _iter_videos_selenium(url, limit):
+    """Yield pages of videos from a pooled headless Chrome, scrolling for more"""
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.common.exceptions import TimeoutException
+    
+    selector = (By.CSS_SELECTOR, "ytd-video-renderer")
+    with get_driver_pool().session() as driver:
+        with metrics.span('page_load', backend='selenium'):
+            driver.get(url)
+            WebDriverWait(driver, 15).until(EC.presence_of_all_elements_located(selector))
         
-        videos = []
         processed_ids = set()
+        seen_elements = 0
         
-        for video in video_elements:
-            if len(videos) >= 10:
+        while len(processed_ids) < limit:
+            video_elements = driver.find_elements(*selector)
+            page = []
+            with metrics.span('extract', backend='selenium'):
+                for video in video_elements[seen_elements:]:
+                    if len(processed_ids) >= limit:
+                        break
+                    try:
+                        item = _video_from_element(video)
+                        # Skip invalid elements and duplicates
+                        if item is None or item['video_id'] in processed_ids:
+                            continue
+                        processed_ids.add(item['video_id'])
+                        page.append(item)
+                        logger.info(f"Successfully scraped video: {item['title']}")
+                    except Exception as e:
+                        metrics.inc('extract_failures_total', backend='selenium')
+                        logger.error(f"Error processing video element: {str(e)}")
+            seen_elements = len(video_elements)
+            if page:
+                yield page
+            if len(processed_ids) >= limit:
                 break
-                
+            
+            # 固定のsleepではなく、新しい要素が読み込まれるまで待つ
+            driver.execute_script("window.scrollTo(0, document.documentElement.scrollHeight)")
             try:
-                # Extract video information
-                title_element = video.find_element(By.CSS_SELECTOR, "#video-title")
-                title = title_element.text.strip()
-                video_url = title_element.get_attribute("href")
-                
-                if not video_url:
-                    continue
-                    
-                parsed_url = urllib.parse.urlparse(video_url)
-                video_id_params = urllib.parse.parse_qs(parsed_url.query).get('v')
-                
-                if video_id_params:
-                    video_id = video_id_params[0]
-                else:
-                    # '/shorts/' パスからvideo_idを抽出
-                    path_segments = parsed_url.path.split('/')
-                    if 'shorts' in path_segments:
-                        shorts_index = path_segments.index('shorts')
-                        if len(path_segments) > shorts_index + 1:
-                            video_id = path_segments[shorts_index + 1]
-                        else:
-                            logger.error(f"無効なショート動画URL: {video_url}")
-                            continue
-                    else:
-                        logger.error(f"無効な動画URL: {video_url}")
-                        continue
-                
-                # Skip duplicates
-                if video_id in processed_ids:
-                    continue
-                    
-                processed_ids.add(video_id)
-                
-                # Get high-quality thumbnail
-                thumbnail = get_video_thumbnail(video_id)
-                
-                # Get channel name
-                try:
-                    channel = video.find_element(By.CSS_SELECTOR, "#channel-name").text.strip()
-                except NoSuchElementException:
-                    channel = "チャンネル名不明"
-                
-                # Get metadata (views, likes, publish date)
-                views = ""
-                publish_date = ""
-                try:
-                    metadata_elements = video.find_elements(By.CSS_SELECTOR, "#metadata-line span")
-                    for element in metadata_elements:
-                        text = element.text.strip()
-                        if "回視聴" in text and not views:
-                            views = text
-                        elif any(time_unit in text for time_unit in ["前", "年", "ヶ月", "週間", "日", "時間"]) and not publish_date:
-                            if "回視聴" not in text:
-                                publish_date = text
-                except NoSuchElementException:
-                    pass
-                except Exception as e:
-                    logger.error(f"Error extracting metadata: {str(e)}")
-                
-                # いいね数を取得（空文字列をデフォルトに）
-                likes = ""
-                try:
-                    if views:  # 視聴回数がある場合のみいいね数を計算
-                        view_count = views.replace("回視聴", "").replace(" ", "")
-                        multiplier = 0.045  # 平均的ないいね率（4.5%）
-                        
-                        def convert_to_number(value_str):
-                            """視聴回数を数値に変換する補助関数"""
-                            try:
-                                # 数値とドットのみを抽出
-                                number_str = ''.join(c for c in value_str if c.isdigit() or c == '.')
-                                if not number_str:
-                                    return 0
-                                        
-                                number = float(number_str)
-                                        
-                                # 単位に応じて計算
-                                if "億" in value_str:
-                                    return number * 100000000
-                                elif "万" in value_str:
-                                    return number * 10000
-                                return number
-                            except:
-                                return 0
-                        
-                        # 視聴回数を数値に変換
-                        base_number = convert_to_number(view_count)
-                        
-                        if base_number > 0:
-                            # いいね数を計算
-                            estimated_likes = int(base_number * multiplier)
-                            
-                            # フォーマット
-                            if estimated_likes >= 100000000:
-                                likes = f"{estimated_likes/100000000:.1f}億"
-                            elif estimated_likes >= 10000:
-                                likes = f"{estimated_likes/10000:.1f}万"
-                            else:
-                                likes = f"{estimated_likes}"
-                except Exception as e:
-                    logger.error(f"Error calculating likes: {str(e)}")
-                
-                videos.append({
-                    'title': title,
-                    'video_id': video_id,
-                    'thumbnail': thumbnail,
-                    'channel': channel,
-                    'views': views,
-                    'likes': likes,
-                    'publish_date': publish_date
-                })
-                logger.info(f"Successfully scraped video: {title}")
-                
-            except Exception as e:
-                logger.error(f"Error processing video element: {str(e)}")
-                continue
-        
-        return videos[:10]
-        
+                with metrics.span('page_load', backend='selenium_scroll'):
+                    WebDriverWait(driver, 10).until(
+                        lambda d: len(d.find_elements(*selector)) > seen_elements
+                    )
+            except TimeoutException:
+                logger.info("No more search results to load")
+                break
+
+def _get_trending_videos_selenium(url, limit=10):
+    """Scrape the results page with a pooled headless Chrome"""
+    return [video for page in _iter_videos_selenium(url, limit) for video in page]
+
+def clamp_max_results(value, default=10):
+    """Parse a requested result count, limited to SEARCH_MAX_RESULTS"""
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        value = default
+    return max(1, min(value, int(os.environ.get('SEARCH_MAX_RESULTS', 200))))
+
+def iter_trending_videos(keyword, upload_date='any', video_duration='any', sort_by='relevance', max_results=10):
+    """Yield videos page by page as they arrive, up to max_results"""
+    logger.info(f"Searching for videos with keyword: {keyword}")
+    
+    url = build_search_url(keyword, upload_date, video_duration, sort_by)
+    backend = os.environ.get('SCRAPER_BACKEND', 'http') if selenium_enabled() else 'http'
+    yielded = 0
+    
+    # まずブラウザ不要のHTTP解析で試行し、失敗時のみSeleniumを使う
+    if backend == 'http':
+        try:
+            with get_breaker('youtube_search').guard():
+                for page in _iter_videos_http(url, max_results):
+                    yielded += len(page)
+                    yield from _resolve_thumbnails(page)
+            if yielded:
+                return
+            metrics.inc('search_fallbacks_total', reason='empty')
+            logger.warning("HTTP search backend returned no videos, falling back to Selenium")
+        except CircuitOpenError:
+            # 障害中はHTTPのタイムアウトを待たずにSeleniumへ切り替える
+            metrics.inc('search_fallbacks_total', reason='circuit_open')
+        except Exception as e:
+            if yielded:
+                # 途中のページで失敗した場合は取得済みの結果までで終える
+                metrics.inc('search_failures_total', backend='http_continuation')
+                logger.error(f"Error loading more search results: {str(e)}")
+                return
+            metrics.inc('search_fallbacks_total', reason='error')
+            logger.warning(f"HTTP search backend failed, falling back to Selenium: {str(e)}")
+    
+    if not selenium_enabled():
+        metrics.inc('search_failures_total', backend='http')
+        raise Exception("検索結果を取得できませんでした（サーバーレスモードではSeleniumを使用しません）")
+    
+    from selenium.common.exceptions import TimeoutException
+    try:
+        for page in _iter_videos_selenium(url, max_results):
+            yield from _resolve_thumbnails(page)
     except TimeoutException:
+        metrics.inc('search_failures_total', backend='selenium')
         logger.error("Timeout waiting for YouTube page to load")
         raise Exception("Failed to load YouTube search results")
     except Exception as e:
+        metrics.inc('search_failures_total', backend='selenium')
         logger.error(f"Error scraping videos: {str(e)}")
         raise Exception(f"Error scraping videos: {str(e)}")
-    finally:
-        if 'driver' in locals():
-            driver.quit()
 
-def get_video_transcript(video_id):
-    """Get transcript for a video using optimized method"""
-    logger.info(f"Fetching transcript for video: {video_id}")
+def _search_videos(keyword, upload_date='any', video_duration='any', sort_by='relevance', max_results=10):
+    """Search YouTube for videos matching keyword and filters"""
+    return list(iter_trending_videos(keyword, upload_date, video_duration, sort_by, max_results))
+
+_search_cache = None
+_search_cache_lock = threading.Lock()
+
+def get_search_cache():
+    """Return the process-wide search result cache"""
+    global _search_cache
+    with _search_cache_lock:
+        if _search_cache is None:
+            _search_cache = SearchCache(
+                fresh_for=float(os.environ.get('SEARCH_CACHE_TTL', 600)),
+                stale_for=float(os.environ.get('SEARCH_CACHE_STALE_TTL', 3600)),
+                max_entries=int(os.environ.get('SEARCH_CACHE_MAX_ENTRIES', 500)),
+            )
+        return _search_cache
+
+def get_trending_videos(keyword, upload_date='any', video_duration='any', sort_by='relevance', max_results=10,
+                        fresh=False):
+    """Get trending videos from YouTube based on keyword and filters, with caching.
+
+    fresh=True always searches YouTube (for monitoring, where cached view counts
+    would hide changes) and refreshes the cache with the result.
+    """
+    key = make_search_key(keyword, upload_date, video_duration, sort_by) + (max_results,)
+    if fresh:
+        videos = _search_videos(keyword, upload_date, video_duration, sort_by, max_results)
+        get_search_cache().store(key, videos)
+        return get_thumbnail_resolver().apply(videos)
+    videos = get_search_cache().get_or_fetch(
+        key,
+        lambda: _search_videos(keyword, upload_date, video_duration, sort_by, max_results)
+    )
+    # キャッシュ済みの結果にも、その後解決した高画質サムネイルを反映
+    return get_thumbnail_resolver().apply(videos)
+
+def stream_trending_videos(keyword, upload_date='any', video_duration='any', sort_by='relevance', max_results=10):
+    """Yield videos like iter_trending_videos, served from the search cache on a hit"""
+    key = make_search_key(keyword, upload_date, video_duration, sort_by) + (max_results,)
+    args = (keyword, upload_date, video_duration, sort_by, max_results)
+    videos = get_search_cache().iter_or_stream(
+        key, lambda: _search_videos(*args), lambda: iter_trending_videos(*args)
+    )
+    resolver = get_thumbnail_resolver()
+    for video in videos:
+        yield resolver.apply([video])[0]
+
+TRANSCRIPT_LANGUAGES = ['ja', 'en']
+
+def default_cache_dir():
+    """SQLiteの保存先。サーバーレス環境ではデプロイ先が読み取り専用なので一時ディレクトリを使う"""
+    if os.environ.get('CACHE_DIR'):
+        return os.environ['CACHE_DIR']
+    if os.environ.get('SERVERLESS') == '1':
+        return os.path.join(tempfile.gettempdir(), 'youtube-trends-cache')
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache')
+
+CACHE_DIR = default_cache_dir()
+
+_transcript_cache = None
+_transcript_cache_failed = False
+_transcript_cache_lock = threading.Lock()
+
+def get_transcript_cache():
+    """Return the on-disk transcript cache, or None when disabled"""
+    global _transcript_cache, _transcript_cache_failed
+    path = os.environ.get('TRANSCRIPT_CACHE_PATH', os.path.join(CACHE_DIR, 'transcripts.sqlite3'))
+    if not path:
+        return None
+    with _transcript_cache_lock:
+        # 開けなかった場合は呼び出しのたびに再試行せず、このプロセスではキャッシュなしで動く
+        if _transcript_cache is None and not _transcript_cache_failed:
+            try:
+                _transcript_cache = TranscriptCache(
+                    path,
+                    ttl=float(os.environ.get('TRANSCRIPT_CACHE_TTL', 30 * 86400)),
+                    negative_ttl=float(os.environ.get('TRANSCRIPT_CACHE_NEGATIVE_TTL', 6 * 3600)),
+                    max_entries=int(os.environ.get('TRANSCRIPT_CACHE_MAX_ENTRIES', 5000)),
+                )
+            except Exception as e:
+                logger.error(f"Error opening transcript cache at {path}, continuing without it: {str(e)}")
+                _transcript_cache_failed = True
+        return _transcript_cache
+
+def _fetch_transcript_segments(video_id):
+    """Fetch timed caption segments from YouTube; returns None when no captions exist"""
+    # まずYouTube Transcript APIで試行（最速）
+    try:
+        with get_breaker('transcript_api').guard(_is_upstream_failure):
+            with metrics.span('transcript_fetch', path='api'):
+                return YouTubeTranscriptApi.get_transcript(video_id, languages=TRANSCRIPT_LANGUAGES)
+    except (TranscriptsDisabled, VideoUnavailable):
+        # 字幕自体が存在しないので、HTML解析を試しても結果は同じ
+        return None
+    except CircuitOpenError:
+        metrics.inc('circuit_rejections_total', circuit='transcript_api')
+    except Exception as e:
+        metrics.inc('transcript_fallbacks_total')
+        logger.info(f"Transcript API unavailable for {video_id}, trying HTML fallback: {str(e)}")
     
+    # APIが失敗した場合はHTML解析を試行（回路が開いていれば即座に失敗）
     try:
-        # まずYouTube Transcript APIで試行（最速）
-        try:
-            transcript_list = YouTubeTranscriptApi.get_transcript(video_id, languages=['ja', 'en'])
-            return ' '.join(t['text'] for t in transcript_list)
-        except:
-            pass
-        
-        # APIが失敗した場合はHTML解析を試行
-        url = f"https://www.youtube.com/watch?v={video_id}"
-        response = requests.get(url, timeout=5)  # タイアウトを設定
-        html = response.text
-        
-        match = re.search(r'ytInitialPlayerResponse\s*=\s*({.+?});', html)
-        if not match:
-            return None
-            
-        player_response = json.loads(match.group(1))
-        captions = player_response.get('captions', {})
-        if not captions:
-            return None
-            
-        caption_tracks = captions.get('playerCaptionsTracklistRenderer', {}).get('captionTracks', [])
-        if not caption_tracks:
-            return None
-            
-        # 日本語か英語の字幕を優先
-        selected_track = None
-        for lang in ['ja', 'en']:
-            selected_track = next((track for track in caption_tracks 
-                                 if track.get('languageCode') == lang), None)
-            if selected_track:
-                break
-        
-        if not selected_track:
-            selected_track = caption_tracks[0]
-            
-        captions_url = selected_track['baseUrl']
-        captions_response = requests.get(captions_url, timeout=5)
-        
-        soup = BeautifulSoup(captions_response.text, 'xml')
-        return ' '.join(text.text for text in soup.find_all('text'))
+        with get_breaker('youtube_watch').guard():
+            with metrics.span('transcript_fetch', path='html'):
+                return _fetch_transcript_from_html(video_id)
+    except CircuitOpenError:
+        metrics.inc('circuit_rejections_total', circuit='youtube_watch')
+        raise
+
+def _fetch_video_transcript(video_id):
+    """Fetch a transcript from YouTube as plain text; returns None when no captions exist"""
+    segments = _fetch_transcript_segments(video_id)
+    return segments_text(segments) if segments else None
+
+def _is_upstream_failure(e):
+    """字幕がないだけのエラーはYouTube側の障害として数えない"""
+    return not isinstance(e, (TranscriptsDisabled, NoTranscriptFound, VideoUnavailable))
+
+def _fetch_transcript_from_html(video_id):
+    """Stream the caption track listed in the watch page's player response into timed segments"""
+    url = f"https://www.youtube.com/watch?v={video_id}"
+    response = get_session().get(url, timeout=5, stream=True)  # タイムアウトを設定
+    try:
+        response.raise_for_status()
+        # ページ全体は読まず、プレイヤー情報のJSONが閉じた時点で打ち切る
+        player_response = read_player_response(response)
+    finally:
+        response.close()
+    selected_track = select_caption_track(player_response, TRANSCRIPT_LANGUAGES)
+    if not selected_track:
+        return None
         
+    captions_response = get_session().get(selected_track['baseUrl'], timeout=5, stream=True)
+    try:
+        captions_response.raise_for_status()
+        return list(iter_caption_segments(captions_response.iter_content(chunk_size=CHUNK_SIZE)))
+    finally:
+        captions_response.close()
+
+class TranscriptFetchError(Exception):
+    """Raised when a transcript download fails, as opposed to a video without captions"""
+
+def _load_transcript(video_id, with_segments=False):
+    """Return (transcript, segments) from the cache, fetching and caching on a miss"""
+    cache = get_transcript_cache()
+    if cache:
+        try:
+            hit, transcript = cache.get(video_id, TRANSCRIPT_LANGUAGES)
+            if hit:
+                logger.info(f"Transcript cache hit for video: {video_id}")
+                segments = cache.get_segments(video_id, TRANSCRIPT_LANGUAGES) if with_segments else None
+                # 時刻情報を持たない古いエントリはセグメントが必要な時だけ取り直す
+                if not (with_segments and transcript and segments is None):
+                    return transcript, segments
+        except Exception as e:
+            logger.error(f"Error reading transcript cache: {str(e)}")
+    
+    logger.info(f"Fetching transcript for video: {video_id}")
+    try:
+        # 失敗が続くと同時取得数を自動で絞る（回路が開いている場合は数えない）
+        with get_transcript_limiter().slot(lambda e: not isinstance(e, CircuitOpenError)):
+            segments = _fetch_transcript_segments(video_id) or None
     except Exception as e:
+        # 通信エラーは一時的な可能性があるためキャッシュせず、字幕なしとは区別して呼び出し元に伝える
+        metrics.inc('transcript_failures_total')
         logger.error(f"Error getting transcript: {str(e)}")
+        raise TranscriptFetchError(f"Could not fetch transcript for {video_id}: {str(e)}") from e
+    transcript = segments_text(segments) if segments else None
+    
+    if cache:
+        try:
+            cache.set(video_id, TRANSCRIPT_LANGUAGES, transcript, segments)
+        except Exception as e:
+            logger.error(f"Error writing transcript cache: {str(e)}")
+    return transcript, segments
+
+def fetch_video_transcript(video_id):
+    """Get transcript for a video (None when it has no captions); raise TranscriptFetchError when the fetch fails"""
+    return _load_transcript(video_id)[0]
+
+def get_video_transcript(video_id):
+    """Get transcript for a video, served from the on-disk cache when possible (None on any failure)"""
+    try:
+        return fetch_video_transcript(video_id)
+    except TranscriptFetchError:
         return None
 
+def get_video_transcript_segments(video_id):
+    """Get [{'text', 'start', 'duration'}] caption segments for hook analysis, or None; raise TranscriptFetchError on failure"""
+    return _load_transcript(video_id, with_segments=True)[1]
+
 def convert_views_to_number(views_str):
     """視聴回数を数値に変換する関数"""
-    if not views_str or views_str == '':
-        return 0
-    # 正規表現で数値と単位を抽出
-    match = re.match(r'([\d\.]+)(億|万)?回視聴', views_str)
-    if not match:
-        return 0
-    number, unit = match.groups()
-    try:
-        number = float(number)
-        if unit == '億':
-            return number * 100000000
-        elif unit == '万':
-            return number * 10000
-        else:
-            return number
-    except ValueError:
-        return 0
+    return parse_view_count(views_str)
+
+_transcript_fetcher = None
+_transcript_fetcher_lock = threading.Lock()
+
+_transcript_limiter = None
+_transcript_limiter_lock = threading.Lock()
+
+def get_transcript_limiter():
+    """Return the process-wide adaptive limit on concurrent transcript downloads"""
+    global _transcript_limiter
+    with _transcript_limiter_lock:
+        if _transcript_limiter is None:
+            max_limit = int(os.environ.get('TRANSCRIPT_CONCURRENCY', 8))
+            _transcript_limiter = AdaptiveLimiter(
+                initial=max_limit,
+                min_limit=int(os.environ.get('TRANSCRIPT_MIN_CONCURRENCY', 1)),
+                max_limit=max_limit,
+            )
+        return _transcript_limiter
+
+def get_transcript_fetcher():
+    """Return the process-wide transcript fetcher"""
+    global _transcript_fetcher
+    with _transcript_fetcher_lock:
+        if _transcript_fetcher is None:
+            # 取得失敗はFutureの例外として返し、字幕なし（None）と区別する
+            _transcript_fetcher = TranscriptFetcher(
+                fetch_video_transcript,
+                concurrency=int(os.environ.get('TRANSCRIPT_CONCURRENCY', 8)),
+            )
+        return _transcript_fetcher
+
+TRANSCRIPT_UNAVAILABLE = "文字起こしが利用できません"
+TRANSCRIPT_FAILED = "文字起こしの取得に失敗しました"
+
+def transcript_label(transcript):
+    """取得結果を画面表示用の文字起こしに変換"""
+    return transcript if transcript else TRANSCRIPT_UNAVAILABLE
+
+def transcript_excerpt(transcript, limit=None):
+    """結果ページ用の冒頭の抜粋（全文は /get_transcript で必要な時に取得）"""
+    if transcript in (None, TRANSCRIPT_UNAVAILABLE, TRANSCRIPT_FAILED):
+        return ''
+    limit = limit or int(os.environ.get('TRANSCRIPT_EXCERPT_CHARS', 160))
+    text = ' '.join(transcript[:limit * 2].split())
+    return text if len(text) <= limit and len(transcript) <= limit * 2 else text[:limit].rstrip() + '…'
+
+def has_transcript(video):
+    return video.get('transcript') not in (None, TRANSCRIPT_UNAVAILABLE, TRANSCRIPT_FAILED)
+
+def sort_videos(videos, weights=None):
+    """スコア順に並べ替え（再生速度・チャンネル内での伸び・文字起こしの有無・新しさ）"""
+    from ranking import rank_videos
+    return rank_videos(videos, weights, has_transcript=has_transcript)
 
-def get_trending_videos_with_transcripts(keyword, **kwargs):
+def transcript_batch_deadline():
+    return float(os.environ.get('TRANSCRIPT_BATCH_DEADLINE', 20))
+
+def get_trending_videos_with_transcripts(keyword, upload_date='any', video_duration='any', sort_by='relevance',
+                                        max_results=10):
     """Get trending videos and their transcripts with optimized parallel processing"""
-    videos = get_trending_videos(keyword, **kwargs)
+    fetcher = get_transcript_fetcher()
+    futures = {}
+    caller = threading.current_thread()
+    
+    def fetch():
+        # ページが届くたびに文字起こし取得を開始し、最終ページを待たない
+        # （バックグラウンドでのキャッシュ更新時は取得しない）
+        videos = []
+        for video in iter_trending_videos(keyword, upload_date, video_duration, sort_by, max_results):
+            if threading.current_thread() is caller:
+                futures[video['video_id']] = fetcher.submit(video['video_id'])
+            videos.append(video)
+        return videos
+    
+    key = make_search_key(keyword, upload_date, video_duration, sort_by) + (max_results,)
+    with metrics.span('search'):
+        videos = get_thumbnail_resolver().apply(get_search_cache().get_or_fetch(key, fetch))
     
     if not videos:
         return []
     
-    # 並列処理数を増やし、タイムアウトを設定
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        future_to_video = {
-            executor.submit(get_video_transcript, video['video_id']): video 
-            for video in videos
-        }
-        
-        for future in future_to_video:
-            video = future_to_video[future]
-            try:
-                transcript = future.result(timeout=15)
-                video['transcript'] = transcript if transcript else "文字起こしが利用できません"
-            except Exception as e:
-                logger.error(f"Error getting transcript for {video['video_id']}: {str(e)}")
-                video['transcript'] = "文字起こしの取得に失敗しました"
+    # キャッシュから返った場合はここでまとめて取得を開始する
+    for video in videos:
+        if video['video_id'] not in futures:
+            futures[video['video_id']] = fetcher.submit(video['video_id'])
     
-    # 視聴回数で降順ソート（文字起こしの有無も考慮）
-    videos.sort(key=lambda x: (
-        x['transcript'] != "文字起こしが利用できません",
-        convert_views_to_number(x['views'])
-    ), reverse=True)
+    # バッチ全体の締め切りで待ち時間を制限する
+    with metrics.span('transcripts'):
+        wait(list(futures.values()), timeout=transcript_batch_deadline())
+    
+    for video in videos:
+        future = futures[video['video_id']]
+        if future.done() and not future.cancelled() and future.exception() is None:
+            video['transcript'] = transcript_label(future.result())
+        else:
+            if future.done() and not future.cancelled():
+                logger.error(f"Error getting transcript for {video['video_id']}: {str(future.exception())}")
+            else:
+                metrics.inc('transcript_deadline_skips_total')
+            future.cancel()
+            video['transcript'] = TRANSCRIPT_FAILED
     
-    return videos
\ No newline at end of file
+    return sort_videos(videos)
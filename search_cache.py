@@ -0,0 +1,151 @@
+import copy
+import logging
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+
+def make_search_key(keyword, upload_date='any', video_duration='any', sort_by='relevance'):
+    """Normalize a keyword and filters into a cache key"""
+    # 全角/半角・大文字小文字・余分な空白の違いを吸収
+    normalized = ' '.join(unicodedata.normalize('NFKC', keyword).lower().split())
+    return (normalized, upload_date or 'any', video_duration or 'any', sort_by or 'relevance')
+
+
+class SearchCache:
+    """In-memory search result cache with stale-while-revalidate and single-flight"""
+
+    def __init__(self, fresh_for=600, stale_for=3600, max_entries=500):
+        self.fresh_for = fresh_for
+        self.stale_for = stale_for
+        self.max_entries = max_entries
+
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+        self._hits = 0
+        self._stale_hits = 0
+        self._misses = 0
+        self._collapsed = 0
+        self._refreshes = 0
+
+    def _lookup(self, key, fetch):
+        """Return (videos, None, False) on a hit, else (None, future, owner) for the in-flight fetch"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, videos = entry
+                age = now - stored_at
+                if age < self.fresh_for:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return copy.deepcopy(videos), None, False
+                if age < self.fresh_for + self.stale_for:
+                    # 古いデータを即座に返し、裏で更新する
+                    self._entries.move_to_end(key)
+                    self._stale_hits += 1
+                    if key not in self._inflight:
+                        self._inflight[key] = Future()
+                        self._refreshes += 1
+                        threading.Thread(target=self._run, args=(key, fetch), daemon=True).start()
+                    return copy.deepcopy(videos), None, False
+
+            future = self._inflight.get(key)
+            if future is not None:
+                # 同一キーの取得が進行中なら結果を共有する
+                self._collapsed += 1
+                return None, future, False
+            future = self._inflight[key] = Future()
+            self._misses += 1
+            return None, future, True
+
+    def get_or_fetch(self, key, fetch):
+        """Return cached results for key, calling fetch() only when needed"""
+        videos, future, owner = self._lookup(key, fetch)
+        if videos is not None:
+            return videos
+        if owner:
+            self._run(key, fetch)
+        return copy.deepcopy(future.result())
+
+    def iter_or_stream(self, key, fetch, stream):
+        """Yield cached results for key, or the items of stream() as they arrive on a miss.
+
+        Hits and in-flight fetches behave as in get_or_fetch. On a miss the
+        streamed results are stored once the stream completes; other callers
+        for the same key wait for them instead of searching again. If the
+        stream is closed early, fetch() finishes the search in the background
+        so those callers still get complete results.
+        """
+        videos, future, owner = self._lookup(key, fetch)
+        if videos is None and not owner:
+            videos = copy.deepcopy(future.result())
+        if videos is not None:
+            yield from videos
+            return
+
+        streamed = []
+        try:
+            for video in stream():
+                # 呼び出し側が書き換えても保存する結果に影響しないように複製する
+                streamed.append(copy.deepcopy(video))
+                yield video
+        except Exception as e:
+            self._finish(key, error=e)
+            raise
+        except BaseException:
+            # 途中で切断された場合は部分的な結果を保存せず、待っている呼び出し側のために裏で検索し直す
+            threading.Thread(target=self._run, args=(key, fetch), daemon=True).start()
+            raise
+        self._finish(key, videos=streamed)
+
+    def _run(self, key, fetch):
+        try:
+            videos = fetch()
+        except Exception as e:
+            logger.error(f"Search refresh failed for {key}: {str(e)}")
+            self._finish(key, error=e)
+            return
+        self._finish(key, videos=videos)
+
+    def _finish(self, key, videos=None, error=None):
+        with self._lock:
+            future = self._inflight.pop(key)
+            if error is None:
+                self._store(key, videos)
+        if error is None:
+            future.set_result(videos)
+        else:
+            future.set_exception(error)
+
+    def _store(self, key, videos):
+        # 空の結果は一時的な失敗の可能性があるため保存しない
+        if videos:
+            self._entries[key] = (time.monotonic(), copy.deepcopy(videos))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def store(self, key, videos):
+        """Save results fetched outside the cache (e.g. a forced fresh search)"""
+        with self._lock:
+            self._store(key, videos)
+
+    def stats(self):
+        """Return cache counters"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self._hits,
+                'stale_hits': self._stale_hits,
+                'misses': self._misses,
+                'collapsed': self._collapsed,
+                'background_refreshes': self._refreshes,
+                'inflight': len(self._inflight),
+            }
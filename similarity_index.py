@@ -0,0 +1,284 @@
+import hashlib
+import math
+import re
+import threading
+import unicodedata
+from collections import Counter
+
+import numpy as np
+
+from transcript_compactor import dedupe_sentences, split_sentences
+from sqlite_util import connect_local, ensure_directory
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS signatures (
+    video_id TEXT PRIMARY KEY,
+    signature BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS lsh_buckets (
+    band INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    video_id TEXT NOT NULL,
+    PRIMARY KEY (band, bucket, video_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS phrases (
+    phrase TEXT PRIMARY KEY,
+    df INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO counters (name, value) VALUES ('documents', 0);
+"""
+
+# MinHash の置換は a*x + b mod p（p = 2^31 - 1 なら uint64 で溢れない）
+_PRIME = (1 << 31) - 1
+_BASE = np.uint64(1_000_003)
+_SQL_VARIABLES = 500
+# フック候補として数える n-gram の長さ（文字数）
+MIN_PHRASE_CHARS = 4
+MAX_PHRASE_CHARS = 10
+
+_CJK_RUN = re.compile(r'[぀-ヿ㐀-䶿一-鿿豈-﫿ｦ-ﾟー]+')
+_WORD = re.compile(r'[a-z0-9]+')
+_NOISE = re.compile(r'[\[［][^\]］]{1,12}[\]］]')
+
+
+def normalize_text(text):
+    """NFKC, lowercase, caption noise and whitespace removed"""
+    text = _NOISE.sub('', unicodedata.normalize('NFKC', text or '').lower())
+    return ''.join(text.split())
+
+
+def _hook(transcript, sentences):
+    """The opening sentences of a transcript, where hooks live"""
+    return dedupe_sentences(split_sentences(transcript))[:sentences]
+
+
+def hook_phrases(transcript, sentences=5, lengths=range(MIN_PHRASE_CHARS, MAX_PHRASE_CHARS + 1)):
+    """Candidate hook phrases: CJK character n-grams and Latin word bi/trigrams from the opening"""
+    phrases = set()
+    for sentence in _hook(transcript, sentences):
+        sentence = unicodedata.normalize('NFKC', sentence).lower()
+        for run in _CJK_RUN.findall(sentence):
+            for n in lengths:
+                phrases.update(run[i:i + n] for i in range(len(run) - n + 1))
+        words = _WORD.findall(sentence)
+        for n in (2, 3):
+            phrases.update(' '.join(words[i:i + n]) for i in range(len(words) - n + 1))
+    return phrases
+
+
+def _join(left, right, min_overlap=MIN_PHRASE_CHARS - 1):
+    """Join right onto left where a suffix of left equals a prefix of right"""
+    for size in range(min(len(left), len(right)) - 1, min_overlap - 1, -1):
+        if left.endswith(right[:size]):
+            return left + right[size:]
+    return None
+
+
+def _overlaps(phrase, other):
+    n = MIN_PHRASE_CHARS
+    return any(phrase[i:i + n] in other for i in range(len(phrase) - n + 1))
+
+
+class SimilarityIndex:
+    """Persistent MinHash/LSH and phrase document-frequency index over transcripts.
+
+    各文字起こしを文字 shingle の MinHash 署名にし、bands 本の帯に分けて
+    SQLite の索引付きバケットに登録する。類似検索は同じバケットに入った候補だけを
+    比べるため、蓄積した文字起こしの数に比例して遅くならない。
+    """
+
+    def __init__(self, path, num_perm=64, bands=16, shingle=5, threshold=0.8, hook_sentences=5, seed=1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.path = path
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle = shingle
+        self.threshold = threshold
+        self.hook_sentences = hook_sentences
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _PRIME, size=num_perm, dtype=np.uint64)[:, None]
+        self._b = rng.integers(0, _PRIME, size=num_perm, dtype=np.uint64)[:, None]
+        self._powers = _BASE ** np.arange(shingle - 1, -1, -1, dtype=np.uint64)
+        self._local = threading.local()
+
+        ensure_directory(path)
+        self._connect().executescript(_SCHEMA)
+
+    def _connect(self):
+        return connect_local(self._local, self.path, synchronous='NORMAL')
+
+    def signature(self, transcript):
+        """MinHash signature (uint32[num_perm]) of the transcript's character shingles, or None if too short"""
+        codes = np.frombuffer(normalize_text(transcript).encode('utf-32-le'), dtype=np.uint32)
+        count = len(codes) - self.shingle + 1
+        if count <= 0:
+            return None
+        # 多項式ローリングハッシュを shingle 幅ぶんのずらし加算でまとめて計算
+        codes = codes.astype(np.uint64)
+        hashes = np.zeros(count, dtype=np.uint64)
+        for offset, power in enumerate(self._powers):
+            hashes += codes[offset:offset + count] * power
+        hashes = np.unique(hashes % np.uint64(_PRIME))
+        return ((self._a * hashes + self._b) % np.uint64(_PRIME)).min(axis=1).astype(np.uint32)
+
+    def _band_buckets(self, signature):
+        bands = signature.reshape(self.bands, self.rows)
+        return [
+            (band, int.from_bytes(hashlib.blake2b(rows.tobytes(), digest_size=8).digest(), 'big', signed=True))
+            for band, rows in enumerate(bands)
+        ]
+
+    @staticmethod
+    def similarity(left, right):
+        """Estimated Jaccard similarity of two signatures"""
+        return float(np.count_nonzero(left == right)) / len(left)
+
+    def add(self, video_id, transcript):
+        """Index a transcript; returns False if the video was already indexed or is too short"""
+        signature = self.signature(transcript)
+        if signature is None:
+            return False
+        conn = self._connect()
+        with conn:
+            inserted = conn.execute(
+                "INSERT OR IGNORE INTO signatures (video_id, signature) VALUES (?, ?)",
+                (video_id, signature.tobytes())
+            ).rowcount
+            if not inserted:
+                return False
+            conn.executemany(
+                "INSERT OR IGNORE INTO lsh_buckets (band, bucket, video_id) VALUES (?, ?, ?)",
+                [(band, bucket, video_id) for band, bucket in self._band_buckets(signature)]
+            )
+            conn.executemany(
+                "INSERT INTO phrases (phrase, df) VALUES (?, 1) ON CONFLICT(phrase) DO UPDATE SET df = df + 1",
+                [(phrase,) for phrase in hook_phrases(transcript, self.hook_sentences)]
+            )
+            conn.execute("UPDATE counters SET value = value + 1 WHERE name = 'documents'")
+        return True
+
+    def query(self, transcript, threshold=None, exclude=()):
+        """Return [(video_id, similarity)] of indexed transcripts at or above threshold, most similar first"""
+        signature = self.signature(transcript)
+        if signature is None:
+            return []
+        threshold = self.threshold if threshold is None else threshold
+        buckets = self._band_buckets(signature)
+        conn = self._connect()
+        # 帯ごとに主キーで引く（行値の IN は全件走査になる）
+        candidates = conn.execute(
+            ' UNION '.join(["SELECT video_id FROM lsh_buckets WHERE band = ? AND bucket = ?"] * len(buckets)),
+            [value for pair in buckets for value in pair]
+        ).fetchall()
+        candidates = [row[0] for row in candidates if row[0] not in exclude]
+        matches = []
+        for start in range(0, len(candidates), _SQL_VARIABLES):
+            chunk = candidates[start:start + _SQL_VARIABLES]
+            rows = conn.execute(
+                f"SELECT video_id, signature FROM signatures WHERE video_id IN ({','.join('?' * len(chunk))})",
+                chunk
+            ).fetchall()
+            for video_id, blob in rows:
+                score = self.similarity(signature, np.frombuffer(blob, dtype=np.uint32))
+                if score >= threshold:
+                    matches.append((video_id, score))
+        matches.sort(key=lambda m: m[1], reverse=True)
+        return matches
+
+    def near_duplicates(self, items, threshold=None):
+        """Map each near-duplicate video_id to the earlier video it duplicates.
+
+        items is an ordered list of (video_id, transcript); the first of each
+        group (the higher-ranked video) is kept.
+        """
+        threshold = self.threshold if threshold is None else threshold
+        buckets = {}
+        signatures = {}
+        duplicates = {}
+        for video_id, transcript in items:
+            signature = self.signature(transcript)
+            if signature is None or video_id in signatures:
+                continue
+            keys = self._band_buckets(signature)
+            candidates = {other for key in keys for other in buckets.get(key, ())}
+            best = max(
+                ((self.similarity(signature, signatures[other]), other) for other in candidates),
+                default=(0.0, None)
+            )
+            if best[0] >= threshold:
+                duplicates[video_id] = duplicates.get(best[1], best[1])
+                continue
+            signatures[video_id] = signature
+            for key in keys:
+                buckets.setdefault(key, []).append(video_id)
+        return duplicates
+
+    def _document_frequencies(self, phrases):
+        conn = self._connect()
+        frequencies = {}
+        for start in range(0, len(phrases), _SQL_VARIABLES):
+            chunk = phrases[start:start + _SQL_VARIABLES]
+            frequencies.update(conn.execute(
+                f"SELECT phrase, df FROM phrases WHERE phrase IN ({','.join('?' * len(chunk))})",
+                chunk
+            ).fetchall())
+        return frequencies
+
+    def common_phrases(self, transcripts, limit=8, min_videos=2):
+        """Hook phrases shared by several of these transcripts, weighted by corpus IDF.
+
+        「チャンネル登録」のようにどの動画にも出る定型句は、蓄積した文字起こし
+        全体での出現率（IDF）で重みを下げる。重なり合う n-gram はつなげて
+        複数の動画に実際に現れる範囲までフレーズを伸ばす。
+        """
+        hooks = [
+            '\n'.join(unicodedata.normalize('NFKC', s).lower() for s in _hook(t, self.hook_sentences))
+            for t in transcripts
+        ]
+        counts = Counter()
+        for transcript in transcripts:
+            counts.update(hook_phrases(transcript, self.hook_sentences))
+        shared = [phrase for phrase, count in counts.items() if count >= min_videos]
+        if not shared:
+            return []
+        documents = max(self.document_count(), len(transcripts))
+        frequencies = self._document_frequencies(shared)
+
+        def weight(phrase):
+            idf = math.log((documents + 1) / (frequencies.get(phrase, 0) + 1)) + 1
+            return counts[phrase] * idf * math.sqrt(len(phrase))
+
+        def supported(phrase):
+            return sum(phrase in hook for hook in hooks) >= min_videos
+
+        chosen = []
+        for phrase in sorted(shared, key=weight, reverse=True):
+            for i, other in enumerate(chosen):
+                if phrase in other:
+                    break
+                merged = phrase if other in phrase else (_join(other, phrase) or _join(phrase, other))
+                if merged and supported(merged):
+                    chosen[i] = merged
+                    break
+                if _overlaps(phrase, other):
+                    break
+            else:
+                if len(chosen) < limit:
+                    chosen.append(phrase)
+        return chosen
+
+    def document_count(self):
+        return self._connect().execute("SELECT value FROM counters WHERE name = 'documents'").fetchone()[0]
+
+    def stats(self):
+        conn = self._connect()
+        return {
+            'documents': self.document_count(),
+            'phrases': conn.execute("SELECT COUNT(*) FROM phrases").fetchone()[0],
+        }
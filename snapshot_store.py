@@ -0,0 +1,169 @@
+import json
+import threading
+import time
+from video_metadata import estimate_likes
+from video_models import ResultSet
+from sqlite_util import connect_local, ensure_directory
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    search_key TEXT NOT NULL,
+    taken_at REAL NOT NULL,
+    video_ids TEXT NOT NULL,
+    generated_script TEXT
+);
+CREATE INDEX IF NOT EXISTS snapshots_key_taken ON snapshots (search_key, taken_at);
+CREATE TABLE IF NOT EXISTS snapshot_videos (
+    search_key TEXT NOT NULL,
+    video_id TEXT NOT NULL,
+    video TEXT NOT NULL,
+    transcript TEXT,
+    PRIMARY KEY (search_key, video_id)
+);
+CREATE TABLE IF NOT EXISTS view_history (
+    search_key TEXT NOT NULL,
+    video_id TEXT NOT NULL,
+    taken_at REAL NOT NULL,
+    views INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS view_history_key_video ON view_history (search_key, video_id, taken_at);
+"""
+
+
+def snapshot_key(search_key):
+    """Serialize a make_search_key() tuple for storage"""
+    return json.dumps(list(search_key), ensure_ascii=False)
+
+
+class SnapshotStore:
+    """Persisted per-(keyword, filters) snapshots of trending video lists"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        ensure_directory(path)
+        self._connect().executescript(_SCHEMA)
+
+    def _connect(self):
+        return connect_local(self._local, self.path)
+
+    def latest(self, key):
+        """Return the most recent snapshot for key, or None"""
+        row = self._connect().execute(
+            "SELECT taken_at, video_ids, generated_script FROM snapshots "
+            "WHERE search_key = ? ORDER BY taken_at DESC LIMIT 1",
+            (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {'taken_at': row[0], 'video_ids': json.loads(row[1]), 'generated_script': row[2]}
+
+    def known_transcripts(self, key, video_ids):
+        """Return {video_id: transcript} already stored for these videos"""
+        if not video_ids:
+            return {}
+        placeholders = ','.join('?' * len(video_ids))
+        rows = self._connect().execute(
+            f"SELECT video_id, transcript FROM snapshot_videos "
+            f"WHERE search_key = ? AND transcript IS NOT NULL AND video_id IN ({placeholders})",
+            (key, *video_ids)
+        ).fetchall()
+        return dict(rows)
+
+    def record(self, key, videos, generated_script, views_of, transcript_of, taken_at=None):
+        """Store a snapshot; views_of/transcript_of extract values from a video dict"""
+        taken_at = taken_at or time.time()
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT INTO snapshots (search_key, taken_at, video_ids, generated_script) VALUES (?, ?, ?, ?)",
+                (key, taken_at, json.dumps([v['video_id'] for v in videos]), generated_script)
+            )
+            for video in videos:
+                metadata = {k: v for k, v in video.items() if k != 'transcript'}
+                conn.execute(
+                    "INSERT INTO snapshot_videos (search_key, video_id, video, transcript) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (search_key, video_id) DO UPDATE SET "
+                    "video = excluded.video, transcript = COALESCE(excluded.transcript, snapshot_videos.transcript)",
+                    (key, video['video_id'], json.dumps(metadata, ensure_ascii=False), transcript_of(video))
+                )
+                conn.execute(
+                    "INSERT INTO view_history (search_key, video_id, taken_at, views) VALUES (?, ?, ?, ?)",
+                    (key, video['video_id'], taken_at, int(views_of(video)))
+                )
+        return taken_at
+
+    def view_deltas(self, key, video_ids):
+        """Return {video_id: {'views', 'delta', 'hours'}} versus each video's previous sample"""
+        deltas = {}
+        conn = self._connect()
+        for video_id in video_ids:
+            rows = conn.execute(
+                "SELECT taken_at, views FROM view_history WHERE search_key = ? AND video_id = ? "
+                "ORDER BY taken_at DESC LIMIT 2",
+                (key, video_id)
+            ).fetchall()
+            if not rows:
+                continue
+            latest_at, latest_views = rows[0]
+            if len(rows) == 1:
+                deltas[video_id] = {'views': latest_views, 'delta': None, 'hours': None}
+            else:
+                previous_at, previous_views = rows[1]
+                deltas[video_id] = {
+                    'views': latest_views,
+                    'delta': latest_views - previous_views,
+                    'hours': round((latest_at - previous_at) / 3600, 3),
+                }
+        return deltas
+
+    def view_history(self, key, video_id):
+        """Return [(taken_at, views)] oldest first"""
+        return self._connect().execute(
+            "SELECT taken_at, views FROM view_history WHERE search_key = ? AND video_id = ? ORDER BY taken_at",
+            (key, video_id)
+        ).fetchall()
+
+    def load_results(self, key=None, missing_labels=()):
+        """Load stored videos as a ResultSet with their latest view counts.
+
+        Transcripts are not read here; they are loaded per video on first access.
+        missing_labels are stored transcript values meaning "no transcript".
+        key=None loads every keyword's videos.
+        """
+        conn = self._connect()
+        where = "WHERE v.search_key = ?" if key is not None else ""
+        label_filter = ''.join(" AND v.transcript != ?" for _ in missing_labels)
+        rows = conn.execute(
+            f"SELECT v.search_key, v.video_id, v.video, "
+            f"(v.transcript IS NOT NULL{label_filter}) AS has_transcript, "
+            f"(SELECT h.views FROM view_history h WHERE h.search_key = v.search_key AND h.video_id = v.video_id "
+            f"ORDER BY h.taken_at DESC LIMIT 1) AS views "
+            f"FROM snapshot_videos v {where}",
+            (*missing_labels, *((key,) if key is not None else ()))
+        ).fetchall()
+
+        keys = {}
+
+        def load_transcript(video_id):
+            return self.transcript(keys.get(video_id, key), video_id)
+
+        results = ResultSet(load_transcript)
+        for search_key, video_id, video_json, has_transcript, views in rows:
+            video = json.loads(video_json)
+            if views is not None:
+                video['view_count'] = views
+                video['like_count'] = estimate_likes(views)
+            video['has_transcript'] = bool(has_transcript)
+            keys.setdefault(video_id, search_key)
+            results.append(video)
+        return results
+
+    def transcript(self, key, video_id):
+        """Return the stored transcript for one video, or None"""
+        row = self._connect().execute(
+            "SELECT transcript FROM snapshot_videos WHERE search_key = ? AND video_id = ?",
+            (key, video_id)
+        ).fetchone()
+        return row[0] if row else None
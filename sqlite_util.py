@@ -0,0 +1,29 @@
+import os
+import sqlite3
+
+
+def ensure_directory(path):
+    """Create the directory that will hold the database file at path"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+
+def connect_local(local, path, isolation_level='', row_factory=None, **pragmas):
+    """Return this thread's connection to path, reopening it after a fork.
+
+    local is the store's threading.local(). Every connection uses WAL so
+    several processes can share the file; extra pragmas (e.g.
+    synchronous='NORMAL') are applied to each new connection.
+    """
+    conn = getattr(local, 'conn', None)
+    if conn is None or local.pid != os.getpid():
+        conn = sqlite3.connect(path, timeout=10, isolation_level=isolation_level)
+        if row_factory is not None:
+            conn.row_factory = row_factory
+        conn.execute("PRAGMA journal_mode=WAL")
+        for name, value in pragmas.items():
+            conn.execute(f"PRAGMA {name}={value}")
+        local.conn = conn
+        local.pid = os.getpid()
+    return conn
@@ -1,108 +1,258 @@
 document.addEventListener('DOMContentLoaded', function() {
-    // Search form handling with more defensive checks
+    const preview = document.getElementById('thumbnailPreview');
+    const previewImg = preview ? preview.querySelector('img') : null;
+
+    function positionPreview(e) {
+        const previewRect = preview.getBoundingClientRect();
+        const viewportWidth = window.innerWidth;
+        const viewportHeight = window.innerHeight;
+
+        let left = e.clientX + 20;
+        let top = e.clientY + 20;
+
+        // Adjust position if preview would go off screen
+        if (left + previewRect.width > viewportWidth) {
+            left = e.clientX - previewRect.width - 20;
+        }
+        if (top + previewRect.height > viewportHeight) {
+            top = e.clientY - previewRect.height - 20;
+        }
+
+        preview.style.left = left + 'px';
+        preview.style.top = top + 'px';
+    }
+
+    // Thumbnail preview handling
+    function bindThumbnailPreview(img) {
+        if (!preview || !previewImg) {
+            return;
+        }
+
+        img.addEventListener('mouseenter', function(e) {
+            previewImg.src = this.dataset.highRes;
+            previewImg.alt = this.dataset.videoTitle;
+            positionPreview(e);
+            preview.style.display = 'block';
+        });
+
+        img.addEventListener('mouseleave', function() {
+            preview.style.display = 'none';
+        });
+
+        // Update preview position on mouse move
+        img.addEventListener('mousemove', positionPreview);
+    }
+
+    document.querySelectorAll('.thumbnail-container img').forEach(bindThumbnailPreview);
+
+    // Transcript handling (delegated so streamed cards work too)
+    document.addEventListener('click', async function(e) {
+        const button = e.target.closest('.toggle-transcript');
+        if (!button) {
+            return;
+        }
+
+        const videoId = button.dataset.videoId;
+        const textArea = button.nextElementSibling;
+
+        if (textArea.classList.contains('d-none')) {
+            textArea.classList.remove('d-none');
+            button.textContent = '文字起こしを非表示';
+            if (textArea.dataset.loaded) {
+                return;
+            }
+
+            // Fetch the full transcript on demand (cached by the browser via ETag/Cache-Control)
+            try {
+                const response = await fetch('/get_transcript/' + encodeURIComponent(videoId));
+                const data = await response.json();
+                if (!data.transcript) {
+                    textArea.value = '文字起こしが利用できません';
+                    return;
+                }
+
+                // Remove timestamps from display
+                textArea.value = data.transcript.replace(/\[\d{2}:\d{2}\]\s/g, '');
+                textArea.dataset.loaded = '1';
+            } catch (error) {
+                textArea.value = '文字起こしの読み込みに失敗しました';
+            }
+        } else {
+            textArea.classList.add('d-none');
+            button.textContent = '文字起こしを表示';
+        }
+    });
+
+    function createElement(tag, className, text) {
+        const element = document.createElement(tag);
+        if (className) {
+            element.className = className;
+        }
+        if (text !== undefined) {
+            element.textContent = text;
+        }
+        return element;
+    }
+
+    // Build the same card markup as results.html
+    function renderVideoCard(video) {
+        const column = createElement('div', 'col-md-6 mb-4');
+        column.dataset.videoId = video.video_id;
+        const card = createElement('div', 'card h-100');
+
+        const thumbnail = createElement('div', 'thumbnail-container');
+        const img = createElement('img', 'card-img-top');
+        img.src = video.thumbnail;
+        img.alt = video.title;
+        img.dataset.highRes = video.thumbnail;
+        img.dataset.videoTitle = video.title;
+        thumbnail.appendChild(img);
+        bindThumbnailPreview(img);
+
+        const body = createElement('div', 'card-body');
+        const info = createElement('div', 'video-info');
+        info.appendChild(createElement('h5', 'video-title', video.title));
+        info.appendChild(createElement('p', 'channel-name', video.channel));
+        let metadata = video.views;
+        if (video.likes) {
+            metadata += ' • ' + video.likes + ' いいね';
+        }
+        metadata += ' • ' + video.publish_date;
+        info.appendChild(createElement('p', 'video-metadata', metadata));
+        body.appendChild(info);
+
+        const link = createElement('a', 'btn btn-outline-primary btn-sm mb-2', '動画を見る');
+        link.href = 'https://youtube.com/watch?v=' + encodeURIComponent(video.video_id);
+        link.target = '_blank';
+        body.appendChild(link);
+
+        const transcriptArea = createElement('div', 'transcript-area mt-2');
+        transcriptArea.appendChild(createElement('p', 'transcript-excerpt small text-muted d-none'));
+        const toggle = createElement('button', 'btn btn-sm btn-secondary mb-2 toggle-transcript', '文字起こしを取得中...');
+        toggle.dataset.videoId = video.video_id;
+        toggle.disabled = true;
+        const textArea = createElement('textarea', 'form-control transcript-text d-none');
+        textArea.readOnly = true;
+        textArea.rows = 5;
+        textArea.value = '読み込み中...';
+        transcriptArea.appendChild(toggle);
+        transcriptArea.appendChild(textArea);
+        body.appendChild(transcriptArea);
+
+        card.appendChild(thumbnail);
+        card.appendChild(body);
+        column.appendChild(card);
+        return column;
+    }
+
+    // Streaming analysis via Server-Sent Events (falls back to the form POST)
     const searchForm = document.getElementById('searchForm');
+    const streamResults = document.getElementById('streamResults');
+
+    function startStreaming(analyzeBtn, spinner) {
+        const params = new URLSearchParams(new FormData(searchForm));
+        const source = new EventSource(searchForm.dataset.streamUrl + '?' + params.toString());
+        const videoContainer = document.getElementById('streamVideos');
+        const status = document.getElementById('streamStatus');
+        const scriptContent = streamResults.querySelector('.script-content');
+
+        videoContainer.innerHTML = '';
+        scriptContent.textContent = '';
+        document.getElementById('streamKeyword').textContent = '"' + params.get('keyword') + '" の検索結果';
+        status.textContent = '動画を検索中...';
+        streamResults.classList.remove('d-none');
+
+        function finish(message) {
+            source.close();
+            status.textContent = message;
+            analyzeBtn.disabled = false;
+            spinner.classList.add('d-none');
+        }
+
+        source.addEventListener('videos', function(e) {
+            const data = JSON.parse(e.data);
+            data.videos.forEach(video => videoContainer.appendChild(renderVideoCard(video)));
+            status.textContent = '文字起こしを取得中...';
+        });
+
+        source.addEventListener('transcript', function(e) {
+            const data = JSON.parse(e.data);
+            const toggle = videoContainer.querySelector('.toggle-transcript[data-video-id="' + CSS.escape(data.video_id) + '"]');
+            if (toggle) {
+                toggle.disabled = !data.available;
+                toggle.textContent = data.available ? '文字起こしを表示' : '文字起こしが利用できません';
+                const excerpt = toggle.parentElement.querySelector('.transcript-excerpt');
+                if (excerpt && data.excerpt) {
+                    excerpt.textContent = data.excerpt;
+                    excerpt.classList.remove('d-none');
+                }
+            }
+        });
+
+        source.addEventListener('script', function(e) {
+            if (!scriptContent.textContent) {
+                status.textContent = 'スクリプトを生成中...';
+            }
+            scriptContent.textContent += JSON.parse(e.data).text;
+        });
+
+        source.addEventListener('done', function() {
+            finish('分析が完了しました');
+        });
+
+        source.addEventListener('analysis_error', function(e) {
+            finish(JSON.parse(e.data).error);
+        });
+
+        // Connection errors: stop instead of letting EventSource reconnect
+        source.onerror = function() {
+            if (source.readyState !== EventSource.CLOSED) {
+                finish('接続が切断されました');
+            }
+        };
+    }
+
+    // Search form handling with more defensive checks
     if (searchForm) {
         const analyzeBtn = document.getElementById('analyzeBtn');
         if (analyzeBtn) {
             const spinner = analyzeBtn.querySelector('.spinner-border');
             if (spinner) {
-                searchForm.addEventListener('submit', function() {
+                searchForm.addEventListener('submit', function(e) {
                     analyzeBtn.disabled = true;
                     spinner.classList.remove('d-none');
+
+                    if (window.EventSource && searchForm.dataset.streamUrl && streamResults) {
+                        e.preventDefault();
+                        startStreaming(analyzeBtn, spinner);
+                    }
                 });
             }
         }
     }
-    
-    // Thumbnail preview handling
-    const preview = document.getElementById('thumbnailPreview');
-    if (preview) {
-        const previewImg = preview.querySelector('img');
-        
-        document.querySelectorAll('.thumbnail-container img').forEach(img => {
-            img.addEventListener('mouseenter', function(e) {
-                const highRes = this.dataset.highRes;
-                const title = this.dataset.videoTitle;
-                
-                if (previewImg) {
-                    previewImg.src = highRes;
-                    previewImg.alt = title;
-                    
-                    // Position the preview
-                    const previewRect = preview.getBoundingClientRect();
-                    const viewportWidth = window.innerWidth;
-                    const viewportHeight = window.innerHeight;
-                    
-                    let left = e.clientX + 20;
-                    let top = e.clientY + 20;
-                    
-                    // Adjust position if preview would go off screen
-                    if (left + previewRect.width > viewportWidth) {
-                        left = e.clientX - previewRect.width - 20;
-                    }
-                    if (top + previewRect.height > viewportHeight) {
-                        top = e.clientY - previewRect.height - 20;
-                    }
-                    
-                    preview.style.left = left + 'px';
-                    preview.style.top = top + 'px';
-                    preview.style.display = 'block';
-                }
-            });
-            
-            img.addEventListener('mouseleave', function() {
-                preview.style.display = 'none';
-            });
-            
-            // Update preview position on mouse move
-            img.addEventListener('mousemove', function(e) {
-                const previewRect = preview.getBoundingClientRect();
-                const viewportWidth = window.innerWidth;
-                const viewportHeight = window.innerHeight;
-                
-                let left = e.clientX + 20;
-                let top = e.clientY + 20;
-                
-                if (left + previewRect.width > viewportWidth) {
-                    left = e.clientX - previewRect.width - 20;
-                }
-                if (top + previewRect.height > viewportHeight) {
-                    top = e.clientY - previewRect.height - 20;
+
+    // Poll a queued analysis job and reload once it has finished
+    const jobStatus = document.getElementById('jobStatus');
+    if (jobStatus) {
+        const statusText = jobStatus.querySelector('.job-status-text');
+        const poll = async function() {
+            try {
+                const response = await fetch(jobStatus.dataset.statusUrl);
+                const data = await response.json();
+                if (data.status === 'done' || data.status === 'failed') {
+                    window.location.reload();
+                    return;
                 }
-                
-                preview.style.left = left + 'px';
-                preview.style.top = top + 'px';
-            });
-        });
-    }
-    
-    // Transcript handling
-    document.querySelectorAll('.toggle-transcript').forEach(button => {
-        button.addEventListener('click', async function() {
-            const videoId = this.dataset.videoId;
-            const textArea = this.nextElementSibling;
-            
-            if (textArea.classList.contains('d-none')) {
-                textArea.classList.remove('d-none');
-                this.textContent = '文字起こしを非表示';
-                
-                // Fetch transcript
-                try {
-                    const response = await fetch('/get_transcript/' + videoId);
-                    const data = await response.json();
-                    
-                    // Remove timestamps from display
-                    const cleanTranscript = data.transcript.replace(/\[\d{2}:\d{2}\]\s/g, '');
-                    textArea.value = cleanTranscript;
-                } catch (error) {
-                    textArea.value = '文字起こしの読み込みに失敗しました';
+                if (statusText && data.status === 'running') {
+                    statusText.textContent = '動画と文字起こしを分析しています...';
                 }
-            } else {
-                textArea.classList.add('d-none');
-                this.textContent = '文字起こしを表示';
+            } catch (error) {
+                // 一時的な通信エラーは次回のポーリングで再試行
             }
-        });
-    });
+            setTimeout(poll, 2000);
+        };
+        setTimeout(poll, 2000);
+    }
 
     // Copy script functionality
     const copyScriptBtn = document.getElementById('copyScriptBtn');
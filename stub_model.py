@@ -0,0 +1,50 @@
+import hashlib
+import threading
+import time
+
+
+class _StubResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class StubGenerativeModel:
+    """Offline stand-in for genai.GenerativeModel used in benchmarks and local runs.
+
+    プロンプトのハッシュから決定的なスクリプトを返し、指定した遅延で
+    Gemini APIの待ち時間を再現する。
+    """
+
+    def __init__(self, latency=0.0, chunk_count=8):
+        self.latency = latency
+        self.chunk_count = max(1, chunk_count)
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _render(self, prompt):
+        digest = hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:12]
+        return (
+            f"1. 分析した共通要素（stub {digest}）\n"
+            "   - 冒頭10秒で結論を提示\n"
+            "   - 具体的な数字で価値を示す\n\n"
+            "2. 詳細なスクリプト\n"
+            "   0:00 フック\n"
+            "   0:10 導入\n"
+            "   0:40 メイン\n"
+            "   まとめ\n"
+        )
+
+    def generate_content(self, prompt, generation_config=None, stream=False, request_options=None):
+        with self._lock:
+            self.calls += 1
+        text = self._render(prompt)
+        if not stream:
+            time.sleep(self.latency)
+            return _StubResponse(text)
+        return self._stream(text)
+
+    def _stream(self, text):
+        size = max(1, len(text) // self.chunk_count + 1)
+        for i in range(0, len(text), size):
+            time.sleep(self.latency / self.chunk_count)
+            yield _StubResponse(text[i:i + size])
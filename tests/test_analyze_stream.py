@@ -0,0 +1,50 @@
+import threading
+
+import app as app_module
+from transcript_fetcher import TranscriptFetcher
+
+
+def _video(video_id):
+    return {
+        'video_id': video_id,
+        'title': video_id,
+        'channel': 'channel',
+        'views': '1,000 回視聴',
+        'view_count': 1000,
+        'published': '1 日前',
+        'url': f"https://www.youtube.com/watch?v={video_id}",
+    }
+
+
+def test_transcripts_are_fetched_while_the_search_streams(monkeypatch):
+    started = {}
+
+    def fetch(video_id):
+        started[video_id].set()
+        return f"{video_id} の文字起こし"
+
+    def stream_trending_videos(keyword, **kwargs):
+        for video_id in ('v0', 'v1', 'v2'):
+            started[video_id] = threading.Event()
+            yield _video(video_id)
+            # 次の動画を返す前に、前の動画の文字起こし取得が始まっている
+            assert started[video_id].wait(5)
+
+    fetcher = TranscriptFetcher(fetch, concurrency=2)
+    monkeypatch.setenv('ANALYZE_STREAM', '1')
+    monkeypatch.setenv('GEMINI_STUB', '1')
+    monkeypatch.setenv('SIMILARITY_INDEX_PATH', '')
+    monkeypatch.setattr(app_module, 'stream_trending_videos', stream_trending_videos)
+    monkeypatch.setattr(app_module, 'get_transcript_fetcher', lambda: fetcher)
+
+    try:
+        response = app_module.app.test_client().get('/analyze/stream?keyword=test')
+        body = response.get_data(as_text=True)
+    finally:
+        fetcher.close()
+
+    events = [line.split(': ', 1)[1] for line in body.splitlines() if line.startswith('event: ')]
+    assert events[0] == 'videos'
+    assert events.count('transcript') == 3
+    assert events[-1] == 'done'
+    assert 'v2 の文字起こし' in body
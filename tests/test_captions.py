@@ -0,0 +1,52 @@
+import json
+
+from captions import read_player_response
+
+PLAYER = {'videoDetails': {'title': "字幕つきの動画 {\"}"}, 'captions': {}}
+
+
+class ChunkedResponse:
+    """Stand-in for a streamed requests response that records how much was read"""
+
+    def __init__(self, body, chunk_size=7):
+        self.body = body.encode('utf-8')
+        self.chunk_size = chunk_size
+        self.encoding = 'utf-8'
+        self.read = 0
+        self.closed = False
+
+    def iter_content(self, chunk_size=1, decode_unicode=False):
+        for start in range(0, len(self.body), self.chunk_size):
+            chunk = self.body[start:start + self.chunk_size]
+            self.read += len(chunk)
+            yield chunk
+
+    def close(self):
+        self.closed = True
+
+
+def _page(prefix=''):
+    return f"<html>{prefix}<script>var ytInitialPlayerResponse = {json.dumps(PLAYER, ensure_ascii=False)};</script>" + 'x' * 1000
+
+
+def test_player_response_is_read_across_chunk_boundaries():
+    # 7バイトごとに区切るとマルチバイト文字もチャンクをまたぐ
+    response = ChunkedResponse(_page('日本語のページ'))
+    assert read_player_response(response) == PLAYER
+    assert response.closed
+    # オブジェクトが閉じた時点で残りは読まない
+    assert response.read < len(response.body) - 900
+
+
+def test_scan_stops_at_max_bytes_without_the_marker():
+    response = ChunkedResponse('<html>' + 'x' * 100_000, chunk_size=1000)
+    assert read_player_response(response, max_bytes=5000) is None
+    assert response.read <= 6000
+    assert response.closed
+
+
+def test_marker_past_max_bytes_is_not_read():
+    response = ChunkedResponse(_page('x' * 10_000), chunk_size=1000)
+    assert read_player_response(response, max_bytes=5000) is None
+    assert response.read <= 6000
+    assert read_player_response(ChunkedResponse(_page('x' * 10_000), chunk_size=1000), max_bytes=20_000) == PLAYER
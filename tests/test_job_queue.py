@@ -0,0 +1,30 @@
+import threading
+import time
+
+from job_queue import DONE, FAILED, JobQueue, JobWorkerPool
+
+
+def test_timed_out_jobs_keep_their_slot_until_they_exit(tmp_path):
+    queue = JobQueue(str(tmp_path / 'jobs.sqlite3'))
+    lock = threading.Lock()
+    running = {'now': 0, 'peak': 0}
+
+    def slow(seconds):
+        with lock:
+            running['now'] += 1
+            running['peak'] = max(running['peak'], running['now'])
+        time.sleep(seconds)
+        with lock:
+            running['now'] -= 1
+
+    pool = JobWorkerPool(queue, {'slow': slow}, concurrency=2, job_timeout=0.05, poll_interval=0.01)
+    job_ids = [queue.enqueue('slow', {'seconds': 0.3 + i / 1000})[0] for i in range(6)]
+    pool.start()
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline and any(queue.get(j)['status'] not in (DONE, FAILED) for j in job_ids):
+        time.sleep(0.02)
+    pool.stop()
+
+    assert [queue.get(j)['status'] for j in job_ids] == [FAILED] * 6
+    # タイムアウトした処理が裏で動き続けていても同時実行数は上限を超えない
+    assert running['peak'] == 2
@@ -0,0 +1,174 @@
+import threading
+import time
+
+from search_cache import SearchCache, make_search_key
+
+KEY = make_search_key('keyword')
+
+
+class Search:
+    """Fake search returning numbered videos and counting calls"""
+
+    def __init__(self, count=3, gate=None, error=None):
+        self.count = count
+        self.gate = gate
+        self.error = error
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            self.calls += 1
+            call = self.calls
+        if self.gate is not None:
+            assert self.gate.wait(5)
+        if self.error is not None:
+            raise self.error
+        return [{'video_id': f"v{i}", 'call': call} for i in range(self.count)]
+
+    def stream(self):
+        yield from self()
+
+
+def _wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def _start(cache, fetch):
+    """Run get_or_fetch(KEY) on another thread; returns (thread, outcome)"""
+    outcome = {}
+
+    def caller():
+        try:
+            outcome['videos'] = cache.get_or_fetch(KEY, fetch)
+        except Exception as e:
+            outcome['error'] = e
+
+    thread = threading.Thread(target=caller)
+    thread.start()
+    return thread, outcome
+
+
+def _follow(cache, fetch, collapsed=1):
+    """Like _start, returning once the call is waiting on the in-flight fetch"""
+    thread, outcome = _start(cache, fetch)
+    _wait_until(lambda: cache.stats()['collapsed'] >= collapsed)
+    return thread, outcome
+
+
+def test_make_search_key_ignores_width_case_and_spacing():
+    assert make_search_key('  ＡＢＣ　料理 ') == make_search_key('abc 料理') == ('abc 料理', 'any', 'any', 'relevance')
+    assert make_search_key('abc', None, None, None) == make_search_key('abc')
+
+
+def test_concurrent_misses_share_one_fetch():
+    gate = threading.Event()
+    search = Search(gate=gate)
+    cache = SearchCache()
+    owner, _ = _start(cache, search)
+    _wait_until(lambda: search.calls == 1)
+    followers = [_follow(cache, search, collapsed=n) for n in range(1, 5)]
+    gate.set()
+    owner.join(5)
+    for thread, _ in followers:
+        thread.join(5)
+
+    assert search.calls == 1
+    assert [v['call'] for _, outcome in followers for v in outcome['videos']] == [1] * 12
+    # 呼び出し側ごとに別のコピーを返す
+    followers[0][1]['videos'][0]['title'] = 'edited'
+    assert 'title' not in cache.get_or_fetch(KEY, search)[0]
+    assert cache.stats()['hits'] == 1
+
+
+def test_fetch_errors_reach_waiters_and_are_not_cached():
+    gate = threading.Event()
+    cache = SearchCache()
+    failing = Search(gate=gate, error=RuntimeError("search failed"))
+    owner, owned = _start(cache, failing)
+    _wait_until(lambda: failing.calls == 1)
+    thread, outcome = _follow(cache, failing)
+    gate.set()
+    owner.join(5)
+    thread.join(5)
+
+    assert isinstance(owned['error'], RuntimeError) and outcome['error'] is owned['error']
+    search = Search()
+    assert cache.get_or_fetch(KEY, search)[0]['video_id'] == 'v0'
+    assert search.calls == 1
+
+
+def test_stale_results_are_served_while_refreshing():
+    cache = SearchCache(fresh_for=0.05, stale_for=60)
+    search = Search()
+    first = cache.get_or_fetch(KEY, search)
+    time.sleep(0.1)
+
+    gate = threading.Event()
+    refresh = Search(gate=gate)
+    # 古い結果をすぐ返し、更新は1回だけ裏で行う
+    assert cache.get_or_fetch(KEY, refresh) == first
+    assert cache.get_or_fetch(KEY, refresh) == first
+    gate.set()
+    _wait_until(lambda: cache.stats()['inflight'] == 0)
+
+    assert refresh.calls == 1
+    assert cache.get_or_fetch(KEY, refresh) == [{'video_id': f"v{i}", 'call': 1} for i in range(3)]
+    assert cache.stats()['stale_hits'] == 2 and cache.stats()['background_refreshes'] == 1
+
+
+def test_expired_results_are_fetched_again():
+    cache = SearchCache(fresh_for=0.01, stale_for=0.01)
+    search = Search()
+    cache.get_or_fetch(KEY, search)
+    time.sleep(0.05)
+    cache.get_or_fetch(KEY, search)
+    assert search.calls == 2
+
+
+def test_streamed_results_are_stored_when_the_stream_completes():
+    cache = SearchCache()
+    search = Search()
+    streamed = list(cache.iter_or_stream(KEY, search, search.stream))
+    streamed[0]['title'] = 'edited'
+
+    assert search.calls == 1
+    assert list(cache.iter_or_stream(KEY, search, search.stream)) == Search()()
+    assert cache.get_or_fetch(KEY, search) == Search()()
+    assert search.calls == 1
+
+
+def test_followers_wait_for_the_stream():
+    cache = SearchCache()
+    search = Search()
+    stream = cache.iter_or_stream(KEY, search, search.stream)
+    first = next(stream)
+    thread, outcome = _follow(cache, search)
+    rest = list(stream)
+    thread.join(5)
+
+    assert outcome['videos'] == [first] + rest
+    assert search.calls == 1
+
+
+def test_closed_stream_hands_the_search_to_the_background():
+    cache = SearchCache()
+    streaming = Search()
+    gate = threading.Event()
+    fetch = Search(count=5, gate=gate)
+    stream = cache.iter_or_stream(KEY, fetch, streaming.stream)
+    next(stream)
+    unused = Search()
+    thread, outcome = _follow(cache, unused)
+    # 先に検索を始めたストリームが途中で閉じられても、待っている側は失敗せずに結果を受け取る
+    stream.close()
+    gate.set()
+    thread.join(5)
+
+    assert outcome['videos'] == Search(count=5)()
+    # 保存されるのは途中までの結果ではなく検索し直した結果
+    assert cache.get_or_fetch(KEY, unused) == outcome['videos']
+    assert (streaming.calls, fetch.calls, unused.calls) == (1, 1, 0)
@@ -0,0 +1,39 @@
+import tempfile
+
+import pipeline
+import scraper
+
+
+def test_serverless_defaults_to_the_temp_directory(monkeypatch):
+    monkeypatch.delenv('CACHE_DIR', raising=False)
+    monkeypatch.setenv('SERVERLESS', '1')
+    assert scraper.default_cache_dir().startswith(tempfile.gettempdir())
+    monkeypatch.setenv('CACHE_DIR', '/data/cache')
+    assert scraper.default_cache_dir() == '/data/cache'
+    monkeypatch.delenv('CACHE_DIR')
+    monkeypatch.delenv('SERVERLESS')
+    assert scraper.default_cache_dir().endswith('cache')
+    assert not scraper.default_cache_dir().startswith(tempfile.gettempdir())
+
+
+def test_stores_that_fail_to_open_are_not_retried(monkeypatch, tmp_path):
+    # ファイルの下にはディレクトリを作れないので開けない
+    blocker = tmp_path / 'file'
+    blocker.write_text('')
+    monkeypatch.setenv('TRANSCRIPT_CACHE_PATH', str(blocker / 'transcripts.sqlite3'))
+    monkeypatch.setenv('SIMILARITY_INDEX_PATH', str(blocker / 'similarity.sqlite3'))
+    monkeypatch.setattr(scraper, '_transcript_cache', None)
+    monkeypatch.setattr(scraper, '_transcript_cache_failed', False)
+    monkeypatch.setattr(pipeline, '_similarity_index', None)
+    monkeypatch.setattr(pipeline, '_similarity_index_failed', False)
+
+    opened = []
+    transcript_cache = scraper.TranscriptCache
+    monkeypatch.setattr(scraper, 'TranscriptCache', lambda path, **kwargs: opened.append(path) or transcript_cache(path, **kwargs))
+
+    assert scraper.get_transcript_cache() is None
+    assert scraper.get_transcript_cache() is None
+    assert len(opened) == 1
+    assert pipeline.get_similarity_index() is None
+    assert pipeline.get_similarity_index() is None
+    assert pipeline._similarity_index_failed
@@ -0,0 +1,71 @@
+import pytest
+
+import pipeline
+import scraper
+from snapshot_store import SnapshotStore
+from transcript_fetcher import TranscriptFetcher
+
+TRANSCRIPTS = {'has-captions': "字幕のある動画の文字起こし", 'no-captions': None}
+
+
+def _fetch(video_id):
+    if video_id not in TRANSCRIPTS:
+        raise scraper.TranscriptFetchError(f"Could not fetch transcript for {video_id}")
+    return TRANSCRIPTS[video_id]
+
+
+def _video(video_id):
+    return {
+        'video_id': video_id,
+        'title': video_id,
+        'channel': 'channel',
+        'views': '1,000 回視聴',
+        'view_count': 1000,
+        'published': '1 日前',
+        'url': f"https://www.youtube.com/watch?v={video_id}",
+    }
+
+
+def test_fetch_errors_are_not_reported_as_missing_captions(monkeypatch):
+    def broken(video_id):
+        raise ConnectionError("connection reset")
+
+    monkeypatch.setenv('TRANSCRIPT_CACHE_PATH', '')
+    monkeypatch.setattr(scraper, '_fetch_transcript_segments', broken)
+
+    with pytest.raises(scraper.TranscriptFetchError):
+        scraper.fetch_video_transcript('abc')
+    assert scraper.get_video_transcript('abc') is None
+    # 一括取得では失敗した動画が結果から外れる（字幕なしの None とは区別される）
+    assert scraper.get_transcript_fetcher().fetch_many(['abc']) == {}
+
+
+def test_run_incremental_does_not_store_failed_fetches(monkeypatch, tmp_path):
+    store = SnapshotStore(str(tmp_path / 'snapshots.sqlite3'))
+    fetcher = TranscriptFetcher(_fetch, concurrency=2)
+    monkeypatch.setenv('SIMILARITY_INDEX_PATH', '')
+    monkeypatch.setattr(pipeline, 'get_snapshot_store', lambda: store)
+    monkeypatch.setattr(pipeline, 'get_transcript_fetcher', lambda: fetcher)
+    monkeypatch.setattr(pipeline, 'generate_script', lambda inputs, duration, common_phrases=None: "script")
+    monkeypatch.setattr(
+        pipeline, 'get_trending_videos',
+        lambda keyword, **kwargs: [_video(v) for v in ('has-captions', 'no-captions', 'network-error')]
+    )
+
+    try:
+        result = pipeline.run_incremental('keyword')
+    finally:
+        fetcher.close()
+
+    labels = {v['video_id']: v['transcript'] for v in result['videos']}
+    assert labels == {
+        'has-captions': TRANSCRIPTS['has-captions'],
+        'no-captions': scraper.TRANSCRIPT_UNAVAILABLE,
+        'network-error': scraper.TRANSCRIPT_FAILED,
+    }
+    # 取得に失敗した動画は保存せず、次回もう一度取得する
+    key = pipeline.snapshot_key(pipeline.make_search_key('keyword', 'any', 'any', 'relevance') + (10,))
+    assert store.known_transcripts(key, list(labels)) == {
+        'has-captions': TRANSCRIPTS['has-captions'],
+        'no-captions': scraper.TRANSCRIPT_UNAVAILABLE,
+    }
@@ -0,0 +1,104 @@
+import random
+
+import pytest
+
+from video_metadata import has_view_count, is_publish_date, parse_publish_date, parse_view_count
+
+NOW = 1_700_000_000.0
+SEEDS = range(20)
+
+# (日本語の単位, 英語の単位, 秒数)
+TIME_UNITS = [
+    ('秒', 'second', 1),
+    ('分', 'minute', 60),
+    ('時間', 'hour', 3600),
+    ('日', 'day', 86400),
+    ('週間', 'week', 7 * 86400),
+    ('か月', 'month', 30 * 86400),
+    ('年', 'year', 365 * 86400),
+]
+
+
+def _view_labels(rng):
+    """Random view-count labels in every format the scraper sees, with the count they mean"""
+    tenths = rng.randint(1, 99_999)
+    count = rng.randint(0, 10**10)
+    return [
+        (f"{tenths // 10}.{tenths % 10}万 回視聴", tenths * 1_000),
+        (f"{tenths}K views", tenths * 1_000),
+        (f"{tenths // 10}.{tenths % 10}M views", tenths * 100_000),
+        (f"{tenths // 10}.{tenths % 10}億 回視聴", tenths * 10_000_000),
+        (f"{tenths // 10}.{tenths % 10}B views", tenths * 100_000_000),
+        (f"{count:,} 回視聴", count),
+        (f"{count:,} views", count),
+        (f"{count} views", count),
+        (f"{tenths // 10}.{tenths % 10}万 人が視聴中", tenths * 1_000),
+        (f"{tenths}K watching", tenths * 1_000),
+    ]
+
+
+def _date_labels(rng):
+    amount = rng.randint(1, 60)
+    ja, en, _ = rng.choice(TIME_UNITS)
+    plural = 's' if amount != 1 else ''
+    return [
+        f"{amount} {ja}前",
+        f"{amount}{ja}前",
+        f"ストリーミング開始: {amount} {ja}前",
+        f"{amount} {en}{plural} ago",
+        f"Streamed {amount} {en}{plural} ago",
+        f"{rng.randint(2005, 2030)}/{rng.randint(1, 12):02d}/{rng.randint(1, 28):02d}",
+        f"{rng.randint(2005, 2030)}年{rng.randint(1, 12)}月{rng.randint(1, 28)}日",
+    ]
+
+
+@pytest.mark.parametrize('ja, en', [
+    ("1.2万 回視聴", "12,000 views"),
+    ("120万 回視聴", "1.2M views"),
+    ("3.4億 回視聴", "340M views"),
+    ("20億 回視聴", "2B views"),
+    ("1,500 回視聴", "1.5K views"),
+    ("1,234,567 回視聴", "1,234,567 views"),
+    ("12万 人が視聴中", "120K watching"),
+])
+def test_japanese_and_english_counts_agree(ja, en):
+    assert parse_view_count(ja) == parse_view_count(en) > 0
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_view_count_formats_parse_to_the_same_number(seed):
+    for label, expected in _view_labels(random.Random(seed)):
+        assert parse_view_count(label) == expected, label
+
+
+@pytest.mark.parametrize('label', ["視聴なし", "No views", "", None, "3 日前"])
+def test_missing_view_count_is_zero(label):
+    assert parse_view_count(label) == 0
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_relative_dates_are_monotonic(seed):
+    rng = random.Random(seed)
+    samples = []
+    for _ in range(50):
+        amount = rng.randint(1, 60)
+        ja, en, seconds = rng.choice(TIME_UNITS)
+        label_ja = f"{amount} {ja}前"
+        label_en = f"{amount} {en}s ago"
+        assert parse_publish_date(label_ja, NOW) == parse_publish_date(label_en, NOW) == NOW - amount * seconds
+        samples.append((amount * seconds, parse_publish_date(label_ja, NOW)))
+    # 「前」の期間が長いほど公開日時は古い
+    samples.sort()
+    published = [timestamp for _, timestamp in samples]
+    assert published == sorted(published, reverse=True)
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_labels_are_never_both_views_and_dates(seed):
+    rng = random.Random(seed)
+    for label, _ in _view_labels(rng):
+        assert has_view_count(label) and not is_publish_date(label), label
+    for label in _date_labels(rng):
+        assert is_publish_date(label) and not has_view_count(label), label
+    for label in ["視聴なし", "No views", "12:34", "ライブ", "チャンネル登録者数 1.2万人"]:
+        assert not (has_view_count(label) and is_publish_date(label)), label
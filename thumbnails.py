@@ -0,0 +1,111 @@
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_QUALITIES = ['maxresdefault', 'sddefault', 'hqdefault', 'mqdefault', 'default']
+# hqdefaultはすべての動画に存在するため、確認なしで使える代替URLとする
+FALLBACK_QUALITY = 'hqdefault'
+
+
+def thumbnail_url(video_id, quality=FALLBACK_QUALITY):
+    return f"https://i.ytimg.com/vi/{video_id}/{quality}.jpg"
+
+
+def best_from_thumbnail_list(thumbnails):
+    """Pick the widest entry from a ytInitialData thumbnails list"""
+    if not thumbnails:
+        return None
+    best = max(thumbnails, key=lambda t: t.get('width', 0) * t.get('height', 0))
+    return best.get('url')
+
+
+class ThumbnailResolver:
+    """Batched, concurrent and cached best-quality thumbnail lookup"""
+
+    def __init__(self, session_factory, max_entries=5000, concurrency=8, timeout=3):
+        self._session_factory = session_factory
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._cache = OrderedDict()
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='thumbnail')
+
+    def cached(self, video_id):
+        """Return the remembered best URL for video_id, or None"""
+        with self._lock:
+            url = self._cache.get(video_id)
+            if url is not None:
+                self._cache.move_to_end(video_id)
+            return url
+
+    def remember(self, video_id, url):
+        with self._lock:
+            self._cache[video_id] = url
+            self._cache.move_to_end(video_id)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def resolve(self, video_id):
+        """Probe qualities from highest to lowest and cache the first that exists"""
+        url = self.cached(video_id)
+        if url:
+            return url
+
+        session = self._session_factory()
+        for quality in THUMBNAIL_QUALITIES:
+            candidate = thumbnail_url(video_id, quality)
+            try:
+                response = session.head(candidate, timeout=self.timeout)
+                if response.status_code == 200:
+                    self.remember(video_id, candidate)
+                    return candidate
+            except Exception as e:
+                # 通信エラー時は結果を記録せず代替URLを返す
+                logger.error(f"Error getting thumbnail for video {video_id}: {str(e)}")
+                return thumbnail_url(video_id)
+
+        url = thumbnail_url(video_id, 'default')
+        self.remember(video_id, url)
+        return url
+
+    def resolve_many(self, video_ids):
+        """Resolve several videos concurrently, skipping cached ones"""
+        results = {}
+        missing = []
+        for video_id in video_ids:
+            url = self.cached(video_id)
+            if url:
+                results[video_id] = url
+            else:
+                missing.append(video_id)
+        for video_id, url in zip(missing, self._executor.map(self.resolve, missing)):
+            results[video_id] = url
+        return results
+
+    def upgrade_async(self, video_ids):
+        """Resolve uncached videos in the background for later requests"""
+        for video_id in video_ids:
+            with self._lock:
+                if video_id in self._cache or video_id in self._pending:
+                    continue
+                self._pending.add(video_id)
+            self._executor.submit(self._upgrade, video_id)
+
+    def _upgrade(self, video_id):
+        try:
+            self.resolve(video_id)
+        finally:
+            with self._lock:
+                self._pending.discard(video_id)
+
+    def apply(self, videos):
+        """Replace fallback thumbnails with cached best-quality URLs in place"""
+        for video in videos:
+            url = self.cached(video['video_id'])
+            if url:
+                video['thumbnail'] = url
+        return videos
@@ -0,0 +1,138 @@
+import json
+import logging
+import threading
+import time
+
+from sqlite_util import connect_local, ensure_directory
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS transcripts (
+    video_id TEXT NOT NULL,
+    languages TEXT NOT NULL,
+    transcript TEXT,
+    segments TEXT,
+    expires_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    PRIMARY KEY (video_id, languages)
+);
+CREATE INDEX IF NOT EXISTS transcripts_accessed_at ON transcripts (accessed_at);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO counters (name, value) VALUES ('hits', 0), ('misses', 0), ('evictions', 0);
+"""
+
+
+class TranscriptCache:
+    """SQLite-backed transcript cache with TTLs and LRU eviction.
+
+    WALモードのSQLiteを使うため、複数のFlaskワーカープロセスから安全に共有できる。
+    """
+
+    def __init__(self, path, ttl=30 * 86400, negative_ttl=6 * 3600, max_entries=5000):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self._local = threading.local()
+
+        ensure_directory(path)
+        conn = self._connect()
+        conn.executescript(_SCHEMA)
+        # 時刻付きセグメントの列がない古いキャッシュファイルには追加する
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(transcripts)")}
+        if 'segments' not in columns:
+            conn.execute("ALTER TABLE transcripts ADD COLUMN segments TEXT")
+
+    def _connect(self):
+        """スレッド・プロセスごとに接続を持つ（fork後は作り直す）"""
+        return connect_local(self._local, self.path, synchronous='NORMAL')
+
+    @staticmethod
+    def _key(languages):
+        return ','.join(languages)
+
+    def get(self, video_id, languages):
+        """Return (hit, transcript); transcript is None for cached negatives"""
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            row = conn.execute(
+                "SELECT transcript, expires_at FROM transcripts WHERE video_id = ? AND languages = ?",
+                (video_id, self._key(languages))
+            ).fetchone()
+            if row is None or row[1] < now:
+                conn.execute("UPDATE counters SET value = value + 1 WHERE name = 'misses'")
+                return False, None
+            conn.execute(
+                "UPDATE transcripts SET accessed_at = ? WHERE video_id = ? AND languages = ?",
+                (now, video_id, self._key(languages))
+            )
+            conn.execute("UPDATE counters SET value = value + 1 WHERE name = 'hits'")
+        return True, row[0]
+
+    def get_segments(self, video_id, languages):
+        """Return the cached timed segments ([{'text', 'start', 'duration'}]) or None"""
+        row = self._connect().execute(
+            "SELECT segments FROM transcripts WHERE video_id = ? AND languages = ? AND expires_at >= ?",
+            (video_id, self._key(languages), time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row and row[0] else None
+
+    def set(self, video_id, languages, transcript, segments=None):
+        """Store a transcript (and its timed segments), or a negative result when transcript is None"""
+        now = time.time()
+        ttl = self.ttl if transcript else self.negative_ttl
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO transcripts "
+                "(video_id, languages, transcript, segments, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    video_id, self._key(languages), transcript or None,
+                    json.dumps(segments, ensure_ascii=False) if segments else None,
+                    now + ttl, now,
+                )
+            )
+            self._evict(conn)
+
+    def _evict(self, conn):
+        """上限を超えた分を最終アクセスが古い順に削除"""
+        count = conn.execute("SELECT COUNT(*) FROM transcripts").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            conn.execute(
+                "DELETE FROM transcripts WHERE rowid IN "
+                "(SELECT rowid FROM transcripts ORDER BY accessed_at ASC LIMIT ?)",
+                (excess,)
+            )
+            conn.execute("UPDATE counters SET value = value + ? WHERE name = 'evictions'", (excess,))
+
+    def iter_transcripts(self, batch_size=500):
+        """Yield (video_id, transcript) for every unexpired cached transcript"""
+        conn = self._connect()
+        last = ''
+        while True:
+            rows = conn.execute(
+                "SELECT video_id, transcript FROM transcripts "
+                "WHERE video_id > ? AND transcript IS NOT NULL AND expires_at >= ? "
+                "GROUP BY video_id ORDER BY video_id LIMIT ?",
+                (last, time.time(), batch_size)
+            ).fetchall()
+            if not rows:
+                return
+            yield from rows
+            last = rows[-1][0]
+
+    def stats(self):
+        """Return hit/miss counters shared by every process using this file"""
+        conn = self._connect()
+        stats = dict(conn.execute("SELECT name, value FROM counters").fetchall())
+        stats['entries'] = conn.execute("SELECT COUNT(*) FROM transcripts").fetchone()[0]
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = round(stats['hits'] / lookups, 3) if lookups else 0.0
+        return stats
@@ -0,0 +1,152 @@
+import math
+import re
+import unicodedata
+from collections import Counter
+
+# ひらがな・カタカナ・CJK統合漢字・半角カナ
+_CJK_CHAR = re.compile(r'[぀-ヿ㐀-䶿一-鿿豈-﫿ｦ-ﾟ]')
+_CJK_RUN = re.compile(r'[぀-ヿ㐀-䶿一-鿿豈-﫿ｦ-ﾟ]+')
+_WORD = re.compile(r'[A-Za-z0-9]+')
+_SENTENCE_END = re.compile(r'(?<=[。！？!?])|(?<=\.)\s+|\n+')
+# 自動字幕の [音楽] [拍手] などのノイズ
+_NOISE = re.compile(r'[\[［][^\]］]{1,12}[\]］]')
+
+
+def estimate_tokens(text):
+    """Roughly estimate LLM tokens: one per CJK character, ~1.3 per Latin word"""
+    if not text:
+        return 0
+    cjk = len(_CJK_CHAR.findall(text))
+    words = len(_WORD.findall(text))
+    return cjk + math.ceil(words * 1.3)
+
+
+def _drop_repeated_runs(tokens, n=4):
+    """Skip tokens that start an n-token run already seen (repeated caption lines)"""
+    seen = set()
+    kept = []
+    for i in range(len(tokens)):
+        window = tuple(tokens[i:i + n])
+        if len(window) == n and window in seen:
+            continue
+        seen.add(window)
+        kept.append(tokens[i])
+    return kept
+
+
+def split_sentences(text, max_chars=80):
+    """Split text into sentences, chunking unpunctuated caption runs"""
+    sentences = []
+    text = _NOISE.sub(' ', text or '')
+    for piece in _SENTENCE_END.split(text):
+        piece = piece.strip()
+        if not piece:
+            continue
+        if len(piece) <= max_chars:
+            sentences.append(piece)
+            continue
+        # 句読点のない自動字幕は空白区切りでmax_chars程度にまとめる
+        current = ''
+        for token in _drop_repeated_runs(piece.split()):
+            if current and len(current) + len(token) + 1 > max_chars:
+                sentences.append(current)
+                current = token
+            else:
+                current = f"{current} {token}" if current else token
+        if current:
+            sentences.append(current)
+    return sentences
+
+
+def _normalize(sentence):
+    return ''.join(unicodedata.normalize('NFKC', sentence).lower().split())
+
+
+def dedupe_sentences(sentences):
+    """Drop repeated caption lines"""
+    seen = set()
+    unique = []
+    for sentence in sentences:
+        key = _normalize(sentence)
+        if not key or key in seen:
+            continue
+        seen.add(key)
+        unique.append(sentence)
+    return unique
+
+
+def terms(sentence):
+    """Index terms: CJK character bigrams plus lowercase Latin words"""
+    result = [w.lower() for w in _WORD.findall(sentence)]
+    for run in _CJK_RUN.findall(sentence):
+        if len(run) == 1:
+            result.append(run)
+        result.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return result
+
+
+def _score_sentences(sentences, document_frequency, video_count):
+    """Salience: terms shared across videos weigh more, openings get a hook bonus"""
+    scores = []
+    local = Counter(t for s in sentences for t in set(terms(s)))
+    for position, sentence in enumerate(sentences):
+        sentence_terms = set(terms(sentence))
+        if not sentence_terms:
+            scores.append(0.0)
+            continue
+        weight = 0.0
+        for t in sentence_terms:
+            shared = math.log1p(document_frequency[t] - 1) if video_count > 1 else 0.0
+            weight += math.log1p(local[t]) * (1.0 + shared)
+        score = weight / math.sqrt(len(sentence_terms))
+        # 冒頭（フック）ほど重視する
+        score *= 1.0 + 1.5 * math.exp(-position / 3.0)
+        scores.append(score)
+    return scores
+
+
+def compact_transcript(sentences, budget, document_frequency, video_count):
+    """Select the most salient sentences that fit budget, keeping original order"""
+    scores = _score_sentences(sentences, document_frequency, video_count)
+    ranked = sorted(range(len(sentences)), key=lambda i: scores[i], reverse=True)
+
+    chosen = []
+    used = 0
+    for index in ranked:
+        cost = estimate_tokens(sentences[index]) + 1
+        if used + cost > budget:
+            continue
+        chosen.append(index)
+        used += cost
+    return ' '.join(sentences[i] for i in sorted(chosen))
+
+
+def compact_videos(videos, budget=6000):
+    """Fit per-video transcripts into a shared token budget.
+
+    videos is a list of {'title': ..., 'transcript': ...}; returns a list of
+    {'title': ..., 'excerpt': ...} in the same order.
+    """
+    prepared = [dedupe_sentences(split_sentences(v.get('transcript') or '')) for v in videos]
+
+    # 複数の動画に共通する語ほど「共通する成功パターン」の手がかりになる
+    document_frequency = Counter()
+    for sentences in prepared:
+        document_frequency.update({t for s in sentences for t in terms(s)})
+
+    title_tokens = sum(estimate_tokens(v.get('title', '')) + 8 for v in videos)
+    remaining = max(0, budget - title_tokens)
+
+    # 短い文字起こしの余りを長いものに回す
+    order = sorted(range(len(videos)), key=lambda i: sum(estimate_tokens(s) for s in prepared[i]))
+    excerpts = [''] * len(videos)
+    for rank, index in enumerate(order):
+        share = remaining // (len(videos) - rank) if len(videos) - rank else 0
+        excerpt = compact_transcript(prepared[index], share, document_frequency, len(videos))
+        remaining -= estimate_tokens(excerpt)
+        excerpts[index] = excerpt
+
+    return [
+        {'title': v.get('title', ''), 'excerpt': excerpt}
+        for v, excerpt in zip(videos, excerpts)
+    ]
@@ -0,0 +1,56 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
+
+logger = logging.getLogger(__name__)
+
+
+class TranscriptFetcher:
+    """Fetch transcripts on a bounded thread pool, collecting them in completion order.
+
+    取得関数（youtube_transcript_api と requests）はブロッキングなので、
+    同時実行数はスレッドプールの大きさで制限し、完了順の収集とバッチ全体の
+    締め切りは as_completed で扱う。
+    """
+
+    def __init__(self, fetch_func, concurrency=8):
+        self._fetch_func = fetch_func
+        self.concurrency = max(1, int(concurrency))
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='transcript')
+
+    def submit(self, video_id):
+        """Schedule one fetch and return a concurrent.futures.Future"""
+        return self._executor.submit(self._fetch_func, video_id)
+
+    def iter_completed(self, video_ids, deadline=None):
+        """Yield (video_id, transcript, error) in completion order until deadline"""
+        return self.collect({video_id: self.submit(video_id) for video_id in dict.fromkeys(video_ids)}, deadline)
+
+    def collect(self, futures, deadline=None):
+        """Yield (video_id, transcript, error) for submitted {video_id: future} in completion order until deadline"""
+        by_future = {future: video_id for video_id, future in futures.items()}
+        try:
+            for future in as_completed(by_future, timeout=deadline):
+                video_id = by_future[future]
+                try:
+                    yield video_id, future.result(), None
+                except Exception as e:
+                    logger.error(f"Error getting transcript for {video_id}: {str(e)}")
+                    yield video_id, None, e
+        except FuturesTimeoutError:
+            pending = [video_id for future, video_id in by_future.items() if not future.done()]
+            logger.warning(f"Transcript batch deadline of {deadline}s exceeded, skipping: {pending}")
+        finally:
+            # 締め切り超過・途中終了時は残りをキャンセルする
+            for future in by_future:
+                future.cancel()
+
+    def fetch_many(self, video_ids, deadline=None):
+        """Return {video_id: transcript} for every fetch finished before deadline"""
+        return {
+            video_id: transcript
+            for video_id, transcript, error in self.iter_completed(video_ids, deadline)
+            if error is None
+        }
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,116 @@
+import re
+import time
+from datetime import datetime
+
+# いいね率の平均（4.5%）
+LIKE_RATE = 0.045
+
+_UNIT_MULTIPLIERS = {
+    '': 1,
+    '万': 10_000,
+    '億': 100_000_000,
+    'k': 1_000,
+    'm': 1_000_000,
+    'b': 1_000_000_000,
+}
+
+# 「1.2万 回視聴」「1,234,567 回視聴」「1.2K views」「3M views」「12万 人が視聴中」
+_VIEWS_RE = re.compile(
+    r'(\d[\d,]*(?:\.\d+)?)\s*(万|億|[kKmMbB](?![a-zA-Z]))?\s*'
+    r'(?:回視聴|人が視聴中|人が待機中|views?\b|watching\b|waiting\b)'
+)
+_NO_VIEWS_RE = re.compile(r'視聴なし|視聴回数なし|\bno views\b', re.IGNORECASE)
+
+_SECOND = 1
+_MINUTE = 60
+_HOUR = 3600
+_DAY = 86400
+_UNIT_SECONDS = {
+    '秒': _SECOND, 'second': _SECOND,
+    '分': _MINUTE, 'minute': _MINUTE,
+    '時間': _HOUR, 'hour': _HOUR,
+    '日': _DAY, 'day': _DAY,
+    '週間': 7 * _DAY, 'week': 7 * _DAY,
+    'か月': 30 * _DAY, 'ヶ月': 30 * _DAY, 'ヵ月': 30 * _DAY, 'カ月': 30 * _DAY, 'month': 30 * _DAY,
+    '年': 365 * _DAY, 'year': 365 * _DAY,
+}
+
+# 「3 日前」「2 週間前」「ストリーミング開始: 5 時間前」「3 days ago」「Streamed 1 year ago」
+_RELATIVE_JA_RE = re.compile(r'(\d+)\s*(秒|分|時間|日|週間|か月|ヶ月|ヵ月|カ月|年)\s*前')
+_RELATIVE_EN_RE = re.compile(r'(\d+)\s*(second|minute|hour|day|week|month|year)s?\s+ago', re.IGNORECASE)
+# 「2024/01/15」「2024-01-15」「2024年1月15日」
+_ABSOLUTE_RE = re.compile(r'(\d{4})[/\-年]\s*(\d{1,2})[/\-月]\s*(\d{1,2})日?')
+
+
+def _number(digits, unit):
+    return float(digits.replace(',', '')) * _UNIT_MULTIPLIERS[(unit or '').lower()]
+
+
+def parse_view_count(text):
+    """Return the view count in text as an int (0 when absent or unparseable)"""
+    if not text:
+        return 0
+    match = _VIEWS_RE.search(text)
+    if match is None:
+        return 0
+    return int(round(_number(match.group(1), match.group(2))))
+
+
+def has_view_count(text):
+    """Whether text is a view-count label (including "no views")"""
+    return bool(text) and (_VIEWS_RE.search(text) is not None or _NO_VIEWS_RE.search(text) is not None)
+
+
+def parse_publish_date(text, now=None):
+    """Convert a relative ("3 日前", "2 weeks ago") or absolute publish date to a Unix timestamp.
+
+    Months count as 30 days and years as 365. Returns None if text is not a date.
+    """
+    if not text:
+        return None
+    match = _RELATIVE_JA_RE.search(text) or _RELATIVE_EN_RE.search(text)
+    if match is not None:
+        seconds = int(match.group(1)) * _UNIT_SECONDS[match.group(2).lower()]
+        return (time.time() if now is None else now) - seconds
+    match = _ABSOLUTE_RE.search(text)
+    if match is not None:
+        try:
+            return datetime(*(int(g) for g in match.groups())).timestamp()
+        except ValueError:
+            return None
+    return None
+
+
+def is_publish_date(text):
+    """Whether text is a publish-date label"""
+    return bool(text) and (
+        _RELATIVE_JA_RE.search(text) is not None
+        or _RELATIVE_EN_RE.search(text) is not None
+        or _ABSOLUTE_RE.search(text) is not None
+    )
+
+
+def estimate_likes(view_count):
+    """Estimate likes from a view count using the average like rate"""
+    return int(view_count * LIKE_RATE)
+
+
+def format_count(count):
+    """Format a count the way YouTube Japan does (1.2万, 3.4億)"""
+    if count >= 100_000_000:
+        return f"{count / 100_000_000:.1f}億"
+    if count >= 10_000:
+        return f"{count / 10_000:.1f}万"
+    return str(count)
+
+
+def parse_metadata(views_text, publish_text, now=None):
+    """Single pass over a video's raw labels, returning its numeric fields"""
+    view_count = parse_view_count(views_text)
+    like_count = estimate_likes(view_count)
+    return {
+        'view_count': view_count,
+        'like_count': like_count,
+        'likes': format_count(like_count) if like_count else "",
+        'published_at': parse_publish_date(publish_text, now),
+    }
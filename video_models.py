@@ -0,0 +1,199 @@
+import math
+from array import array
+
+from video_metadata import format_count, parse_metadata
+
+# 表示用の文字列列（並び替えには使わない）
+TEXT_COLUMNS = ('video_id', 'title', 'channel', 'thumbnail', 'views', 'publish_date')
+# 数値列は array に詰め、NumPy/Arrow へコピーなしで渡す
+NUMERIC_COLUMNS = {'view_count': 'q', 'like_count': 'q', 'published_at': 'd', 'has_transcript': 'b'}
+
+
+class Video:
+    """Lightweight row view into a ResultSet.
+
+    Attribute access (video.title) and dict-style access (video['title'])
+    both work, so templates and code written against video dicts keep
+    working unchanged.
+    """
+
+    __slots__ = ('_results', '_index')
+
+    def __init__(self, results, index):
+        self._results = results
+        self._index = index
+
+    def __getattr__(self, name):
+        results = object.__getattribute__(self, '_results')
+        index = object.__getattribute__(self, '_index')
+        column = results._columns.get(name)
+        if column is None:
+            raise AttributeError(name)
+        value = column[index]
+        if name == 'published_at' and math.isnan(value):
+            return None
+        return value
+
+    @property
+    def likes(self):
+        return format_count(self.like_count) if self.like_count else ""
+
+    @property
+    def transcript(self):
+        """Load the transcript on first access (stored out of line)"""
+        return self._results.transcript(self._index)
+
+    def __getitem__(self, name):
+        try:
+            return getattr(self, name)
+        except AttributeError:
+            raise KeyError(name)
+
+    def get(self, name, default=None):
+        try:
+            return self[name]
+        except KeyError:
+            return default
+
+    def __contains__(self, name):
+        return name in self._results._columns or name in ('likes', 'transcript')
+
+    def to_dict(self, include_transcript=False):
+        data = {name: self[name] for name in self._results._columns}
+        data['has_transcript'] = bool(data['has_transcript'])
+        data['likes'] = self.likes
+        if include_transcript:
+            data['transcript'] = self.transcript
+        return data
+
+    def __repr__(self):
+        return f"Video({self.video_id!r}, {self.title!r})"
+
+
+class ResultSet:
+    """Columnar set of videos with numeric fields parsed once.
+
+    文字起こしは行に持たず、transcript_loader(video_id) で必要になった時だけ
+    読み込む（スナップショットやキャッシュのSQLiteから）。
+    """
+
+    def __init__(self, transcript_loader=None):
+        self._columns = {name: [] for name in TEXT_COLUMNS}
+        self._columns.update({name: array(code) for name, code in NUMERIC_COLUMNS.items()})
+        self._transcript_loader = transcript_loader
+        self._transcripts = {}
+
+    @classmethod
+    def from_dicts(cls, videos, transcript_loader=None, has_transcript=None):
+        """Build from video dicts; inline transcripts are moved out of the rows.
+
+        has_transcript(video) decides the availability flag (default: a non-empty
+        'transcript' value).
+        """
+        results = cls(transcript_loader)
+        for video in videos:
+            results.append(video, has_transcript)
+        return results
+
+    def append(self, video, has_transcript=None):
+        columns = self._columns
+        for name in TEXT_COLUMNS:
+            columns[name].append(video.get(name) or '')
+        parsed = video
+        if any(name not in video for name in ('view_count', 'like_count', 'published_at')):
+            # 数値列のない古いデータは表示用の文字列から一度だけ解析する
+            parsed = parse_metadata(video.get('views'), video.get('publish_date'))
+            parsed.update((name, video[name]) for name in ('view_count', 'like_count', 'published_at') if name in video)
+        columns['view_count'].append(int(parsed['view_count']))
+        columns['like_count'].append(int(parsed['like_count']))
+        published_at = parsed.get('published_at')
+        columns['published_at'].append(float('nan') if published_at is None else float(published_at))
+
+        transcript = video.get('transcript')
+        available = has_transcript(video) if has_transcript else bool(video.get('has_transcript', transcript))
+        columns['has_transcript'].append(1 if available else 0)
+        if transcript is not None:
+            self._transcripts[video['video_id']] = transcript
+
+    def __len__(self):
+        return len(self._columns['video_id'])
+
+    def __iter__(self):
+        return (Video(self, i) for i in range(len(self)))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [Video(self, i) for i in range(len(self))[index]]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return Video(self, index)
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def column(self, name):
+        return self._columns[name]
+
+    def transcript(self, index):
+        video_id = self._columns['video_id'][index]
+        if video_id not in self._transcripts and self._transcript_loader is not None:
+            self._transcripts[video_id] = self._transcript_loader(video_id)
+        return self._transcripts.get(video_id)
+
+    def take(self, indices):
+        """Return a new ResultSet with rows in the given order (shares the transcript loader)"""
+        results = ResultSet(self._transcript_loader)
+        for name, column in self._columns.items():
+            if isinstance(column, array):
+                results._columns[name] = array(column.typecode, (column[i] for i in indices))
+            else:
+                results._columns[name] = [column[i] for i in indices]
+        results._transcripts = self._transcripts
+        return results
+
+    def to_dicts(self, include_transcripts=False):
+        """Plain dicts for JSON responses and job results"""
+        return [video.to_dict(include_transcripts) for video in self]
+
+    def to_numpy(self, names=None):
+        """Return {column: ndarray} for the given columns (default all); numeric columns are zero-copy views"""
+        try:
+            import numpy as np
+        except ImportError:
+            raise ImportError("to_numpy() には numpy が必要です: pip install numpy")
+        dtypes = {'q': np.int64, 'd': np.float64, 'b': np.bool_}
+        data = {}
+        for name in names or self._columns:
+            column = self._columns[name]
+            if isinstance(column, array):
+                data[name] = np.frombuffer(column, dtype=dtypes[column.typecode])
+            else:
+                data[name] = np.array(column, dtype=object)
+        return data
+
+    def to_arrow(self):
+        """Return a pyarrow.Table; numeric columns wrap the array buffers without copying"""
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise ImportError("to_arrow() には pyarrow が必要です: pip install pyarrow")
+        types = {'q': pa.int64(), 'd': pa.float64()}
+        fields = {}
+        for name, column in self._columns.items():
+            if name == 'has_transcript':
+                fields[name] = pa.array([bool(v) for v in column], type=pa.bool_())
+            elif isinstance(column, array):
+                fields[name] = pa.Array.from_buffers(types[column.typecode], len(column), [None, pa.py_buffer(column)])
+            else:
+                fields[name] = pa.array(column, type=pa.string())
+        return pa.table(fields)
+
+    def to_parquet(self, path):
+        """Write the result set to a Parquet file for historical analysis"""
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("to_parquet() には pyarrow が必要です: pip install pyarrow")
+        pq.write_table(self.to_arrow(), path)
@@ -0,0 +1,19 @@
+import logging
+from pipeline import create_worker_pool
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+if __name__ == '__main__':
+    # Webプロセスとは別に分析ジョブを処理する（JOB_WORKERS_INPROCESS=0と併用）
+    workers = create_worker_pool()
+    workers.start()
+    try:
+        workers.join()
+    except KeyboardInterrupt:
+        logger.info("Stopping job workers...")
+        workers.stop()